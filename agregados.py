@@ -0,0 +1,224 @@
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from config import DIRECTORIO_AGREGADOS, BACKEND_ALMACENAMIENTO
+from utils import DIVISIONES_ALIMENTOS, variaciones_entre_semanas
+
+COLUMNAS_VALORES = [
+    'Suma', 'Cantidad', 'Filas',
+    'Primero', 'Fecha_Primero', 'Posicion_Primero', 'Division_Primera',
+    'Ultimo', 'Fecha_Ultimo', 'Division_Ultima'
+]
+
+# Columnas de año y de número de período de cada tipo de agregado
+# (las semanas usan el año ISO, como calcular_variacion_semanal)
+PERIODOS = {
+    "semanal": ('Año_ISO', 'Semana'),
+    "mensual": ('Año', 'Mes'),
+}
+
+# Divisiones cuyas filas entran en cada tipo de agregado (None para todas). Los
+# mensuales solo se usan para la canasta básica de alimentos, así que, como
+# calcular_variaciones_mensuales, se filtran las filas antes de agregar: un
+# producto que cambia de división a mitad de mes solo suma sus filas de alimentos.
+DIVISIONES_AGREGADAS = {
+    "semanal": None,
+    "mensual": DIVISIONES_ALIMENTOS,
+}
+
+PATRON_ARCHIVO = re.compile(r"^(semanal|mensual)_(\d{4})-W?(\d{2})\.csv$")
+
+
+def _nombre_archivo(tipo, año, numero):
+    if tipo == "semanal":
+        return f"semanal_{año}-W{numero:02d}.csv"
+    return f"mensual_{año}-{numero:02d}.csv"
+
+
+def _agregar_periodos(df):
+    """Agrega a las filas del historial las columnas de semana ISO y mes."""
+    fechas = pd.to_datetime(df['Fecha'])
+    calendario = fechas.dt.isocalendar()
+    return df.assign(
+        Año_ISO=calendario.year.astype('int64').to_numpy(),
+        Semana=calendario.week.astype('int64').to_numpy(),
+        Año=fechas.dt.year.to_numpy(),
+        Mes=fechas.dt.month.to_numpy()
+    )
+
+
+def _resumir(df, claves):
+    """Resume filas en orden cronológico en un registro por (producto, período)."""
+    grupos = df.groupby(claves, sort=False)
+    primeros = df.drop_duplicates(subset=claves, keep='first').set_index(claves)
+    ultimos = df.drop_duplicates(subset=claves, keep='last').set_index(claves)
+    resumen = pd.DataFrame({
+        'Suma': grupos['Precio'].sum(),
+        'Cantidad': grupos['Precio'].count(),
+        'Filas': grupos.size(),
+    })
+    resumen['Primero'] = primeros['Precio']
+    resumen['Fecha_Primero'] = primeros['Fecha']
+    resumen['Posicion_Primero'] = primeros['Posicion']
+    resumen['Division_Primera'] = primeros['Division']
+    resumen['Ultimo'] = ultimos['Precio']
+    resumen['Fecha_Ultimo'] = ultimos['Fecha']
+    resumen['Division_Ultima'] = ultimos['Division']
+    return resumen.reset_index()
+
+
+def _combinar(existentes, nuevos, claves):
+    """Combina agregados guardados con los de filas nuevas (posteriores a las guardadas)."""
+    if existentes.empty:
+        return nuevos
+    combinado = existentes.merge(nuevos, on=claves, how='outer', suffixes=('', '_nuevo'), sort=False)
+    hay_previo = combinado['Filas'].notna()
+    hay_nuevo = combinado['Filas_nuevo'].notna()
+    for columna in ['Suma', 'Cantidad', 'Filas']:
+        combinado[columna] = combinado[columna].fillna(0) + combinado[f'{columna}_nuevo'].fillna(0)
+    for columna in ['Primero', 'Fecha_Primero', 'Posicion_Primero', 'Division_Primera']:
+        combinado[columna] = combinado[columna].where(hay_previo, combinado[f'{columna}_nuevo'])
+    for columna in ['Ultimo', 'Fecha_Ultimo', 'Division_Ultima']:
+        combinado[columna] = combinado[f'{columna}_nuevo'].where(hay_nuevo, combinado[columna])
+    return combinado[claves + COLUMNAS_VALORES]
+
+
+def _leer_archivo(ruta):
+    return pd.read_csv(ruta, dtype={'Producto': str, 'Division_Primera': str, 'Division_Ultima': str,
+                                    'Fecha_Primero': str, 'Fecha_Ultimo': str})
+
+
+def _escribir_archivo(df, ruta):
+    temporal = ruta + ".tmp"
+    df.to_csv(temporal, index=False)
+    os.replace(temporal, ruta)
+
+
+def actualizar_agregados(df_filas, directorio=DIRECTORIO_AGREGADOS):
+    """
+    Incorpora filas nuevas del historial de productos a los agregados semanales y mensuales.
+
+    Solo se leen y reescriben los archivos de los períodos que aparecen en las
+    filas nuevas, así que el costo depende del tamaño de la canasta y no de la
+    longitud del historial. Las filas deben ser posteriores a las ya agregadas.
+
+    Args:
+        df_filas: DataFrame con columnas Fecha, Producto, Division y Precio
+    """
+    if df_filas.empty:
+        return
+    os.makedirs(directorio, exist_ok=True)
+    df = df_filas[['Fecha', 'Producto', 'Division', 'Precio']].reset_index(drop=True)
+    df['Precio'] = pd.to_numeric(df['Precio'], errors='coerce')
+    df['Posicion'] = np.arange(len(df))
+    df = _agregar_periodos(df)
+
+    for tipo, (columna_año, numero) in PERIODOS.items():
+        filas = df[['Fecha', 'Producto', 'Division', 'Precio', 'Posicion', numero]].assign(Año=df[columna_año])
+        if DIVISIONES_AGREGADAS[tipo] is not None:
+            filas = filas[filas['Division'].isin(DIVISIONES_AGREGADAS[tipo])]
+        claves = ['Producto', 'Año', numero]
+        for (año, valor), filas_periodo in filas.groupby(['Año', numero], sort=True):
+            ruta = os.path.join(directorio, _nombre_archivo(tipo, int(año), int(valor)))
+            existentes = _leer_archivo(ruta) if os.path.exists(ruta) else pd.DataFrame()
+            nuevos = _resumir(filas_periodo, claves)
+            _escribir_archivo(_combinar(existentes, nuevos, claves), ruta)
+
+
+def existen_agregados(directorio=DIRECTORIO_AGREGADOS):
+    """Indica si ya hay agregados guardados."""
+    return bool(glob.glob(os.path.join(directorio, "*.csv")))
+
+
+def reconstruir_agregados(df_historial, directorio=DIRECTORIO_AGREGADOS):
+    """Reconstruye todos los agregados desde el historial completo de productos."""
+    for ruta in glob.glob(os.path.join(directorio, "*.csv")):
+        os.remove(ruta)
+    df = df_historial.dropna(subset=['Fecha', 'Producto'])
+    actualizar_agregados(df.sort_values('Fecha', kind='stable'), directorio)
+
+
+def leer_agregados(tipo, desde=None, directorio=DIRECTORIO_AGREGADOS):
+    """
+    Lee los agregados de un tipo ('semanal' o 'mensual').
+
+    Con el backend "sqlite" los agregados se calculan directamente en la base
+    (ver almacen_sqlite.leer_agregados_sqlite) en lugar de leerse de archivos.
+
+    Args:
+        desde: Fecha desde la que interesan los períodos, o None para todos
+    """
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        from almacen_sqlite import leer_agregados_sqlite
+        return leer_agregados_sqlite(tipo, desde, DIVISIONES_AGREGADAS[tipo])
+
+    numero = PERIODOS[tipo][1]
+    limite = None
+    if desde is not None:
+        desde = pd.Timestamp(desde)
+        if tipo == "semanal":
+            calendario = desde.isocalendar()
+            limite = (calendario[0], calendario[1])
+        else:
+            limite = (desde.year, desde.month)
+
+    partes = []
+    for nombre in sorted(os.listdir(directorio)) if os.path.isdir(directorio) else []:
+        coincidencia = PATRON_ARCHIVO.match(nombre)
+        if not coincidencia or coincidencia.group(1) != tipo:
+            continue
+        if limite is not None and (int(coincidencia.group(2)), int(coincidencia.group(3))) < limite:
+            continue
+        partes.append(_leer_archivo(os.path.join(directorio, nombre)))
+
+    if not partes:
+        return pd.DataFrame(columns=['Producto', 'Año', numero] + COLUMNAS_VALORES)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _promedio(agregados):
+    return (agregados['Suma'] / agregados['Cantidad']).where(agregados['Cantidad'] > 0)
+
+
+def variacion_semanal_desde_agregados(desde=None, directorio=DIRECTORIO_AGREGADOS):
+    """Calcula la variación semanal (como calcular_variacion_semanal) a partir de los agregados."""
+    semanal = leer_agregados("semanal", desde, directorio)
+    promedios_semanales = pd.DataFrame({
+        'Producto': semanal['Producto'],
+        'Año': semanal['Año'],
+        'Semana': semanal['Semana'],
+        'Precio': _promedio(semanal),
+    })
+    return variaciones_entre_semanas(promedios_semanales)
+
+
+def mensual_desde_agregados(desde=None, directorio=DIRECTORIO_AGREGADOS):
+    """
+    Arma, a partir de los agregados mensuales, el mismo DataFrame que
+    utils.calcular_variaciones_mensuales (solo divisiones de alimentos), para
+    pasarlo como 'mensual' a las funciones de variación mensual.
+    """
+    mensual = leer_agregados("mensual", desde, directorio).copy()
+    mensual['Periodo'] = mensual['Año'].astype('int64') * 12 + mensual['Mes'].astype('int64') - 1
+    mensual['Precio_Promedio'] = _promedio(mensual)
+
+    anterior = mensual[['Producto', 'Periodo', 'Filas', 'Precio_Promedio']].rename(
+        columns={'Filas': 'Filas_Anterior', 'Precio_Promedio': 'Precio_Promedio_Anterior'}
+    )
+    anterior['Periodo'] = anterior['Periodo'] + 1
+    mensual = mensual.merge(anterior, on=['Producto', 'Periodo'], how='left')
+    mensual = mensual.sort_values(['Fecha_Primero', 'Posicion_Primero'], kind='stable', ignore_index=True)
+    mensual['Orden'] = np.arange(len(mensual))
+
+    return mensual.rename(columns={
+        'Primero': 'Precio_Primer_Dia',
+        'Ultimo': 'Precio_Ultimo_Dia',
+    })[[
+        'Producto', 'Año', 'Mes', 'Division_Primera', 'Division_Ultima', 'Filas',
+        'Precio_Primer_Dia', 'Precio_Ultimo_Dia', 'Precio_Promedio', 'Filas_Anterior',
+        'Precio_Promedio_Anterior', 'Orden'
+    ]]
@@ -0,0 +1,312 @@
+import os
+import re
+import glob
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    BACKEND_ALMACENAMIENTO,
+    DIRECTORIO_HISTORIAL,
+    COMPRESION_HISTORIAL
+)
+
+# pyarrow es opcional (no está en requirements.txt): sin él, las particiones
+# se guardan como CSV comprimidos con gzip (.csv.gz)
+try:
+    import pyarrow  # noqa: F401
+    FORMATO_PARTICIONES = "parquet"
+except ImportError:
+    FORMATO_PARTICIONES = "csv"
+
+# Columnas de cada tabla del historial, en el orden en que se guardan
+COLUMNAS_RESUMEN = ['Fecha', 'Total_Canasta', 'Variacion_Total', 'Porcentaje_Total', 'IPC_General']
+COLUMNAS_DIVISIONES = ['Fecha', 'Division', 'Total', 'Variacion', 'Porcentaje', 'IPC']
+COLUMNAS_PRODUCTOS = ['Fecha', 'Producto', 'Division', 'Precio', 'Variacion', 'Porcentaje']
+
+TABLAS = {
+    "resumen": COLUMNAS_RESUMEN,
+    "divisiones": COLUMNAS_DIVISIONES,
+    "productos": COLUMNAS_PRODUCTOS,
+}
+
+COLUMNAS_TEXTO = {'Fecha', 'Producto', 'Division'}
+COLUMNAS_CATEGORICAS = {'Producto', 'Division'}
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M'
+DECIMALES_FLOAT32 = 2  # Una columna pasa a float32 solo si sus valores tienen a lo sumo esta cantidad de decimales
+
+PATRON_CSV_MENSUAL = re.compile(r"^(resumen|divisiones|productos)_(\d{6})\.csv$")
+
+
+def normalizar_tabla(tabla, df):
+    """Ordena las columnas de una tabla y fuerza las numéricas a float."""
+    df = df.reindex(columns=TABLAS[tabla])
+    for columna in TABLAS[tabla]:
+        if columna not in COLUMNAS_TEXTO:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce').astype('float64')
+    return df
+
+
+def _a_fechas(serie):
+    """Convierte la columna Fecha a datetime64 con el formato de las corridas (o infiriéndolo si no coincide)."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    try:
+        return pd.to_datetime(serie, format=FORMATO_FECHA)
+    except ValueError:
+        return pd.to_datetime(serie, format='mixed')
+
+
+def _float32_seguro(serie):
+    """
+    Indica si la columna puede pasar a float32 sin perder información: sus
+    valores deben recuperarse exactamente redondeando a DECIMALES_FLOAT32 (como
+    los precios con centavos, pero no los porcentajes).
+    """
+    valores = serie.to_numpy(dtype='float64')
+    finitos = np.isfinite(valores)
+    compactos = valores[finitos].astype('float32').astype('float64')
+    return bool(np.array_equal(valores[finitos], np.round(compactos, DECIMALES_FLOAT32)))
+
+
+def a_float64(serie):
+    """
+    Convierte una columna numérica a float64 para operar con ella.
+
+    Si estaba en float32 (ver compactar_tabla) se redondea a DECIMALES_FLOAT32,
+    lo que recupera exactamente los valores originales, para que promedios y
+    diferencias den lo mismo que con la carga estándar.
+    """
+    if serie.dtype == 'float32':
+        return serie.astype('float64').round(DECIMALES_FLOAT32)
+    return pd.to_numeric(serie, errors='coerce')
+
+
+def compactar_tabla(tabla, df):
+    """
+    Convierte una tabla del historial a tipos compactos.
+
+    Fecha pasa a datetime64, Producto y Division a categorías (con las
+    categorías ordenadas, así que ordenar y agrupar da el mismo orden que con
+    texto) y las columnas numéricas a float32 cuando no se pierde información
+    (ver _float32_seguro).
+    """
+    df = df.reindex(columns=[c for c in TABLAS[tabla] if c in df.columns])
+    for columna in df.columns:
+        if columna == 'Fecha':
+            df[columna] = _a_fechas(df[columna])
+        elif columna in COLUMNAS_CATEGORICAS:
+            df[columna] = df[columna].astype('category')
+        else:
+            valores = pd.to_numeric(df[columna], errors='coerce').astype('float64')
+            df[columna] = valores.astype('float32') if _float32_seguro(valores) else valores
+    return df
+
+
+def memoria_tablas(*tablas):
+    """Devuelve los bytes que ocupan en memoria las tablas (incluyendo el contenido de los textos)."""
+    return int(sum(df.memory_usage(deep=True).sum() for df in tablas))
+
+
+def anexar_csv_mensual(tabla, df, mes):
+    """Agrega filas al final del CSV mensual de una tabla sin reescribir lo anterior."""
+    ruta = f"{tabla}_{mes}.csv"
+    escribir_encabezado = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+    normalizar_tabla(tabla, df).to_csv(ruta, mode='a', header=escribir_encabezado, index=False)
+
+
+def _directorio_particion(tabla, mes, directorio=DIRECTORIO_HISTORIAL):
+    return os.path.join(directorio, tabla, f"mes={mes}")
+
+
+def _escribir_particion(df, ruta):
+    """Escribe un archivo de partición de forma atómica (archivo temporal + rename)."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + ".tmp"
+    if FORMATO_PARTICIONES == "parquet":
+        df.to_parquet(temporal, index=False, compression=COMPRESION_HISTORIAL)
+    else:
+        df.to_csv(temporal, index=False, compression="gzip" if COMPRESION_HISTORIAL else None)
+    os.replace(temporal, ruta)
+
+
+def _extension():
+    if FORMATO_PARTICIONES == "parquet":
+        return ".parquet"
+    return ".csv.gz" if COMPRESION_HISTORIAL else ".csv"
+
+
+def agregar_corrida(fecha, tablas, directorio=DIRECTORIO_HISTORIAL):
+    """
+    Guarda las filas de una corrida como particiones nuevas del historial.
+
+    Args:
+        fecha: Fecha de la corrida con formato '%Y-%m-%d %H:%M'
+        tablas: Diccionario tabla -> DataFrame con las filas nuevas
+        directorio: Directorio raíz del historial particionado
+
+    Returns:
+        Lista de rutas escritas
+    """
+    momento = datetime.strptime(fecha, '%Y-%m-%d %H:%M')
+    mes = momento.strftime('%Y%m')
+    rutas = []
+    for tabla, df in tablas.items():
+        if df.empty:
+            continue
+        carpeta = _directorio_particion(tabla, mes, directorio)
+        nombre = momento.strftime('%Y%m%d_%H%M')
+        ruta = os.path.join(carpeta, nombre + _extension())
+        sufijo = 1
+        while os.path.exists(ruta):
+            ruta = os.path.join(carpeta, f"{nombre}_{sufijo}{_extension()}")
+            sufijo += 1
+        _escribir_particion(normalizar_tabla(tabla, df), ruta)
+        rutas.append(ruta)
+    return rutas
+
+
+def guardar_corrida(fecha, tablas):
+    """
+    Persiste las filas nuevas de una corrida según BACKEND_ALMACENAMIENTO,
+    siempre agregando datos y nunca reescribiendo el historial previo.
+    """
+    if BACKEND_ALMACENAMIENTO == "particionado":
+        mes = datetime.strptime(fecha, '%Y-%m-%d %H:%M').strftime('%Y%m')
+        abre_mes = mes not in meses_disponibles("resumen")
+        rutas = agregar_corrida(fecha, tablas)
+        if abre_mes:
+            # La primera corrida del mes cierra los anteriores: sus particiones por corrida se unen en un archivo
+            compactar_meses_cerrados(mes)
+        return rutas
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        from almacen_sqlite import guardar_corrida_sqlite
+        return guardar_corrida_sqlite(fecha, tablas)
+
+    mes = datetime.strptime(fecha, '%Y-%m-%d %H:%M').strftime('%Y%m')
+    for tabla, df in tablas.items():
+        anexar_csv_mensual(tabla, df, mes)
+    return [f"{tabla}_{mes}.csv" for tabla in tablas]
+
+
+def meses_disponibles(tabla, directorio=DIRECTORIO_HISTORIAL):
+    """Devuelve los meses (YYYYMM) que tienen particiones para la tabla, ordenados."""
+    carpetas = glob.glob(os.path.join(directorio, tabla, "mes=*"))
+    return sorted(os.path.basename(c)[4:] for c in carpetas)
+
+
+def _archivos_particion(tabla, mes, directorio=DIRECTORIO_HISTORIAL):
+    # Los nombres empiezan con YYYYMMDD_HHMM, así que el orden alfabético es el cronológico
+    carpeta = _directorio_particion(tabla, mes, directorio)
+    archivos = [
+        ruta for ruta in glob.glob(os.path.join(carpeta, "*"))
+        if ruta.endswith((".parquet", ".csv", ".csv.gz"))
+    ]
+    return sorted(archivos)
+
+
+def _leer_archivo(ruta, columnas=None):
+    if ruta.endswith(".parquet"):
+        return pd.read_parquet(ruta, columns=columnas)
+    return pd.read_csv(ruta, usecols=columnas)
+
+
+def _leer_bloques(ruta, columnas, tamano_bloque):
+    """Lee un archivo de partición de a lo sumo tamano_bloque filas por vez."""
+    if ruta.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=tamano_bloque, columns=columnas):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, usecols=columnas, chunksize=tamano_bloque)
+
+
+def iterar_particiones(tabla, desde=None, hasta=None, columnas=None, directorio=DIRECTORIO_HISTORIAL, tamano_bloque=None):
+    """
+    Recorre en orden cronológico los archivos de partición de una tabla, uno por
+    vez, o en bloques de a lo sumo tamano_bloque filas si se indica (así un mes
+    compactado tampoco se lee entero).
+    """
+    columnas = columnas or TABLAS[tabla]
+    for mes in meses_disponibles(tabla, directorio):
+        if (desde and mes < desde) or (hasta and mes > hasta):
+            continue
+        for ruta in _archivos_particion(tabla, mes, directorio):
+            if tamano_bloque is None:
+                yield _leer_archivo(ruta, columnas)
+            else:
+                yield from _leer_bloques(ruta, columnas, tamano_bloque)
+
+
+def leer_tabla(tabla, desde=None, hasta=None, columnas=None, directorio=DIRECTORIO_HISTORIAL):
+    """
+    Lee una tabla del historial particionado como un único DataFrame.
+
+    Args:
+        tabla: 'resumen', 'divisiones' o 'productos'
+        desde: Mes inicial inclusive (YYYYMM), o None para no acotar
+        hasta: Mes final inclusive (YYYYMM), o None para no acotar
+        columnas: Columnas a leer, o None para todas
+
+    Returns:
+        DataFrame con las filas de todas las particiones en orden cronológico
+    """
+    columnas = columnas or TABLAS[tabla]
+    partes = list(iterar_particiones(tabla, desde, hasta, columnas, directorio))
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    return pd.concat(partes, ignore_index=True)
+
+
+def compactar_mes(tabla, mes, directorio=DIRECTORIO_HISTORIAL):
+    """Une en un único archivo las particiones por corrida de un mes ya cerrado."""
+    archivos = _archivos_particion(tabla, mes, directorio)
+    if len(archivos) <= 1:
+        return
+    df = pd.concat([_leer_archivo(ruta) for ruta in archivos], ignore_index=True)
+    destino = os.path.join(_directorio_particion(tabla, mes, directorio), f"{mes}00_0000_compactado{_extension()}")
+    _escribir_particion(normalizar_tabla(tabla, df), destino)
+    for ruta in archivos:
+        if ruta != destino:
+            os.remove(ruta)
+
+
+def compactar_meses_cerrados(mes_actual, directorio=DIRECTORIO_HISTORIAL):
+    """Compacta (ver compactar_mes) todos los meses anteriores a mes_actual (YYYYMM) de cada tabla."""
+    for tabla in TABLAS:
+        for mes in meses_disponibles(tabla, directorio):
+            if mes < mes_actual:
+                compactar_mes(tabla, mes, directorio)
+
+
+def importar_csvs(directorio_csv=".", directorio=DIRECTORIO_HISTORIAL):
+    """
+    Convierte los CSV mensuales existentes (resumen_, divisiones_ y productos_YYYYMM.csv)
+    en particiones del historial. Los meses que ya tienen particiones se omiten.
+
+    Returns:
+        Lista de rutas escritas
+    """
+    rutas = []
+    for nombre in sorted(os.listdir(directorio_csv)):
+        coincidencia = PATRON_CSV_MENSUAL.match(nombre)
+        if not coincidencia:
+            continue
+        tabla, mes = coincidencia.groups()
+        if _archivos_particion(tabla, mes, directorio):
+            print(f"Se omite {nombre}: el mes {mes} ya está en el historial.")
+            continue
+        df = pd.read_csv(os.path.join(directorio_csv, nombre))
+        if df.empty:
+            continue
+        ruta = os.path.join(_directorio_particion(tabla, mes, directorio), f"{mes}00_0000_importado{_extension()}")
+        _escribir_particion(normalizar_tabla(tabla, df), ruta)
+        rutas.append(ruta)
+        print(f"Importado {nombre} -> {ruta} ({len(df)} filas)")
+    return rutas
+
+
+if __name__ == "__main__":
+    importar_csvs()
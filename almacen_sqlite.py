@@ -0,0 +1,459 @@
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from config import ARCHIVO_SQLITE, DIRECTORIO_HISTORIAL
+from almacen import (
+    TABLAS,
+    COLUMNAS_TEXTO,
+    FORMATO_FECHA,
+    PATRON_CSV_MENSUAL,
+    normalizar_tabla,
+    meses_disponibles,
+    leer_tabla
+)
+
+# Las corridas se numeran en orden cronológico, así que un rango de fechas se
+# resuelve como un rango de ids de corrida sobre el índice de corridas(fecha) y
+# las filas de precios y divisiones salen del índice por corrida_id ya ordenadas.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS divisiones (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS corridas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    total_canasta REAL,
+    variacion_total REAL,
+    porcentaje_total REAL,
+    ipc_general REAL
+);
+CREATE TABLE IF NOT EXISTS precios (
+    id INTEGER PRIMARY KEY,
+    corrida_id INTEGER NOT NULL REFERENCES corridas(id),
+    fecha TEXT NOT NULL,
+    producto_id INTEGER NOT NULL REFERENCES productos(id),
+    division_id INTEGER REFERENCES divisiones(id),
+    precio REAL,
+    variacion REAL,
+    porcentaje REAL
+);
+CREATE TABLE IF NOT EXISTS totales_division (
+    id INTEGER PRIMARY KEY,
+    corrida_id INTEGER NOT NULL REFERENCES corridas(id),
+    fecha TEXT NOT NULL,
+    division_id INTEGER NOT NULL REFERENCES divisiones(id),
+    total REAL,
+    variacion REAL,
+    porcentaje REAL,
+    ipc REAL
+);
+CREATE INDEX IF NOT EXISTS corridas_fecha ON corridas(fecha);
+CREATE INDEX IF NOT EXISTS precios_producto_fecha ON precios(producto_id, fecha);
+CREATE INDEX IF NOT EXISTS precios_corrida ON precios(corrida_id);
+CREATE INDEX IF NOT EXISTS totales_division_fecha ON totales_division(division_id, fecha);
+CREATE INDEX IF NOT EXISTS totales_division_corrida ON totales_division(corrida_id);
+"""
+
+TABLAS_ESQUEMA = {"productos", "divisiones", "corridas", "precios", "totales_division"}
+
+# Expresión SQL de cada columna de las tablas del historial
+COLUMNAS_SQL = {
+    "resumen": {
+        'Fecha': "c.fecha",
+        'Total_Canasta': "c.total_canasta",
+        'Variacion_Total': "c.variacion_total",
+        'Porcentaje_Total': "c.porcentaje_total",
+        'IPC_General': "c.ipc_general",
+    },
+    "divisiones": {
+        'Fecha': "t.fecha",
+        'Division': "d.nombre",
+        'Total': "t.total",
+        'Variacion': "t.variacion",
+        'Porcentaje': "t.porcentaje",
+        'IPC': "t.ipc",
+    },
+    "productos": {
+        'Fecha': "p.fecha",
+        'Producto': "pr.nombre",
+        'Division': "d.nombre",
+        'Precio': "p.precio",
+        'Variacion': "p.variacion",
+        'Porcentaje': "p.porcentaje",
+    },
+}
+
+# Origen de cada tabla, columna con la corrida de cada fila y columna que identifica una serie
+ORIGENES_SQL = {
+    "resumen": ("corridas c", "c.id", None),
+    "divisiones": ("totales_division t JOIN divisiones d ON d.id = t.division_id", "t.corrida_id", "d.nombre"),
+    "productos": (
+        "precios p JOIN productos pr ON pr.id = p.producto_id LEFT JOIN divisiones d ON d.id = p.division_id",
+        "p.corrida_id",
+        "pr.nombre"
+    ),
+}
+
+# Año y número de período de cada tipo de agregado (como agregados.PERIODOS; la
+# semana ISO se toma del jueves de la semana de cada fecha)
+_JUEVES = "date(p.fecha, '-3 days', 'weekday 4')"
+PERIODOS_SQL = {
+    "semanal": ('Semana', f"CAST(strftime('%Y', {_JUEVES}) AS INTEGER)",
+                f"(CAST(strftime('%j', {_JUEVES}) AS INTEGER) - 1) / 7 + 1"),
+    "mensual": ('Mes', "CAST(substr(p.fecha, 1, 4) AS INTEGER)", "CAST(substr(p.fecha, 6, 2) AS INTEGER)"),
+}
+
+# Columnas de leer_agregados_sqlite, salvo la del número de período ('Semana' o 'Mes')
+COLUMNAS_AGREGADOS_SQL = [
+    "Producto", "Año", "Suma", "Cantidad", "Filas", "Primero", "Fecha_Primero", "Posicion_Primero",
+    "Division_Primera", "Ultimo", "Fecha_Ultimo", "Division_Ultima"
+]
+
+
+def conectar(ruta=ARCHIVO_SQLITE):
+    """Abre la base del historial en modo WAL, creando las tablas e índices si no existen."""
+    conexion = sqlite3.connect(ruta)
+    # WAL permite leer (reportes, servicio de consultas) mientras se guarda una
+    # corrida; con WAL, synchronous=NORMAL sigue siendo seguro ante cortes
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+
+@contextmanager
+def conectar_lectura(ruta=ARCHIVO_SQLITE):
+    """
+    Abre la base solo para lectura, sin crearla (a diferencia de conectar).
+
+    Entrega None si la base no existe o todavía no tiene el esquema, para que
+    las lecturas devuelvan un resultado vacío.
+    """
+    try:
+        conexion = sqlite3.connect(Path(ruta).resolve().as_uri() + "?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        yield None
+        return
+    with closing(conexion):
+        try:
+            tablas = {nombre for (nombre,) in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        except sqlite3.DatabaseError:
+            # Un archivo que no es una base SQLite
+            tablas = set()
+        yield conexion if TABLAS_ESQUEMA <= tablas else None
+
+
+def _preparar(tabla, df):
+    """Normaliza una tabla a guardar, con la fecha como texto '%Y-%m-%d %H:%M'."""
+    df = normalizar_tabla(tabla, df).dropna(subset=['Fecha'])
+    if pd.api.types.is_datetime64_any_dtype(df['Fecha']):
+        return df.assign(Fecha=df['Fecha'].dt.strftime(FORMATO_FECHA))
+    return df.assign(Fecha=df['Fecha'].astype(str))
+
+
+def _filas(df, columnas):
+    """Filas del DataFrame como tuplas, con None en lugar de NaN."""
+    df = df[columnas].astype(object)
+    return list(df.where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def _ids_catalogo(conexion, catalogo, nombres):
+    """Da de alta los nombres nuevos en 'productos' o 'divisiones' y devuelve el id de cada nombre."""
+    nombres = [n for n in pd.unique(nombres) if isinstance(n, str)]
+    conexion.executemany(f"INSERT OR IGNORE INTO {catalogo} (nombre) VALUES (?)", [(n,) for n in nombres])
+    return {nombre: id_ for id_, nombre in conexion.execute(f"SELECT id, nombre FROM {catalogo}")}
+
+
+def _insertar(conexion, tablas):
+    """
+    Inserta las filas de una o varias corridas, en orden cronológico, con una
+    sentencia por tabla. Cada fecha distinta es una corrida; si no tiene fila en
+    el resumen se registra con los totales vacíos.
+    """
+    tablas = {tabla: _preparar(tabla, tablas.get(tabla, pd.DataFrame())) for tabla in TABLAS}
+    resumen = tablas["resumen"].drop_duplicates(subset='Fecha', keep='last').set_index('Fecha')
+    fechas = sorted(set().union(*(df['Fecha'] for df in tablas.values())))
+    if not fechas:
+        return 0
+
+    corridas = resumen.reindex(fechas).reset_index()
+    ultimo_id = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM corridas").fetchone()[0]
+    conexion.executemany(
+        "INSERT INTO corridas (fecha, total_canasta, variacion_total, porcentaje_total, ipc_general) VALUES (?, ?, ?, ?, ?)",
+        _filas(corridas, TABLAS["resumen"])
+    )
+    ids_corridas = {
+        fecha: id_ for id_, fecha in conexion.execute("SELECT id, fecha FROM corridas WHERE id > ?", (ultimo_id,))
+    }
+
+    divisiones, productos = tablas["divisiones"], tablas["productos"]
+    ids_divisiones = _ids_catalogo(conexion, "divisiones", pd.concat([divisiones['Division'], productos['Division']]))
+    ids_productos = _ids_catalogo(conexion, "productos", productos['Producto'])
+
+    divisiones = divisiones.dropna(subset=['Division']).assign(
+        Corrida=lambda df: df['Fecha'].map(ids_corridas),
+        Division=lambda df: df['Division'].map(ids_divisiones)
+    )
+    conexion.executemany(
+        "INSERT INTO totales_division (corrida_id, fecha, division_id, total, variacion, porcentaje, ipc) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        _filas(divisiones, ['Corrida', 'Fecha', 'Division', 'Total', 'Variacion', 'Porcentaje', 'IPC'])
+    )
+    productos = productos.dropna(subset=['Producto']).assign(
+        Corrida=lambda df: df['Fecha'].map(ids_corridas),
+        Producto=lambda df: df['Producto'].map(ids_productos),
+        Division=lambda df: df['Division'].map(ids_divisiones)
+    )
+    conexion.executemany(
+        "INSERT INTO precios (corrida_id, fecha, producto_id, division_id, precio, variacion, porcentaje) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        _filas(productos, ['Corrida', 'Fecha', 'Producto', 'Division', 'Precio', 'Variacion', 'Porcentaje'])
+    )
+    return len(fechas)
+
+
+def guardar_corrida_sqlite(fecha, tablas, ruta=ARCHIVO_SQLITE):
+    """
+    Guarda las filas de una corrida en la base, en una única transacción.
+
+    Args:
+        fecha: Fecha de la corrida con formato '%Y-%m-%d %H:%M'
+        tablas: Diccionario tabla -> DataFrame con las filas nuevas
+
+    Returns:
+        Lista con la ruta de la base
+    """
+    with closing(conectar(ruta)) as conexion, conexion:
+        _insertar(conexion, tablas)
+    return [ruta]
+
+
+def _rango_corridas(conexion, inicio=None, fin=None):
+    """Primer y último id de las corridas con fecha entre inicio y fin (textos '%Y-%m-%d %H:%M', inclusive)."""
+    condiciones, parametros = [], []
+    if inicio is not None:
+        condiciones.append("fecha >= ?")
+        parametros.append(inicio)
+    if fin is not None:
+        condiciones.append("fecha <= ?")
+        parametros.append(fin)
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return conexion.execute(f"SELECT MIN(id), MAX(id) FROM corridas {donde}", parametros).fetchone()
+
+
+def _tipar(tabla, df):
+    """Textos como str y números como float64, igual que historial.cargar_historial con los CSV."""
+    for columna in df.columns:
+        if columna not in COLUMNAS_TEXTO:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce').astype('float64')
+    return df
+
+
+def _consulta_tabla(conexion, tabla, inicio, fin, columnas, nombre):
+    origen, columna_corrida, columna_nombre = ORIGENES_SQL[tabla]
+    expresiones = ", ".join(f'{COLUMNAS_SQL[tabla][c]} AS "{c}"' for c in columnas)
+    primera, ultima = _rango_corridas(conexion, inicio, fin)
+    condiciones = [f"{columna_corrida} BETWEEN ? AND ?"]
+    parametros = [primera, ultima]
+    if nombre is not None:
+        # Con un nombre, el rango se recorre sobre el índice (producto|división, fecha)
+        condiciones = [f"{columna_nombre} = ?"]
+        parametros = [nombre]
+        if inicio is not None:
+            condiciones.append(f"{COLUMNAS_SQL[tabla]['Fecha']} >= ?")
+            parametros.append(inicio)
+        if fin is not None:
+            condiciones.append(f"{COLUMNAS_SQL[tabla]['Fecha']} <= ?")
+            parametros.append(fin)
+    orden = f"{COLUMNAS_SQL[tabla]['Fecha']}, {columna_corrida}" if nombre is not None else columna_corrida
+    sql = f"SELECT {expresiones} FROM {origen} WHERE {' AND '.join(condiciones)} ORDER BY {orden}"
+    return sql, parametros
+
+
+def _bloques_tabla(ruta, tabla, inicio, fin, columnas, nombre, tamano_bloque):
+    with conectar_lectura(ruta) as conexion:
+        if conexion is None:
+            return
+        sql, parametros = _consulta_tabla(conexion, tabla, inicio, fin, columnas, nombre)
+        for bloque in pd.read_sql_query(sql, conexion, params=parametros, chunksize=tamano_bloque):
+            yield _tipar(tabla, bloque)
+
+
+def leer_tabla_sqlite(tabla, inicio=None, fin=None, columnas=None, tamano_bloque=None, nombre=None,
+                      ruta=ARCHIVO_SQLITE):
+    """
+    Lee una tabla del historial guardado en la base.
+
+    Args:
+        tabla: 'resumen', 'divisiones' o 'productos'
+        inicio: Fecha inicial inclusive ('%Y-%m-%d %H:%M'), o None para no acotar
+        fin: Fecha final inclusive ('%Y-%m-%d %H:%M'), o None para no acotar
+        columnas: Columnas a leer, o None para todas
+        tamano_bloque: Si se indica, devuelve un iterador de DataFrames de a lo sumo
+            esa cantidad de filas en lugar de un único DataFrame
+        nombre: Producto o división cuya serie se lee, o None para todas las filas
+
+    Returns:
+        DataFrame con las filas en orden cronológico, o un iterador de DataFrames
+        (vacíos si la base no existe)
+    """
+    columnas = list(columnas or TABLAS[tabla])
+    if tamano_bloque is not None:
+        return _bloques_tabla(ruta, tabla, inicio, fin, columnas, nombre, tamano_bloque)
+    with conectar_lectura(ruta) as conexion:
+        if conexion is None:
+            return _tipar(tabla, pd.DataFrame(columns=columnas))
+        sql, parametros = _consulta_tabla(conexion, tabla, inicio, fin, columnas, nombre)
+        return _tipar(tabla, pd.read_sql_query(sql, conexion, params=parametros))
+
+
+def meses_sqlite(ruta=ARCHIVO_SQLITE):
+    """Devuelve los meses (YYYYMM) con corridas guardadas, ordenados."""
+    with conectar_lectura(ruta) as conexion:
+        if conexion is None:
+            return []
+        filas = conexion.execute(
+            "SELECT DISTINCT substr(fecha, 1, 4) || substr(fecha, 6, 2) FROM corridas ORDER BY 1"
+        ).fetchall()
+    return [mes for (mes,) in filas]
+
+
+def precios_en_dia(dia, ruta=ARCHIVO_SQLITE):
+    """
+    Devuelve el primer precio de cada producto en el día 'YYYY-MM-DD' (como
+    IndicePrecios.precio_en_fecha, pero sin límite de antigüedad).
+
+    Returns:
+        Diccionario producto -> precio, solo con los productos con precio ese día
+    """
+    with conectar_lectura(ruta) as conexion:
+        if conexion is None:
+            return {}
+        primera, ultima = _rango_corridas(conexion, f"{dia} 00:00", f"{dia} 23:59")
+        filas = conexion.execute(
+            """
+            SELECT pr.nombre, p.precio
+            FROM precios p JOIN productos pr ON pr.id = p.producto_id
+            WHERE p.id IN (
+                SELECT MIN(id) FROM precios
+                WHERE corrida_id BETWEEN ? AND ? AND precio IS NOT NULL
+                GROUP BY producto_id
+            )
+            """,
+            (primera, ultima)
+        ).fetchall()
+    return dict(filas)
+
+
+def _inicio_periodo(tipo, desde):
+    """Fecha de comienzo de la semana (lunes) o del mes que contiene 'desde'."""
+    desde = pd.Timestamp(desde).normalize()
+    if tipo == "semanal":
+        return desde - pd.Timedelta(days=desde.weekday())
+    return desde.replace(day=1)
+
+
+def leer_agregados_sqlite(tipo, desde=None, divisiones=None, ruta=ARCHIVO_SQLITE):
+    """
+    Calcula en la base los agregados de un tipo ('semanal' o 'mensual'), con
+    las mismas columnas que agregados.leer_agregados.
+
+    Args:
+        desde: Fecha desde la que interesan los períodos, o None para todos
+        divisiones: Si se indican, solo se agregan las filas de esas divisiones
+    """
+    numero, expresion_año, expresion_numero = PERIODOS_SQL[tipo]
+    inicio = _inicio_periodo(tipo, desde).strftime(FORMATO_FECHA) if desde is not None else None
+    filtro_divisiones = ""
+    if divisiones is not None:
+        filtro_divisiones = (
+            "AND p.division_id IN (SELECT id FROM divisiones WHERE nombre IN "
+            f"({', '.join('?' for _ in divisiones)}))"
+        )
+    sql = f"""
+        WITH filas AS (
+            SELECT p.id, p.producto_id, p.precio, {expresion_año} AS anio, {expresion_numero} AS numero
+            FROM precios p
+            WHERE p.corrida_id BETWEEN ? AND ? {filtro_divisiones}
+        ), grupos AS (
+            SELECT producto_id, anio, numero, TOTAL(precio) AS suma, COUNT(precio) AS cantidad,
+                   COUNT(*) AS filas, MIN(id) AS primero, MAX(id) AS ultimo
+            FROM filas
+            GROUP BY producto_id, anio, numero
+        )
+        SELECT pr.nombre AS "Producto", g.anio AS "Año", g.numero AS "{numero}",
+               g.suma AS "Suma", g.cantidad AS "Cantidad", g.filas AS "Filas",
+               p1.precio AS "Primero", p1.fecha AS "Fecha_Primero", p1.id AS "Posicion_Primero",
+               d1.nombre AS "Division_Primera",
+               p2.precio AS "Ultimo", p2.fecha AS "Fecha_Ultimo", d2.nombre AS "Division_Ultima"
+        FROM grupos g
+        JOIN productos pr ON pr.id = g.producto_id
+        JOIN precios p1 ON p1.id = g.primero
+        LEFT JOIN divisiones d1 ON d1.id = p1.division_id
+        JOIN precios p2 ON p2.id = g.ultimo
+        LEFT JOIN divisiones d2 ON d2.id = p2.division_id
+        ORDER BY g.anio, g.numero
+    """
+    with conectar_lectura(ruta) as conexion:
+        if conexion is None:
+            df = pd.DataFrame(columns=COLUMNAS_AGREGADOS_SQL[:2] + [numero] + COLUMNAS_AGREGADOS_SQL[2:])
+        else:
+            primera, ultima = _rango_corridas(conexion, inicio)
+            df = pd.read_sql_query(sql, conexion, params=(primera, ultima, *(divisiones or [])))
+    for columna in ['Suma', 'Primero', 'Ultimo']:
+        df[columna] = pd.to_numeric(df[columna], errors='coerce').astype('float64')
+    return df
+
+
+def importar_historial(directorio_csv=".", ruta=ARCHIVO_SQLITE):
+    """
+    Carga en una base vacía el historial existente: los CSV mensuales
+    (resumen_, divisiones_ y productos_YYYYMM.csv) o, para los meses que no los
+    tienen, las particiones de DIRECTORIO_HISTORIAL. Cada mes se inserta en una
+    transacción, en orden cronológico.
+
+    Returns:
+        Cantidad de corridas importadas
+    """
+    with closing(conectar(ruta)) as conexion:
+        if conexion.execute("SELECT 1 FROM corridas LIMIT 1").fetchone():
+            print(f"Se omite la importación: {ruta} ya tiene corridas.")
+            return 0
+
+        archivos = {}
+        for nombre in os.listdir(directorio_csv):
+            coincidencia = PATRON_CSV_MENSUAL.match(nombre)
+            if coincidencia:
+                tabla, mes = coincidencia.groups()
+                archivos[(tabla, mes)] = os.path.join(directorio_csv, nombre)
+        meses = {mes for _, mes in archivos}
+        if os.path.isdir(DIRECTORIO_HISTORIAL):
+            meses.update(*(meses_disponibles(tabla) for tabla in TABLAS))
+
+        importadas = 0
+        for mes in sorted(meses):
+            tablas = {}
+            for tabla in TABLAS:
+                if (tabla, mes) in archivos:
+                    df = pd.read_csv(archivos[(tabla, mes)])
+                else:
+                    df = leer_tabla(tabla, desde=mes, hasta=mes)
+                tablas[tabla] = df.sort_values('Fecha', kind='stable')
+            with conexion:
+                corridas = _insertar(conexion, tablas)
+            importadas += corridas
+            print(f"Importado {mes}: {corridas} corridas")
+    return importadas
+
+
+if __name__ == "__main__":
+    importar_historial()
@@ -0,0 +1,367 @@
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import BACKEND_ALMACENAMIENTO
+from utils import calcular_variacion_semanal, calcular_variacion_mensual_intermensual, limpiar_precio
+from extraccion import ExtractorPrecios
+from generar_datos_sinteticos import generar_datos_sinteticos, generar_canasta_sintetica, generar_historial_sintetico
+from almacen import compactar_tabla, memoria_tablas
+from utils import calcular_variaciones_mensuales
+from motor_indices import MotorIndices
+
+ARCHIVO_ESCALADO = "benchmarks_escalado.csv"
+
+
+def _variacion_semanal_iterativa(df_productos):
+    """Implementación anterior (un recorrido por producto con iloc), como referencia."""
+    df_productos = df_productos.copy()
+    df_productos['Fecha'] = pd.to_datetime(df_productos['Fecha'])
+    df_productos['Año'] = df_productos['Fecha'].dt.isocalendar().year
+    df_productos['Semana'] = df_productos['Fecha'].dt.isocalendar().week
+    promedios_semanales = df_productos.groupby(['Producto', 'Año', 'Semana'])['Precio'].mean().reset_index()
+    promedios_semanales = promedios_semanales.sort_values(['Producto', 'Año', 'Semana'])
+
+    variaciones = []
+    for producto in promedios_semanales['Producto'].unique():
+        df_producto = promedios_semanales[promedios_semanales['Producto'] == producto]
+        for i in range(1, len(df_producto)):
+            precio_actual = df_producto.iloc[i]['Precio']
+            precio_anterior = df_producto.iloc[i-1]['Precio']
+            variacion = precio_actual - precio_anterior
+            porcentaje = (variacion / precio_anterior) * 100 if precio_anterior != 0 else 0
+            variaciones.append({
+                'Producto': producto,
+                'Semana_Actual': df_producto.iloc[i]['Semana'],
+                'Año_Actual': df_producto.iloc[i]['Año'],
+                'Precio_Promedio_Actual': precio_actual,
+                'Precio_Promedio_Anterior': precio_anterior,
+                'Variacion': variacion,
+                'Porcentaje': porcentaje
+            })
+    return pd.DataFrame(variaciones)
+
+
+def generar_historial_productos(cantidad_productos, dias, corridas_por_dia=1, semilla=0):
+    """Genera un historial sintético de precios con el formato de productos_YYYYMM.csv."""
+    rng = np.random.default_rng(semilla)
+    inicio = pd.Timestamp("2025-01-01 10:00")
+    fechas = [
+        (inicio + pd.Timedelta(days=d, hours=3 * c)).strftime('%Y-%m-%d %H:%M')
+        for d in range(dias) for c in range(corridas_por_dia)
+    ]
+    productos = [f"Producto {i}" for i in range(cantidad_productos)]
+    precios = rng.uniform(500, 5000, cantidad_productos) * np.cumprod(
+        1 + rng.normal(0.001, 0.01, (len(fechas), cantidad_productos)), axis=0
+    )
+    return pd.DataFrame({
+        'Fecha': np.repeat(fechas, cantidad_productos),
+        'Producto': np.tile(productos, len(fechas)),
+        'Division': 'Almacén',
+        'Precio': precios.ravel().round(2),
+        'Variacion': None,
+        'Porcentaje': None
+    })
+
+
+def _medir(funcion, *args, repeticiones=3):
+    """Devuelve el mejor tiempo (en segundos) de varias ejecuciones."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def benchmark_variacion_semanal(tamanos=((50, 30), (300, 90), (1000, 365), (3000, 365)), comparar_hasta=400_000):
+    """
+    Mide calcular_variacion_semanal para historiales de distinto tamaño.
+
+    Args:
+        tamanos: Pares (productos, días) a medir
+        comparar_hasta: Filas máximas para medir también la implementación iterativa
+
+    Returns:
+        DataFrame con filas, tiempos y aceleración por tamaño
+    """
+    resultados = []
+    for cantidad_productos, dias in tamanos:
+        df = generar_historial_productos(cantidad_productos, dias)
+        tiempo_vectorizado = _medir(calcular_variacion_semanal, df)
+        tiempo_iterativo = None
+        if len(df) <= comparar_hasta:
+            tiempo_iterativo = _medir(_variacion_semanal_iterativa, df, repeticiones=1)
+            pd.testing.assert_frame_equal(
+                calcular_variacion_semanal(df),
+                _variacion_semanal_iterativa(df),
+                check_dtype=False
+            )
+        resultados.append({
+            'Productos': cantidad_productos,
+            'Dias': dias,
+            'Filas': len(df),
+            'Vectorizado_s': tiempo_vectorizado,
+            'Iterativo_s': tiempo_iterativo,
+            'Aceleracion': tiempo_iterativo / tiempo_vectorizado if tiempo_iterativo else None
+        })
+    return pd.DataFrame(resultados)
+
+
+def generar_pagina_producto(selector_precio, precio="$ 1.234,56", relleno_kb=300):
+    """Genera una página HTML sintética con el precio dentro de un selector simple ('tag.clase' o 'tag#id')."""
+    etiqueta, _, resto = selector_precio.replace('#', '.#', 1).partition('.')
+    atributos = f'id="{resto[1:]}"' if resto.startswith('#') else f'class="{resto.replace(".", " ")}"'
+    bloque = '<div class="vtex-flex-layout"><span class="texto">Descripción del producto &amp; más</span></div>\n'
+    relleno = bloque * (relleno_kb * 1024 // len(bloque))
+    return (
+        f"<html><head><title>Producto</title></head><body>{relleno}"
+        f"<{etiqueta} {atributos}><span>{precio}</span></{etiqueta}>"
+        f"{relleno}</body></html>"
+    ).encode("utf-8")
+
+
+def benchmark_extraccion_html(selectores=('div#priceContainer', 'span.vtex-store-components-3-x-sellingPriceValue'), repeticiones=5):
+    """
+    Compara la extracción rápida de precios con el árbol completo de BeautifulSoup.
+
+    Returns:
+        DataFrame con el tiempo por página de cada estrategia
+    """
+    from bs4 import BeautifulSoup
+
+    extractor = ExtractorPrecios("benchmark", list(selectores))
+    resultados = []
+    for selector in selectores:
+        pagina = generar_pagina_producto(selector)
+
+        def con_bs4():
+            soup = BeautifulSoup(pagina, 'html.parser')
+            for candidato in selectores:
+                elemento = soup.select_one(candidato)
+                if elemento:
+                    return limpiar_precio(elemento.text)
+
+        assert extractor.extraer(pagina) == con_bs4() == 1234.56
+        tiempo_rapido = _medir(extractor.extraer, pagina, repeticiones=repeticiones)
+        tiempo_bs4 = _medir(con_bs4, repeticiones=repeticiones)
+        resultados.append({
+            'Selector': selector,
+            'KB': len(pagina) // 1024,
+            'Rapida_ms': tiempo_rapido * 1000,
+            'BS4_ms': tiempo_bs4 * 1000,
+            'Aceleracion': tiempo_bs4 / tiempo_rapido
+        })
+    return pd.DataFrame(resultados)
+
+
+def benchmark_memoria_historial(tamanos=((300, 31, 2), (1000, 31, 4), (3000, 31, 4)), repeticiones=3):
+    """
+    Compara la carga estándar del historial de productos con la carga compacta
+    (almacen.compactar_tabla): memoria ocupada y tiempo de las variaciones.
+
+    Args:
+        tamanos: Ternas (productos, días, corridas por día) a medir
+
+    Returns:
+        DataFrame con los MB y los tiempos de cada modo por tamaño
+    """
+    resultados = []
+    directorio_original = os.getcwd()
+    for cantidad_productos, dias, corridas_por_dia in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            os.chdir(directorio)
+            try:
+                generar_datos_sinteticos(cantidad_productos, dias, corridas_por_dia, fin=datetime.now())
+                rutas = sorted(f for f in os.listdir('.') if f.startswith('productos_'))
+                inicio = time.perf_counter()
+                estandar = pd.concat([pd.read_csv(ruta) for ruta in rutas], ignore_index=True)
+                tiempo_carga_estandar = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                compacto = compactar_tabla("productos", pd.concat(
+                    [pd.read_csv(ruta, dtype={'Producto': 'category', 'Division': 'category'}) for ruta in rutas],
+                    ignore_index=True
+                ))
+                tiempo_carga_compacto = time.perf_counter() - inicio
+            finally:
+                os.chdir(directorio_original)
+        resultados.append({
+            'Productos': cantidad_productos,
+            'Filas': len(estandar),
+            'MB_Estandar': memoria_tablas(estandar) / 1024 / 1024,
+            'MB_Compacto': memoria_tablas(compacto) / 1024 / 1024,
+            'Carga_Estandar_s': tiempo_carga_estandar,
+            'Carga_Compacto_s': tiempo_carga_compacto,
+            'Semanal_Estandar_s': _medir(calcular_variacion_semanal, estandar, repeticiones=repeticiones),
+            'Semanal_Compacto_s': _medir(calcular_variacion_semanal, compacto, repeticiones=repeticiones),
+            'Mensual_Estandar_s': _medir(calcular_variaciones_mensuales, estandar, repeticiones=repeticiones),
+            'Mensual_Compacto_s': _medir(calcular_variaciones_mensuales, compacto, repeticiones=repeticiones),
+        })
+    return pd.DataFrame(resultados)
+
+
+def benchmark_indices(tamanos=((300, 90), (1000, 365), (3000, 365)), repeticiones=3):
+    """
+    Mide MotorIndices: armado de la matriz productos × días y cálculo de los
+    índices de base fija y encadenados (Fisher) sobre todo el rango y sobre un mes.
+
+    Args:
+        tamanos: Pares (productos, días) a medir
+
+    Returns:
+        DataFrame con los tiempos de cada operación por tamaño
+    """
+    resultados = []
+    for cantidad_productos, dias in tamanos:
+        productos = generar_canasta_sintetica(cantidad_productos)
+        df_productos = generar_historial_sintetico(productos, dias, fin=datetime.now())[-1]
+        inicio = time.perf_counter()
+        motor = MotorIndices.desde_historial(df_productos, productos)
+        tiempo_armado = time.perf_counter() - inicio
+        desde_mes = motor.fechas[-1] - pd.Timedelta(days=30)
+        resultados.append({
+            'Productos': cantidad_productos,
+            'Dias': dias,
+            'Filas': len(df_productos),
+            'Armado_s': tiempo_armado,
+            'Base_Fija_ms': _medir(lambda: motor.indices(formula="fisher"), repeticiones=repeticiones) * 1000,
+            'Encadenado_ms': _medir(lambda: motor.encadenados(formula="fisher"), repeticiones=repeticiones) * 1000,
+            'Ultimo_Mes_ms': _medir(lambda: motor.encadenados(desde=desde_mes, formula="fisher"), repeticiones=repeticiones) * 1000,
+        })
+    return pd.DataFrame(resultados)
+
+
+def _version():
+    """Commit actual del repositorio, para identificar cada medición en la tabla de escalado."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _precios_ultima_corrida(productos, df_productos):
+    """Arma, desde la última corrida del historial, los valores que devuelve main.obtener_precios."""
+    ultima = df_productos[df_productos['Fecha'] == df_productos['Fecha'].iloc[-1]]
+    # Precio del historial: precio unitario por cantidad mensual, como lo guarda main.guardar_datos
+    precios_totales = dict(zip(ultima['Producto'], ultima['Precio']))
+    precios, precios_por_division, cantidades_por_division, total = {}, {}, {}, 0
+    for producto in productos:
+        precio_total = precios_totales.get(producto["nombre"])
+        if precio_total is None or pd.isna(precio_total):
+            continue
+        precio_total = float(precio_total)
+        precios[producto["nombre"]] = precio_total
+        precios_por_division.setdefault(producto["division"], []).append(precio_total)
+        cantidades_por_division.setdefault(producto["division"], []).append(producto["cantidad_mensual"])
+        total += precio_total
+    return precios, precios_por_division, cantidades_por_division, total
+
+
+def _medir_etapas(productos, df_productos, repeticiones):
+    """Mide cada etapa del procesamiento en el directorio actual, que debe contener el historial."""
+    import main
+    import resumen_pro_202506
+
+    precios, precios_por_division, cantidades_por_division, total = _precios_ultima_corrida(productos, df_productos)
+    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+    def guardar_datos():
+        main.guardar_datos(fecha_actual, total, 0.0, {}, precios_por_division, precios, productos)
+
+    # La primera corrida arma los agregados y el índice; se mide aparte del régimen estable
+    inicio = time.perf_counter()
+    guardar_datos()
+    tiempos = {'guardar_datos (primera corrida)': time.perf_counter() - inicio}
+
+    etapas = {
+        'generar_resumen': lambda: main.generar_resumen(
+            precios, precios_por_division, cantidades_por_division, total, df_productos, productos
+        ),
+        'guardar_datos': guardar_datos,
+        'calcular_variacion_semanal': lambda: calcular_variacion_semanal(df_productos),
+        'calcular_variacion_mensual_intermensual': lambda: calcular_variacion_mensual_intermensual(df_productos),
+        'generar_resumen_pro': resumen_pro_202506.generar_resumen_pro,
+    }
+    for nombre, etapa in etapas.items():
+        tiempos[nombre] = _medir(etapa, repeticiones=repeticiones)
+    return tiempos
+
+
+def benchmark_escalado(tamanos=((50, 30, 1), (300, 90, 2), (1000, 180, 2)), repeticiones=3, archivo=ARCHIVO_ESCALADO):
+    """
+    Mide las etapas de procesamiento sobre historiales sintéticos de distinto tamaño.
+
+    Cada tamaño se genera en un directorio temporal con generar_datos_sinteticos,
+    terminando hoy, y las mediciones se agregan al final de 'archivo' junto con
+    el commit actual, para seguir la evolución entre versiones.
+
+    Args:
+        tamanos: Ternas (productos, días, corridas por día) a medir
+        repeticiones: Ejecuciones de cada etapa (se informa la mejor)
+        archivo: CSV donde se acumula la tabla de escalado, o None para no guardarla
+
+    Returns:
+        DataFrame con una fila por tamaño y etapa
+    """
+    resultados = []
+    directorio_original = os.getcwd()
+    fecha = datetime.now().strftime('%Y-%m-%d %H:%M')
+    version = _version()
+    for cantidad_productos, dias, corridas_por_dia in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            os.chdir(directorio)
+            try:
+                productos, _, _, df_productos = generar_datos_sinteticos(cantidad_productos, dias, corridas_por_dia)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if BACKEND_ALMACENAMIENTO == "particionado":
+                        from almacen import importar_csvs
+                        importar_csvs()
+                    elif BACKEND_ALMACENAMIENTO == "sqlite":
+                        from almacen_sqlite import importar_historial
+                        importar_historial()
+                    tiempos = _medir_etapas(productos, df_productos, repeticiones)
+            finally:
+                os.chdir(directorio_original)
+        for etapa, segundos in tiempos.items():
+            resultados.append({
+                'Fecha': fecha,
+                'Version': version,
+                'Backend': BACKEND_ALMACENAMIENTO,
+                'Productos': cantidad_productos,
+                'Dias': dias,
+                'Corridas_Por_Dia': corridas_por_dia,
+                'Filas': len(df_productos),
+                'Etapa': etapa,
+                'Segundos': segundos,
+                'Filas_Por_Segundo': len(df_productos) / segundos if segundos else None
+            })
+
+    df = pd.DataFrame(resultados)
+    if archivo is not None:
+        df.to_csv(archivo, mode='a', header=not os.path.exists(archivo), index=False)
+    return df
+
+
+if __name__ == "__main__":
+    print("Benchmark de calcular_variacion_semanal")
+    print(benchmark_variacion_semanal().to_string(index=False))
+    print("\nBenchmark de extracción de precios HTML")
+    print(benchmark_extraccion_html().to_string(index=False))
+    print("\nBenchmark de memoria del historial (estándar vs compacto)")
+    print(benchmark_memoria_historial().to_string(index=False))
+    print("\nBenchmark del motor de índices ponderados")
+    print(benchmark_indices().to_string(index=False))
+    print("\nBenchmark de escalado del procesamiento")
+    escalado = benchmark_escalado()
+    print(escalado.pivot_table(index='Etapa', columns='Filas', values='Segundos', sort=False).to_string())
+    print(f"\nMediciones agregadas a {ARCHIVO_ESCALADO}")
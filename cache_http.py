@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config import (
+    CACHE_HTTP_DIRECTORIO,
+    CACHE_HTTP_TTL,
+    CACHE_HTTP_TAMANO_MAXIMO
+)
+
+# Encabezados de la respuesta que se conservan junto al cuerpo
+ENCABEZADOS_GUARDADOS = ["Content-Type", "ETag", "Last-Modified"]
+
+
+class CacheHTTP:
+    """
+    Caché persistente de respuestas HTTP indexada por URL.
+
+    Cada entrada se guarda como dos archivos (<hash>.json con los metadatos y
+    <hash>.body con el cuerpo). La fecha de modificación del cuerpo registra el
+    último uso, que es el criterio para descartar entradas cuando el tamaño
+    total supera el máximo configurado.
+    """
+
+    def __init__(self, directorio=CACHE_HTTP_DIRECTORIO, ttl=CACHE_HTTP_TTL, tamano_maximo=CACHE_HTTP_TAMANO_MAXIMO):
+        self.directorio = directorio
+        self.ttl = ttl
+        self.tamano_maximo = tamano_maximo
+        self.aciertos = 0
+        self.fallos = 0
+        self.revalidados = 0
+        self._lock = threading.Lock()
+        self._tamanos = None  # hash -> bytes del cuerpo, se calcula al primer uso
+
+    def _rutas(self, url):
+        clave = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directorio, clave)
+        return clave, base + ".json", base + ".body"
+
+    def _cargar_tamanos(self):
+        if self._tamanos is None:
+            self._tamanos = {}
+            if os.path.isdir(self.directorio):
+                for nombre in os.listdir(self.directorio):
+                    if nombre.endswith(".body"):
+                        ruta = os.path.join(self.directorio, nombre)
+                        self._tamanos[nombre[:-5]] = os.path.getsize(ruta)
+        return self._tamanos
+
+    def leer(self, url):
+        """Devuelve la entrada guardada para la URL (metadatos y cuerpo) o None."""
+        _, ruta_meta, ruta_cuerpo = self._rutas(url)
+        try:
+            with open(ruta_meta, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(ruta_cuerpo, "rb") as f:
+                cuerpo = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        return {"meta": meta, "cuerpo": cuerpo}
+
+    def vigente(self, entrada):
+        """Indica si la entrada todavía está dentro del TTL."""
+        return time.time() - entrada["meta"]["guardado"] < self.ttl
+
+    def encabezados_revalidacion(self, entrada):
+        """Arma los encabezados condicionales (ETag / Last-Modified) de la entrada."""
+        encabezados = {}
+        guardados = entrada["meta"].get("encabezados", {})
+        if guardados.get("ETag"):
+            encabezados["If-None-Match"] = guardados["ETag"]
+        if guardados.get("Last-Modified"):
+            encabezados["If-Modified-Since"] = guardados["Last-Modified"]
+        return encabezados
+
+    def guardar(self, url, response):
+        """Guarda una respuesta exitosa y descarta entradas viejas si hace falta."""
+        clave, ruta_meta, ruta_cuerpo = self._rutas(url)
+        meta = {
+            "url": url,
+            "guardado": time.time(),
+            "encabezados": {k: response.headers[k] for k in ENCABEZADOS_GUARDADOS if k in response.headers},
+        }
+        os.makedirs(self.directorio, exist_ok=True)
+        _escribir_atomico(ruta_cuerpo, response.content)
+        _escribir_atomico(ruta_meta, json.dumps(meta).encode("utf-8"))
+        with self._lock:
+            self._cargar_tamanos()[clave] = len(response.content)
+        self._desalojar()
+
+    def renovar(self, url, entrada):
+        """Reinicia el TTL de una entrada confirmada por el servidor con un 304."""
+        _, ruta_meta, _ = self._rutas(url)
+        entrada["meta"]["guardado"] = time.time()
+        _escribir_atomico(ruta_meta, json.dumps(entrada["meta"]).encode("utf-8"))
+        self.marcar_uso(url)
+
+    def marcar_uso(self, url):
+        """Actualiza la fecha de último uso de la entrada (orden LRU)."""
+        _, _, ruta_cuerpo = self._rutas(url)
+        try:
+            os.utime(ruta_cuerpo, None)
+        except OSError:
+            pass
+
+    def _desalojar(self):
+        with self._lock:
+            tamanos = self._cargar_tamanos()
+            total = sum(tamanos.values())
+            if total <= self.tamano_maximo:
+                return
+            ultimos_usos = []
+            for clave in tamanos:
+                ruta_cuerpo = os.path.join(self.directorio, clave + ".body")
+                try:
+                    ultimos_usos.append((os.path.getmtime(ruta_cuerpo), clave))
+                except OSError:
+                    ultimos_usos.append((0, clave))
+            for _, clave in sorted(ultimos_usos):
+                if total <= self.tamano_maximo:
+                    break
+                for extension in (".body", ".json"):
+                    try:
+                        os.remove(os.path.join(self.directorio, clave + extension))
+                    except OSError:
+                        pass
+                total -= tamanos.pop(clave)
+
+    def registrar(self, resultado):
+        """Cuenta un acierto, un fallo o una revalidación."""
+        with self._lock:
+            if resultado == "acierto":
+                self.aciertos += 1
+            elif resultado == "revalidado":
+                self.revalidados += 1
+            else:
+                self.fallos += 1
+
+    def estadisticas(self):
+        """Devuelve los contadores de uso y el tamaño actual de la caché."""
+        with self._lock:
+            tamanos = self._cargar_tamanos()
+            consultas = self.aciertos + self.revalidados + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "revalidados": self.revalidados,
+                "fallos": self.fallos,
+                "tasa_aciertos": (self.aciertos + self.revalidados) / consultas if consultas else 0.0,
+                "entradas": len(tamanos),
+                "bytes": sum(tamanos.values()),
+            }
+
+
+def construir_respuesta(url, entrada):
+    """Reconstruye un requests.Response a partir de una entrada de la caché."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = entrada["cuerpo"]
+    response.headers = CaseInsensitiveDict(entrada["meta"].get("encabezados", {}))
+    response.encoding = get_encoding_from_headers(response.headers)
+    return response
+
+
+def _escribir_atomico(ruta, contenido):
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
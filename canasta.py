@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+from config import DIVISIONES_IPC, SUPERMERCADOS, SUPERMERCADO_POR_DEFECTO, ARCHIVO_CANASTA_COMPILADA
+from utils import validar_division
+
+VERSION_CANASTA = 1
+
+
+def _firma_configuracion():
+    """Identifica la configuración de la que depende la canasta compilada (divisiones y supermercados)."""
+    datos = json.dumps([VERSION_CANASTA, sorted(DIVISIONES_IPC), sorted(SUPERMERCADOS), SUPERMERCADO_POR_DEFECTO])
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+def compilar_canasta(texto):
+    """
+    Interpreta el contenido de mi_carrito.txt.
+
+    Cada línea tiene la forma CODIGO_O_URL;NOMBRE;DIVISION;CANTIDAD_MENSUAL[;SUPERMERCADO].
+
+    Returns:
+        Tupla (productos, ignorados): lista de productos y lista de líneas ignoradas
+    """
+    productos = []
+    productos_ignorados = []
+    for linea in texto.splitlines():
+        if not linea.strip():
+            continue
+        partes = linea.strip().split(';')
+        if not 4 <= len(partes) <= 5:  # código (o URL), nombre, categoría, cantidad mensual[, supermercado]
+            print(f"Advertencia: Formato incorrecto en línea: {linea}")
+            productos_ignorados.append(linea.strip())
+            continue
+
+        codigo, nombre, division, cantidad = partes[:4]
+        supermercado = partes[4].strip().lower() if len(partes) == 5 and partes[4].strip() else SUPERMERCADO_POR_DEFECTO
+        if supermercado not in SUPERMERCADOS:
+            print(f"Advertencia: Supermercado '{supermercado}' no soportado en línea: {linea.strip()}")
+            productos_ignorados.append(linea.strip())
+            continue
+        try:
+            cantidad = float(cantidad.strip())
+        except ValueError:
+            print(f"Advertencia: Cantidad mensual inválida para producto '{nombre.strip()}'. Se usa 1 por defecto.")
+            cantidad = 1.0
+
+        productos.append({
+            "codigo": codigo.strip(),
+            "nombre": nombre.strip(),
+            "division": validar_division(division.strip()),
+            "cantidad_mensual": cantidad,
+            "supermercado": supermercado
+        })
+    return productos, productos_ignorados
+
+
+def _leer_compilada(ruta_compilada):
+    try:
+        with open(ruta_compilada, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_compilada(compilada, ruta_compilada):
+    temporal = ruta_compilada + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(compilada, f, ensure_ascii=False)
+    os.replace(temporal, ruta_compilada)
+
+
+def cargar_canasta(ruta="mi_carrito.txt", ruta_compilada=ARCHIVO_CANASTA_COMPILADA):
+    """
+    Carga la canasta usando una versión compilada guardada en disco.
+
+    Si el archivo no cambió (misma fecha de modificación y tamaño, o mismo
+    contenido) y la configuración de divisiones y supermercados es la misma, se
+    usa la canasta ya interpretada sin volver a leer las líneas ni a resolver
+    las divisiones; las advertencias se muestran solo al compilarla.
+
+    Returns:
+        Tupla (productos, ignorados), o None si el archivo no existe
+    """
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+
+    firma = _firma_configuracion()
+    compilada = _leer_compilada(ruta_compilada)
+    if compilada is not None and (compilada.get("ruta") != os.path.abspath(ruta) or compilada.get("firma") != firma):
+        compilada = None
+
+    if compilada is not None and compilada["mtime_ns"] == estado.st_mtime_ns and compilada["tamano"] == estado.st_size:
+        return compilada["productos"], compilada["ignorados"]
+
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    hash_contenido = hashlib.sha256(contenido).hexdigest()
+
+    if compilada is None or compilada["hash"] != hash_contenido:
+        productos, ignorados = compilar_canasta(contenido.decode("utf-8"))
+        compilada = {"ruta": os.path.abspath(ruta), "firma": firma, "hash": hash_contenido,
+                     "productos": productos, "ignorados": ignorados}
+
+    # Mismo contenido con otra fecha de modificación (por ejemplo, tras un checkout): solo se actualiza la firma del archivo
+    compilada["mtime_ns"] = estado.st_mtime_ns
+    compilada["tamano"] = estado.st_size
+    try:
+        _guardar_compilada(compilada, ruta_compilada)
+    except OSError as e:
+        print(f"Advertencia: No se pudo guardar la canasta compilada: {e}")
+    return compilada["productos"], compilada["ignorados"]
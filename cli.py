@@ -0,0 +1,101 @@
+import argparse
+
+from config import PUERTO_CONSULTAS
+
+# Cada subcomando importa solo lo que usa: 'summarize' no carga pandas ni
+# requests, y los reportes no cargan requests ni los scrapers.
+
+
+def comando_fetch(args):
+    """Captura los precios y guarda la corrida, sin los reportes derivados."""
+    from main import main, ejecutar_captura
+    main(perfil=args.perfil, corrida=ejecutar_captura)
+
+
+def comando_todo(args):
+    """Captura y todos los reportes, como 'python main.py'."""
+    from main import main
+    main(perfil=args.perfil)
+
+
+def comando_summarize(args):
+    from ultima_corrida import imprimir_ultima_corrida
+    imprimir_ultima_corrida()
+
+
+def comando_weekly(args):
+    from reportes import reportar_variacion_semanal
+    reportar_variacion_semanal()
+
+
+def comando_monthly(args):
+    from canasta import cargar_canasta
+    from reportes import reportar_variacion_mensual
+    canasta = cargar_canasta("mi_carrito.txt")
+    resumen = []
+    reportar_variacion_mensual(canasta[0] if canasta is not None else [], resumen)
+    print("\n".join(resumen))
+
+
+def comando_pro_report(args):
+    from reportes import generar_resumen_pro
+    generar_resumen_pro(args.desde, args.hasta)
+
+
+def comando_backfill(args):
+    """Reconstruye los agregados y el índice de últimos precios desde todo el historial."""
+    from historial import cargar_historial
+    from agregados import reconstruir_agregados
+    from indice_precios import IndicePrecios
+
+    df_productos = cargar_historial("productos")
+    reconstruir_agregados(df_productos)
+    indice = IndicePrecios.desde_historial(cargar_historial("resumen"), cargar_historial("divisiones"), df_productos)
+    indice.guardar()
+    print(f"Agregados e índice de precios reconstruidos desde {len(df_productos)} filas de productos.")
+
+
+def comando_serve(args):
+    from consultas import ServidorConsultas
+    servidor = ServidorConsultas(args.puerto)
+    print(f"Servicio de consultas escuchando en {servidor.url_base}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Seguimiento de precios de la canasta. Sin subcomando, hace la captura y todos los reportes."
+    )
+    parser.add_argument("--perfil", action="store_true", help="Guardar un perfil de cProfile de la corrida")
+    parser.set_defaults(funcion=comando_todo)
+    subcomandos = parser.add_subparsers(title="subcomandos")
+
+    fetch = subcomandos.add_parser("fetch", help="Obtener los precios y guardar la corrida")
+    fetch.add_argument("--perfil", action="store_true", default=argparse.SUPPRESS, help="Guardar un perfil de cProfile de la corrida")
+    fetch.set_defaults(funcion=comando_fetch)
+    subcomandos.add_parser("summarize", help="Mostrar la última corrida guardada").set_defaults(funcion=comando_summarize)
+    subcomandos.add_parser("weekly", help="Calcular y guardar las variaciones semanales").set_defaults(funcion=comando_weekly)
+    subcomandos.add_parser("monthly", help="Calcular y guardar las variaciones mensuales").set_defaults(funcion=comando_monthly)
+    pro_report = subcomandos.add_parser("pro-report", help="Generar el resumen Pro del mes o de un rango de fechas")
+    pro_report.add_argument("--desde", default=None, help="Primer día (YYYY-MM-DD)")
+    pro_report.add_argument("--hasta", default=None, help="Último día (YYYY-MM-DD)")
+    pro_report.set_defaults(funcion=comando_pro_report)
+    subcomandos.add_parser(
+        "backfill", help="Reconstruir agregados e índice de precios desde el historial"
+    ).set_defaults(funcion=comando_backfill)
+    serve = subcomandos.add_parser("serve", help="Servir consultas JSON de solo lectura sobre el historial")
+    serve.add_argument("--puerto", type=int, default=PUERTO_CONSULTAS)
+    serve.set_defaults(funcion=comando_serve)
+    return parser
+
+
+def principal(argv=None):
+    args = crear_parser().parse_args(argv)
+    args.funcion(args)
+
+
+if __name__ == "__main__":
+    principal()
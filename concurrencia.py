@@ -0,0 +1,175 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from config import (
+    MAX_CONCURRENCIA,
+    TASA_INICIAL_POR_HOST,
+    TASA_MINIMA_POR_HOST,
+    TASA_MAXIMA_POR_HOST,
+    RAFAGA_POR_HOST,
+    INCREMENTO_TASA,
+    FACTOR_REDUCCION_429,
+    FACTOR_REDUCCION_LATENCIA,
+    UMBRAL_PICO_LATENCIA,
+    ENFRIAMIENTO_REDUCCION,
+    BACKOFF_BASE,
+    BACKOFF_MAXIMO
+)
+
+# Estados que indican que el servidor pide bajar el ritmo
+ESTADOS_SATURACION = {429, 503}
+
+
+class _CuboTokens:
+    """Estado del limitador para un host."""
+
+    def __init__(self, tasa, tasa_maxima):
+        self.tasa = tasa
+        self.tasa_maxima = tasa_maxima
+        self.tokens = RAFAGA_POR_HOST
+        self.ultimo = time.monotonic()
+        self.latencia_media = None
+        self.latencia_reciente = None
+        self.ultima_reduccion = None
+        self.peticiones = 0
+        self.saturaciones = 0
+        self.reintentos = 0
+
+
+class LimitadorAdaptativo:
+    """
+    Limitador de peticiones por host basado en un cubo de tokens.
+
+    La tasa de cada host sube de a poco mientras las respuestas son sanas y se
+    reduce a la mitad ante un 429/503 (o en menor medida ante fallas de conexión
+    o un aumento sostenido de la latencia), buscando el máximo ritmo que el
+    servidor tolera. Como en TCP, las señales que llegan juntas cuentan como
+    una sola: la tasa se reduce a lo sumo una vez por ENFRIAMIENTO_REDUCCION.
+    """
+
+    def __init__(self):
+        self._cubos = {}
+        self._lock = threading.Lock()
+
+    def _cubo(self, host):
+        cubo = self._cubos.get(host)
+        if cubo is None:
+            cubo = self._cubos[host] = _CuboTokens(TASA_INICIAL_POR_HOST, TASA_MAXIMA_POR_HOST)
+        return cubo
+
+    def configurar(self, host, tasa_inicial=TASA_INICIAL_POR_HOST, tasa_maxima=TASA_MAXIMA_POR_HOST):
+        """Fija la tasa inicial y máxima (peticiones por segundo) de un host que todavía no se consultó."""
+        with self._lock:
+            if host not in self._cubos:
+                self._cubos[host] = _CuboTokens(tasa_inicial, tasa_maxima)
+
+    def esperar(self, host):
+        """Reserva un token del host y bloquea al hilo llamador hasta que esté disponible."""
+        with self._lock:
+            cubo = self._cubo(host)
+            ahora = time.monotonic()
+            cubo.tokens = min(RAFAGA_POR_HOST, cubo.tokens + (ahora - cubo.ultimo) * cubo.tasa)
+            cubo.ultimo = ahora
+            cubo.tokens -= 1
+            cubo.peticiones += 1
+            espera = -cubo.tokens / cubo.tasa if cubo.tokens < 0 else 0
+        if espera > 0:
+            time.sleep(espera)
+
+    def registrar(self, host, estado, latencia):
+        """
+        Ajusta la tasa del host según una respuesta.
+
+        Args:
+            host: Host consultado
+            estado: Código HTTP de la respuesta, o None si falló la conexión
+            latencia: Segundos que tardó la respuesta
+        """
+        with self._lock:
+            cubo = self._cubo(host)
+            if estado is not None and estado < 400:
+                # Promedios de la latencia: uno reciente y otro de largo plazo como referencia
+                if cubo.latencia_media is None:
+                    cubo.latencia_media = cubo.latencia_reciente = latencia
+                else:
+                    cubo.latencia_reciente = 0.7 * cubo.latencia_reciente + 0.3 * latencia
+                    cubo.latencia_media = 0.95 * cubo.latencia_media + 0.05 * latencia
+
+            if estado in ESTADOS_SATURACION:
+                cubo.saturaciones += 1
+                self._reducir(cubo, FACTOR_REDUCCION_429)
+            elif estado is None or (
+                estado < 400 and cubo.latencia_reciente > UMBRAL_PICO_LATENCIA * cubo.latencia_media
+            ):
+                self._reducir(cubo, FACTOR_REDUCCION_LATENCIA)
+            elif estado < 500:
+                cubo.tasa = min(cubo.tasa_maxima, cubo.tasa + INCREMENTO_TASA)
+
+    def _reducir(self, cubo, factor):
+        """Reduce la tasa del host, salvo que ya se haya reducido hace menos de ENFRIAMIENTO_REDUCCION."""
+        ahora = time.monotonic()
+        if cubo.ultima_reduccion is not None and ahora - cubo.ultima_reduccion < ENFRIAMIENTO_REDUCCION:
+            return
+        cubo.ultima_reduccion = ahora
+        cubo.tasa = max(TASA_MINIMA_POR_HOST, cubo.tasa * factor)
+        cubo.tokens = min(cubo.tokens, 0)
+
+    def registrar_reintento(self, host):
+        """Cuenta un reintento hacia el host."""
+        with self._lock:
+            self._cubo(host).reintentos += 1
+
+    def estado(self):
+        """Devuelve, por host, la tasa actual y los contadores de peticiones, saturaciones y reintentos."""
+        with self._lock:
+            return {
+                host: {
+                    "tasa": cubo.tasa,
+                    "peticiones": cubo.peticiones,
+                    "saturaciones": cubo.saturaciones,
+                    "reintentos": cubo.reintentos,
+                    "latencia_media": cubo.latencia_media,
+                }
+                for host, cubo in self._cubos.items()
+            }
+
+
+_limitador = LimitadorAdaptativo()
+
+
+def obtener_limitador():
+    """Devuelve el limitador compartido por todas las peticiones HTTP."""
+    return _limitador
+
+
+def espera_backoff(intento, minimo=0):
+    """Espera antes del reintento número 'intento' (desde 0): backoff exponencial con jitter completo."""
+    tope = min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** intento)
+    return max(minimo, random.uniform(0, tope))
+
+
+def obtener_host(url):
+    """Devuelve el host de una URL (o la cadena tal cual si no es una URL)."""
+    return urlparse(url).netloc or url
+
+
+def ejecutar_en_paralelo(funcion, argumentos, max_concurrencia=MAX_CONCURRENCIA):
+    """
+    Ejecuta funcion(argumento) para cada argumento usando un pool acotado de hilos.
+
+    El ritmo de peticiones a cada host lo regula el limitador adaptativo
+    compartido, dentro de sesion_http.get.
+
+    Args:
+        funcion: Función a ejecutar (por ejemplo, un scraper)
+        argumentos: Lista de argumentos, uno por llamada
+        max_concurrencia: Cantidad máxima de llamadas simultáneas
+
+    Returns:
+        Lista de resultados en el mismo orden que los argumentos
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrencia)) as pool:
+        return list(pool.map(funcion, argumentos))
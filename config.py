@@ -32,4 +32,76 @@ HEADERS = {
     'Accept-Encoding': 'gzip, deflate, br',
     'Connection': 'keep-alive',
     'Cache-Control': 'max-age=0'
-} 
\ No newline at end of file
+} 
+
+# URL base del supermercado DIA
+URL_BASE_DIA = "https://diaonline.supermercadosdia.com.ar"
+TAMANO_LOTE_DIA = 50  # Productos por consulta a la API de catálogo (VTEX devuelve hasta 50 por página)
+
+# Concurrencia de las consultas de precios
+MAX_CONCURRENCIA = 8  # Cantidad máxima de peticiones simultáneas
+
+# Limitador adaptativo por host (cubo de tokens) y reintentos
+TASA_INICIAL_POR_HOST = 2.0  # Peticiones por segundo con las que arranca cada host
+TASA_MINIMA_POR_HOST = 0.2
+TASA_MAXIMA_POR_HOST = 10.0
+RAFAGA_POR_HOST = 4  # Tokens acumulables (peticiones seguidas permitidas tras un período inactivo)
+INCREMENTO_TASA = 0.1  # Aumento de la tasa por cada respuesta sana
+FACTOR_REDUCCION_429 = 0.5  # Factor aplicado a la tasa ante un 429 o 503
+FACTOR_REDUCCION_LATENCIA = 0.8  # Factor aplicado ante una falla de conexión o un pico de latencia
+UMBRAL_PICO_LATENCIA = 3.0  # Hay un pico si la latencia reciente supera este múltiplo de la de largo plazo
+ENFRIAMIENTO_REDUCCION = 1.0  # Segundos mínimos entre dos reducciones de la tasa de un host
+REINTENTOS_MAXIMOS = 3
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+BACKOFF_BASE = 0.5  # Segundos del primer reintento; se duplica en cada intento (con jitter)
+BACKOFF_MAXIMO = 30.0  # Tope de espera entre reintentos, incluso si el servidor envía Retry-After mayor
+
+# Supermercados soportados, con su concurrencia y tasas (peticiones por segundo) propias.
+# Cada supermercado se consulta en paralelo con los demás.
+SUPERMERCADO_POR_DEFECTO = "dia"
+SUPERMERCADOS = {
+    "dia": {"max_concurrencia": 8, "tasa_inicial": 2.0, "tasa_maxima": 10.0},
+    "disco": {"max_concurrencia": 4, "tasa_inicial": 1.0, "tasa_maxima": 4.0},
+    "coto": {"max_concurrencia": 4, "tasa_inicial": 1.0, "tasa_maxima": 4.0},
+    "jumbo": {"max_concurrencia": 4, "tasa_inicial": 1.0, "tasa_maxima": 4.0},
+}
+
+# Pool de conexiones HTTP compartido por los scrapers
+POOL_HOSTS = 10  # Cantidad de hosts con pool de conexiones propio
+POOL_CONEXIONES_POR_HOST = 8  # Conexiones keep-alive reutilizables por host
+
+# Caché en disco de respuestas HTTP
+CACHE_HTTP_HABILITADA = True
+CACHE_HTTP_DIRECTORIO = ".cache_http"
+CACHE_HTTP_TTL = 3600  # Segundos durante los que una respuesta se considera vigente
+CACHE_HTTP_TAMANO_MAXIMO = 200 * 1024 * 1024  # Bytes; al superarlo se descartan las entradas menos usadas
+
+# Almacenamiento del historial de precios
+BACKEND_ALMACENAMIENTO = "csv"  # "csv" (CSV mensuales), "particionado" (una partición por corrida) o "sqlite"
+DIRECTORIO_HISTORIAL = "historial"
+COMPRESION_HISTORIAL = "snappy"  # Compresión de las particiones Parquet; en CSV (sin pyarrow) se usa gzip. None para desactivarla
+ARCHIVO_SQLITE = "historial.sqlite"  # Base del backend "sqlite" (tablas indexadas por producto/división y fecha)
+
+# Cargar el historial con tipos compactos (fechas datetime64, textos como categorías, float32 cuando es seguro)
+HISTORIAL_COMPACTO = False
+
+# Índice de últimos precios (consultas del valor anterior sin recorrer el historial)
+ARCHIVO_INDICE_PRECIOS = "indice_precios.json"
+DIAS_RETENIDOS_INDICE = 45  # Días de precios diarios que se conservan en el índice
+
+# Agregados semanales y mensuales mantenidos de forma incremental
+DIRECTORIO_AGREGADOS = "agregados"
+
+# Métricas de rendimiento de cada corrida
+ARCHIVO_METRICAS = "metricas.jsonl"  # Una línea JSON por corrida
+METRICAS_TRAZAR_MEMORIA = False  # Medir el pico de memoria de Python con tracemalloc (agrega costo a la corrida)
+
+# Modo servicio (python servicio.py): horarios diarios de las capturas de precios
+HORARIOS_SERVICIO = ["09:00", "13:00", "19:00"]
+
+# Servicio local de consultas sobre el historial (python consultas.py)
+PUERTO_CONSULTAS = 8050
+INTERVALO_RECARGA_CONSULTAS = 5.0  # Segundos mínimos entre revisiones del historial en busca de corridas nuevas
+
+# Canasta interpretada y guardada para no volver a procesar mi_carrito.txt si no cambió
+ARCHIVO_CANASTA_COMPILADA = ".canasta_compilada.json"
@@ -0,0 +1,298 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    PUERTO_CONSULTAS,
+    INTERVALO_RECARGA_CONSULTAS
+)
+from almacen import a_float64
+from historial import cargar_historial, firma_historial
+
+# Series que se indexan: tabla, columna que identifica la serie y columna de valores
+SERIES = {
+    "productos": ("Producto", "Precio"),
+    "divisiones": ("Division", "Total"),
+    "resumen": (None, "Total_Canasta"),
+}
+
+FRECUENCIAS = ("D", "W", "M")
+AGREGACIONES = ("ultimo", "promedio")
+
+
+def _claves_periodo(fechas, frecuencia):
+    """Inicio del período (día, semana desde el lunes o mes) de cada fecha."""
+    dias = fechas.astype('datetime64[D]')
+    if frecuencia == "D":
+        return dias
+    if frecuencia == "W":
+        # El 1970-01-01 fue jueves: se corre 3 días para que las semanas empiecen el lunes
+        semanas = (dias.astype('int64') + 3) // 7
+        return (semanas * 7 - 3).astype('datetime64[D]')
+    if frecuencia == "M":
+        return fechas.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"Frecuencia desconocida: {frecuencia} (opciones: {', '.join(FRECUENCIAS)})")
+
+
+def submuestrear(fechas, valores, frecuencia, agregacion="ultimo"):
+    """
+    Reduce una serie ordenada a un valor por período.
+
+    Args:
+        fechas: Arreglo datetime64 ordenado
+        valores: Arreglo de valores (NaN = sin precio)
+        frecuencia: 'D', 'W' o 'M'
+        agregacion: 'ultimo' (último valor del período) o 'promedio' (sin contar faltantes)
+
+    Returns:
+        Tupla (inicios de período, valores)
+    """
+    if agregacion not in AGREGACIONES:
+        raise ValueError(f"Agregación desconocida: {agregacion} (opciones: {', '.join(AGREGACIONES)})")
+    claves = _claves_periodo(fechas, frecuencia)
+    if len(claves) == 0:
+        return claves, valores
+    periodos, inicios = np.unique(claves, return_index=True)
+    if agregacion == "ultimo":
+        finales = np.append(inicios[1:], len(claves)) - 1
+        return periodos, valores[finales]
+    validos = ~np.isnan(valores)
+    sumas = np.add.reduceat(np.where(validos, valores, 0.0), inicios)
+    cantidades = np.add.reduceat(validos.astype('int64'), inicios)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return periodos, np.where(cantidades > 0, sumas / np.maximum(cantidades, 1), np.nan)
+
+
+class HistorialConsultable:
+    """
+    Historial de precios en memoria, indexado para consultas rápidas.
+
+    Cada producto, cada división y el total de la canasta se guardan como un
+    par de arreglos ordenados (fechas datetime64, valores), así que una consulta
+    por rango es una búsqueda binaria y un corte, sin recorrer el historial.
+    actualizar() incorpora solo las filas posteriores a las ya cargadas, y solo
+    si cambiaron los archivos del último mes.
+    """
+
+    def __init__(self, directorio="."):
+        self.directorio = directorio
+        self.series = {tabla: {} for tabla in SERIES}
+        self.ultimas_fechas = {tabla: None for tabla in SERIES}
+        # Filas ya cargadas con la última fecha: Fecha tiene resolución de minutos,
+        # así que otra corrida guardada en el mismo minuto comparte la fecha
+        self.filas_ultima_fecha = {tabla: 0 for tabla in SERIES}
+        self.firma = None
+        self._lock = threading.Lock()
+        self.actualizar()
+
+    def actualizar(self):
+        """
+        Incorpora las corridas agregadas al historial desde la última carga.
+
+        Returns:
+            Cantidad de filas nuevas incorporadas
+        """
+        with self._lock:
+            firma = firma_historial(SERIES, self.directorio)
+            if firma == self.firma:
+                return 0
+            nuevas = sum(self._incorporar(tabla) for tabla in SERIES)
+            self.firma = firma
+            return nuevas
+
+    def _incorporar(self, tabla):
+        clave, columna = SERIES[tabla]
+        ultima = self.ultimas_fechas[tabla]
+        df = cargar_historial(tabla, desde=ultima, columnas=[c for c in (clave, columna) if c], directorio=self.directorio)
+        df = df.assign(Fecha=pd.to_datetime(df['Fecha']).astype('datetime64[ns]'))
+        df = df.dropna(subset=['Fecha'])
+        ya_cargadas = 0
+        if ultima is not None:
+            df = df[df['Fecha'] >= ultima]
+            # Las filas de la última fecha vuelven en el orden en que se guardaron:
+            # se saltean las que ya estaban y se incorporan las de corridas posteriores
+            mismas = df['Fecha'] == ultima
+            ya_cargadas = self.filas_ultima_fecha[tabla]
+            df = df[~(mismas & (mismas.cumsum() <= ya_cargadas))]
+        if df.empty:
+            return 0
+        df = df.sort_values('Fecha', kind='stable')
+
+        fechas = df['Fecha'].to_numpy()
+        valores = a_float64(df[columna]).to_numpy(dtype='float64')
+        grupos = {None: np.arange(len(df))} if clave is None else df.groupby(clave, sort=False).indices
+        series = dict(self.series[tabla])
+        for nombre, posiciones in grupos.items():
+            anteriores = series.get(nombre)
+            if anteriores is None:
+                series[nombre] = (fechas[posiciones], valores[posiciones])
+            else:
+                series[nombre] = (np.concatenate([anteriores[0], fechas[posiciones]]),
+                                  np.concatenate([anteriores[1], valores[posiciones]]))
+        # Se reemplaza el diccionario entero para que las consultas en curso sigan viendo uno consistente
+        self.series[tabla] = series
+        nueva_ultima = df['Fecha'].iloc[-1]
+        self.filas_ultima_fecha[tabla] = int((df['Fecha'] == nueva_ultima).sum()) + (
+            ya_cargadas if nueva_ultima == ultima else 0
+        )
+        self.ultimas_fechas[tabla] = nueva_ultima
+        return len(df)
+
+    # --- Consultas ---
+
+    def nombres(self, tabla):
+        """Productos o divisiones con historial, ordenados."""
+        return sorted(self.series[tabla])
+
+    def serie(self, tabla, nombre=None, desde=None, hasta=None, frecuencia=None, agregacion="ultimo"):
+        """
+        Valores de una serie en un rango de fechas.
+
+        Args:
+            tabla: 'productos' (precios), 'divisiones' (totales) o 'resumen' (total de la canasta)
+            nombre: Producto o división (None para 'resumen')
+            desde, hasta: Límites del rango (inclusive; una fecha sin hora incluye todo el día)
+            frecuencia: 'D', 'W' o 'M' para un valor por período, o None para todas las corridas
+            agregacion: Con frecuencia, 'ultimo' o 'promedio'
+
+        Returns:
+            Tupla (fechas, valores) de arreglos NumPy
+
+        Raises:
+            KeyError: Si el producto o la división no tienen historial
+        """
+        fechas, valores = self.series[tabla][nombre]
+        inicio = 0 if desde is None else fechas.searchsorted(np.datetime64(pd.Timestamp(desde)), side='left')
+        fin = len(fechas)
+        if hasta is not None:
+            hasta = pd.Timestamp(hasta)
+            if hasta == hasta.normalize():
+                hasta = hasta + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+            fin = fechas.searchsorted(np.datetime64(hasta), side='right')
+        fechas, valores = fechas[inicio:fin], valores[inicio:fin]
+        if frecuencia is not None:
+            fechas, valores = submuestrear(fechas, valores, frecuencia, agregacion)
+        return fechas, valores
+
+    def ultimo(self, tabla="resumen", nombre=None):
+        """Última fecha y valor de una serie (por defecto, el total de la canasta)."""
+        fechas, valores = self.series[tabla][nombre]
+        return fechas[-1], valores[-1]
+
+
+def _registros(fechas, valores):
+    """Convierte una serie a una lista JSON de {fecha, valor} (los faltantes como null)."""
+    textos = np.datetime_as_string(fechas, unit='m')
+    return [
+        {"fecha": fecha.replace("T", " "), "valor": None if np.isnan(valor) else float(valor)}
+        for fecha, valor in zip(textos.tolist(), valores.tolist())
+    ]
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, estado, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        partes = [unquote(parte) for parte in url.path.strip("/").split("/") if parte]
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+        historial = self.server.historial_actualizado()
+        try:
+            if partes in (["productos"], ["divisiones"]):
+                self._responder(200, historial.nombres(partes[0]))
+            elif len(partes) == 2 and partes[0] in ("productos", "divisiones"):
+                fechas, valores = historial.serie(
+                    partes[0], partes[1], parametros.get("desde"), parametros.get("hasta"),
+                    parametros.get("frecuencia"), parametros.get("agregacion", "ultimo")
+                )
+                self._responder(200, {"nombre": partes[1], "serie": _registros(fechas, valores)})
+            elif partes == ["canasta"]:
+                fechas, valores = historial.serie(
+                    "resumen", None, parametros.get("desde"), parametros.get("hasta"),
+                    parametros.get("frecuencia"), parametros.get("agregacion", "ultimo")
+                )
+                self._responder(200, {"serie": _registros(fechas, valores)})
+            elif partes == ["canasta", "ultimo"]:
+                fecha, valor = historial.ultimo()
+                self._responder(200, _registros(np.array([fecha]), np.array([valor]))[0])
+            else:
+                self._responder(404, {"error": "Ruta desconocida"})
+        except KeyError as e:
+            self._responder(404, {"error": f"Sin historial para {e}"})
+        except ValueError as e:
+            self._responder(400, {"error": str(e)})
+
+
+class ServidorConsultas(ThreadingHTTPServer):
+    """
+    Servicio HTTP/JSON de solo lectura sobre el historial de precios.
+
+    Rutas:
+        /productos, /divisiones                          (nombres con historial)
+        /productos/<nombre>, /divisiones/<nombre>        (serie de precios o totales)
+        /canasta                                         (serie del total de la canasta)
+        /canasta/ultimo                                  (último total de la canasta)
+
+    Las series aceptan ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&frecuencia=D|W|M&agregacion=ultimo|promedio.
+    El historial se revisa a lo sumo cada 'intervalo_recarga' segundos y solo
+    se leen las corridas nuevas.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, puerto=PUERTO_CONSULTAS, directorio=".", intervalo_recarga=INTERVALO_RECARGA_CONSULTAS):
+        super().__init__(("127.0.0.1", puerto), _Manejador)
+        self.historial = HistorialConsultable(directorio)
+        self.intervalo_recarga = intervalo_recarga
+        self._ultima_revision = time.monotonic()
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def historial_actualizado(self):
+        ahora = time.monotonic()
+        if ahora - self._ultima_revision >= self.intervalo_recarga:
+            self._ultima_revision = ahora
+            self.historial.actualizar()
+        return self.historial
+
+
+def iniciar_servidor_consultas(**opciones):
+    """Inicia un ServidorConsultas en un hilo de fondo y lo devuelve (detenerlo con shutdown())."""
+    servidor = ServidorConsultas(**opciones)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio local de consultas de solo lectura sobre el historial de precios.")
+    parser.add_argument("--puerto", type=int, default=PUERTO_CONSULTAS)
+    parser.add_argument("--directorio", default=".", help="Directorio con los CSV mensuales")
+    parser.add_argument("--recarga", type=float, default=INTERVALO_RECARGA_CONSULTAS,
+                        help="Segundos mínimos entre revisiones del historial")
+    args = parser.parse_args()
+
+    servidor = ServidorConsultas(args.puerto, args.directorio, args.recarga)
+    print(f"Servicio de consultas escuchando en {servidor.url_base}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
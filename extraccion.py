@@ -0,0 +1,159 @@
+import html
+import re
+import threading
+from collections import Counter
+
+from utils import limpiar_precio
+
+_extractores = {}
+
+PATRON_ETIQUETAS = re.compile(rb"<[^>]*>")
+# Regiones que el parser de HTML no trata como elementos: su contenido puede
+# parecer una etiqueta (plantillas en <script>, JSON embebido, comentarios)
+PATRON_NO_ELEMENTOS = re.compile(
+    rb"<!--.*?(?:-->|\Z)|<(script|style)(?=[\s/>])[^>]*>.*?(?:</\1\s*>|\Z)",
+    re.IGNORECASE | re.DOTALL
+)
+FIN_NOMBRE_ETIQUETA = rb"(?=[\s/>])"  # '<div' no coincide con '<div-foo'
+# Un atributo (nombre y valor opcional); se recorren en orden para no confundir
+# 'class' con 'data-class' ni con texto dentro del valor de otro atributo
+PATRON_ATRIBUTOS = re.compile(rb"""([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+
+
+class SelectorCompilado:
+    """Selector simple (etiqueta, #id y .clases) compilado a expresiones regulares sobre bytes."""
+
+    def __init__(self, selector):
+        self.selector = selector
+        coincidencia = re.fullmatch(r"([\w-]+)?((?:[#.][\w-]+)*)", selector)
+        if not coincidencia:
+            raise ValueError(f"Selector no soportado por la extracción rápida: {selector}")
+        self.etiqueta = (coincidencia.group(1) or r"[\w-]+").encode()
+        partes = re.findall(r"([#.])([\w-]+)", coincidencia.group(2))
+        self.id = next((valor.encode() for tipo, valor in partes if tipo == "#"), None)
+        self.clases = {valor.encode() for tipo, valor in partes if tipo == "."}
+
+        self.apertura = re.compile(rb"<(" + self.etiqueta + rb")" + FIN_NOMBRE_ETIQUETA + rb"([^>]*)>", re.IGNORECASE)
+        # Búsqueda previa barata: si el documento no contiene la clase o el id, no hay coincidencia
+        self.pista = self.id or (max(self.clases, key=len) if self.clases else None)
+
+    def _coincide(self, atributos):
+        valores = _atributos(atributos)
+        if self.id is not None and valores.get(b"id") != self.id:
+            return False
+        if self.clases:
+            clases = valores.get(b"class")
+            if clases is None or not self.clases.issubset(clases.split()):
+                return False
+        return True
+
+    def texto(self, contenido):
+        """
+        Devuelve el texto del primer elemento que coincide con el selector, o None.
+
+        El contenido no debe tener scripts, estilos ni comentarios (ver _quitar_no_elementos).
+        """
+        if self.pista is not None and self.pista not in contenido:
+            return None
+        for apertura in self.apertura.finditer(contenido):
+            if not self._coincide(apertura.group(2)):
+                continue
+            if apertura.group(2).rstrip().endswith(b"/"):
+                return ""
+            interior = _interior_elemento(contenido, apertura.group(1), apertura.end())
+            texto = PATRON_ETIQUETAS.sub(b"", interior).decode("utf-8", errors="replace")
+            return html.unescape(texto)
+        return None
+
+
+def _atributos(atributos):
+    """
+    Devuelve los atributos de una etiqueta como diccionario {nombre en minúsculas: valor}.
+
+    Si un atributo se repite gana el último, igual que con el parser de BeautifulSoup.
+    """
+    valores = {}
+    for atributo in PATRON_ATRIBUTOS.finditer(atributos):
+        valor = next((g for g in atributo.groups()[1:] if g is not None), b"")
+        valores[atributo.group(1).lower()] = valor
+    return valores
+
+
+def _quitar_no_elementos(contenido):
+    """Quita del HTML los comentarios y los bloques <script> y <style>."""
+    return PATRON_NO_ELEMENTOS.sub(b"", contenido)
+
+
+def _interior_elemento(contenido, etiqueta, inicio):
+    """Devuelve el contenido entre la apertura y el cierre correspondiente de una etiqueta."""
+    patron = re.compile(rb"<(/?)" + re.escape(etiqueta) + FIN_NOMBRE_ETIQUETA + rb"[^>]*>", re.IGNORECASE)
+    profundidad = 1
+    for marca in patron.finditer(contenido, inicio):
+        profundidad += -1 if marca.group(1) else 1
+        if profundidad == 0:
+            return contenido[inicio:marca.start()]
+    return contenido[inicio:]
+
+
+class ExtractorPrecios:
+    """
+    Extrae el precio de una página de producto probando una lista de selectores CSS.
+
+    Primero busca con expresiones regulares precompiladas sobre el HTML crudo,
+    sin construir el árbol, y se detiene en el primer selector que aparece. Si
+    ninguno aparece, recurre a BeautifulSoup con los mismos selectores. Lleva la
+    cuenta de qué estrategia resolvió cada página.
+    """
+
+    def __init__(self, nombre, selectores):
+        self.nombre = nombre
+        self.selectores = selectores
+        self.compilados = [SelectorCompilado(selector) for selector in selectores]
+        self.aciertos = Counter()
+        self._lock = threading.Lock()
+        _extractores[nombre] = self
+
+    def _registrar(self, estrategia):
+        with self._lock:
+            self.aciertos[estrategia] += 1
+
+    def extraer(self, contenido):
+        """
+        Devuelve el precio encontrado en el HTML (bytes o str), o None.
+
+        Como antes, el precio es el texto del primer selector presente en la página.
+        """
+        if isinstance(contenido, str):
+            contenido = contenido.encode("utf-8")
+
+        visible = _quitar_no_elementos(contenido)
+        for compilado in self.compilados:
+            texto = compilado.texto(visible)
+            if texto is not None:
+                self._registrar(f"rapida:{compilado.selector}")
+                return limpiar_precio(texto)
+
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(contenido, 'html.parser')
+        for selector in self.selectores:
+            elemento_precio = soup.select_one(selector)
+            if elemento_precio:
+                self._registrar(f"bs4:{selector}")
+                return limpiar_precio(elemento_precio.text)
+
+        self._registrar("sin_precio")
+        return None
+
+    def estadisticas(self):
+        """Devuelve, por estrategia, la cantidad de páginas resueltas y su proporción."""
+        with self._lock:
+            total = sum(self.aciertos.values())
+            return {
+                estrategia: {"paginas": cantidad, "proporcion": cantidad / total}
+                for estrategia, cantidad in self.aciertos.most_common()
+            }
+
+
+def estadisticas_extraccion():
+    """Devuelve las estadísticas de todos los extractores, por supermercado."""
+    return {nombre: extractor.estadisticas() for nombre, extractor in _extractores.items()}
@@ -0,0 +1,199 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import DIVISIONES_IPC
+from almacen import normalizar_tabla
+from utils import DIVISIONES_ALIMENTOS
+
+PROPORCION_ALIMENTOS = 0.85  # Parte de la canasta sintética que cae en divisiones de alimentos
+INFLACION_MENSUAL = (0.01, 0.05)  # Rango de la inflación mensual de cada división
+PROBABILIDAD_CAMBIO = 0.15  # Probabilidad de que un producto cambie de precio en una corrida
+PROBABILIDAD_FALTANTE = 0.01  # Probabilidad de que un producto no tenga precio en una corrida
+HORA_PRIMERA_CORRIDA = 9
+
+
+def _porcentaje(variacion, anterior):
+    return (variacion / anterior * 100).where(anterior != 0)
+
+
+def generar_canasta_sintetica(cantidad_productos, semilla=0):
+    """
+    Genera una canasta de productos como la que devuelve main.cargar_productos.
+
+    Las divisiones se asignan en proporción a sus pesos en DIVISIONES_IPC, con
+    la mayor parte de los productos en divisiones de alimentos.
+
+    Args:
+        cantidad_productos: Cantidad de productos de la canasta
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        Lista de diccionarios con codigo, nombre, division, cantidad_mensual y supermercado
+    """
+    rng = np.random.default_rng(semilla)
+    alimentos = [d for d in DIVISIONES_IPC if d in DIVISIONES_ALIMENTOS]
+    otras = [d for d in DIVISIONES_IPC if d not in DIVISIONES_ALIMENTOS]
+    pesos = np.array(
+        [PROPORCION_ALIMENTOS * DIVISIONES_IPC[d] / sum(DIVISIONES_IPC[a] for a in alimentos) for d in alimentos]
+        + [(1 - PROPORCION_ALIMENTOS) * DIVISIONES_IPC[d] / sum(DIVISIONES_IPC[o] for o in otras) for d in otras]
+    )
+    divisiones = rng.choice(alimentos + otras, size=cantidad_productos, p=pesos / pesos.sum())
+    cantidades = rng.choice([1.0, 2.0, 3.0, 4.0, 5.0, 8.0, 10.0], size=cantidad_productos)
+    return [
+        {
+            "codigo": str(100000 + i),
+            "nombre": f"Producto sintético {i:05d}",
+            "division": str(division),
+            "cantidad_mensual": float(cantidad),
+            "supermercado": "dia"
+        }
+        for i, (division, cantidad) in enumerate(zip(divisiones, cantidades))
+    ]
+
+
+def generar_historial_sintetico(productos, dias, corridas_por_dia=1, fin=None, semilla=0, precios_unitarios=None):
+    """
+    Genera el historial de una canasta con el formato de resumen_, divisiones_ y productos_YYYYMM.csv.
+
+    Cada división tiene su propia inflación mensual; los precios siguen una
+    caminata aleatoria con esa tendencia, pero solo cambian en una fracción de
+    las corridas (como en góndola) y a veces faltan. Como en main.guardar_datos,
+    el Precio de productos_ es el precio unitario por la cantidad_mensual.
+
+    Args:
+        productos: Canasta, por ejemplo la de generar_canasta_sintetica
+        dias: Cantidad de días del historial
+        corridas_por_dia: Corridas por día, separadas por tres horas
+        fin: Día de la última corrida (por defecto hoy)
+        semilla: Semilla del generador aleatorio
+        precios_unitarios: Precio unitario de cada producto en la última corrida
+            (por defecto, al azar entre $300 y $8.000)
+
+    Returns:
+        Tupla (df_resumen, df_divisiones, df_productos)
+    """
+    rng = np.random.default_rng(semilla)
+    fin = pd.Timestamp(fin if fin is not None else pd.Timestamp.now()).normalize()
+    inicio = fin - pd.Timedelta(days=dias - 1) + pd.Timedelta(hours=HORA_PRIMERA_CORRIDA)
+    fechas = pd.DatetimeIndex([
+        inicio + pd.Timedelta(days=d, hours=3 * c)
+        for d in range(dias) for c in range(corridas_por_dia)
+    ])
+    corridas = len(fechas)
+    cantidad = len(productos)
+
+    nombres = np.array([p["nombre"] for p in productos])
+    divisiones = np.array([p["division"] for p in productos])
+    cantidades = np.array([p["cantidad_mensual"] for p in productos])
+
+    # Tendencia por división, expresada por corrida
+    inflacion = {d: rng.uniform(*INFLACION_MENSUAL) for d in DIVISIONES_IPC}
+    tendencia = np.log1p(np.array([inflacion[d] for d in divisiones])) / (30 * corridas_por_dia)
+
+    # Saltos de precio: acumulan la tendencia desde el último cambio más ruido propio
+    cambios = rng.random((corridas, cantidad)) < PROBABILIDAD_CAMBIO
+    cambios[0] = True
+    ruido = rng.normal(0, 0.02, (corridas, cantidad))
+    nivel = np.cumsum(np.broadcast_to(tendencia, (corridas, cantidad)), axis=0) + np.cumsum(ruido * cambios, axis=0)
+    ultimo_cambio = np.maximum.accumulate(np.where(cambios, np.arange(corridas)[:, None], 0), axis=0)
+    nivel = np.take_along_axis(nivel, ultimo_cambio, axis=0)
+    base = rng.uniform(300, 8000, cantidad)
+    if precios_unitarios is not None:
+        # La caminata termina en los precios indicados
+        base = np.asarray(precios_unitarios, dtype='float64')
+        nivel = nivel - nivel[-1]
+    precios = np.round(base * np.exp(nivel) * cantidades, 2)
+    precios[rng.random((corridas, cantidad)) < PROBABILIDAD_FALTANTE] = np.nan
+
+    fechas_texto = fechas.strftime('%Y-%m-%d %H:%M')
+    df_productos = pd.DataFrame({
+        'Fecha': np.repeat(fechas_texto, cantidad),
+        'Producto': np.tile(nombres, corridas),
+        'Division': np.tile(divisiones, corridas),
+        'Precio': precios.ravel(),
+    })
+    anterior = df_productos.groupby('Producto', sort=False)['Precio'].shift()
+    df_productos['Variacion'] = df_productos['Precio'] - anterior
+    df_productos['Porcentaje'] = _porcentaje(df_productos['Variacion'], anterior)
+
+    # Totales por división (todas las de DIVISIONES_IPC, como guardar_datos)
+    totales = np.nan_to_num(precios)
+    df_divisiones = pd.DataFrame({
+        division: totales[:, divisiones == division].sum(axis=1) for division in DIVISIONES_IPC
+    }, index=fechas_texto).rename_axis('Fecha').reset_index().melt(
+        id_vars='Fecha', var_name='Division', value_name='Total'
+    )
+    df_divisiones['Orden'] = df_divisiones['Division'].map({d: i for i, d in enumerate(DIVISIONES_IPC)})
+    df_divisiones = df_divisiones.sort_values(['Fecha', 'Orden'], kind='stable', ignore_index=True).drop(columns='Orden')
+    anterior = df_divisiones.groupby('Division', sort=False)['Total'].shift()
+    df_divisiones['Variacion'] = df_divisiones['Total'] - anterior
+    df_divisiones['Porcentaje'] = _porcentaje(df_divisiones['Variacion'], anterior)
+    df_divisiones['IPC'] = df_divisiones['Porcentaje'].fillna(0)
+
+    total = pd.Series(totales.sum(axis=1))
+    anterior = total.shift()
+    df_resumen = pd.DataFrame({
+        'Fecha': fechas_texto,
+        'Total_Canasta': total,
+        'Variacion_Total': total - anterior,
+        'Porcentaje_Total': _porcentaje(total - anterior, anterior),
+    })
+    df_resumen['IPC_General'] = df_resumen['Porcentaje_Total'].fillna(0)
+
+    return (
+        normalizar_tabla("resumen", df_resumen),
+        normalizar_tabla("divisiones", df_divisiones),
+        normalizar_tabla("productos", df_productos)
+    )
+
+
+def guardar_historial_sintetico(df_resumen, df_divisiones, df_productos, directorio="."):
+    """
+    Escribe el historial en CSV mensuales (resumen_, divisiones_ y productos_YYYYMM.csv).
+
+    Returns:
+        Lista de rutas escritas
+    """
+    os.makedirs(directorio, exist_ok=True)
+    rutas = []
+    for tabla, df in (("resumen", df_resumen), ("divisiones", df_divisiones), ("productos", df_productos)):
+        meses = df['Fecha'].str[:7].str.replace('-', '')
+        for mes, filas in df.groupby(meses, sort=True):
+            ruta = os.path.join(directorio, f"{tabla}_{mes}.csv")
+            filas.to_csv(ruta, index=False)
+            rutas.append(ruta)
+    return rutas
+
+
+def generar_datos_sinteticos(cantidad_productos, dias, corridas_por_dia=1, fin=None, semilla=0, directorio="."):
+    """
+    Genera una canasta y su historial y los escribe en CSV mensuales.
+
+    Returns:
+        Tupla (productos, df_resumen, df_divisiones, df_productos)
+    """
+    productos = generar_canasta_sintetica(cantidad_productos, semilla)
+    tablas = generar_historial_sintetico(productos, dias, corridas_por_dia, fin, semilla)
+    guardar_historial_sintetico(*tablas, directorio=directorio)
+    return (productos, *tablas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un historial sintético de precios en CSV mensuales.")
+    parser.add_argument("--productos", type=int, default=100, help="Cantidad de productos de la canasta")
+    parser.add_argument("--dias", type=int, default=60, help="Cantidad de días del historial")
+    parser.add_argument("--corridas", type=int, default=1, help="Corridas por día")
+    parser.add_argument("--fin", default=None, help="Día de la última corrida (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--directorio", default=".")
+    args = parser.parse_args()
+
+    productos, df_resumen, df_divisiones, df_productos = generar_datos_sinteticos(
+        args.productos, args.dias, args.corridas, args.fin, args.semilla, args.directorio
+    )
+    print(f"Historial sintético generado en {args.directorio}:")
+    print(f"- {len(productos)} productos, {len(df_resumen)} corridas")
+    print(f"- {len(df_productos)} filas de productos, {len(df_divisiones)} filas de divisiones")
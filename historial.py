@@ -0,0 +1,173 @@
+import glob
+import os
+import re
+
+import pandas as pd
+
+from config import BACKEND_ALMACENAMIENTO, DIRECTORIO_HISTORIAL, ARCHIVO_SQLITE
+from almacen import TABLAS, COLUMNAS_TEXTO, meses_disponibles, iterar_particiones, compactar_tabla
+
+PATRON_MES = re.compile(r"_(\d{6})\.csv$")
+
+
+def tipos_columnas(tabla, columnas=None):
+    """Tipos fijos de lectura para las columnas de una tabla."""
+    columnas = columnas or TABLAS[tabla]
+    return {c: (str if c in COLUMNAS_TEXTO else 'float64') for c in columnas}
+
+
+def raiz_particiones(directorio="."):
+    """Directorio del historial particionado correspondiente al directorio de datos."""
+    return os.path.join(directorio, DIRECTORIO_HISTORIAL)
+
+
+def meses_historial(tabla="productos", directorio="."):
+    """Devuelve los meses (YYYYMM) con datos guardados para la tabla, ordenados."""
+    if BACKEND_ALMACENAMIENTO == "particionado":
+        return meses_disponibles(tabla, raiz_particiones(directorio))
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        from almacen_sqlite import meses_sqlite
+        return meses_sqlite()
+    meses = []
+    for ruta in glob.glob(os.path.join(directorio, f"{tabla}_*.csv")):
+        coincidencia = PATRON_MES.search(os.path.basename(ruta))
+        if coincidencia and os.path.basename(ruta) == f"{tabla}_{coincidencia.group(1)}.csv":
+            meses.append(coincidencia.group(1))
+    return sorted(meses)
+
+
+def _estado_archivo(ruta):
+    try:
+        return os.stat(ruta)
+    except FileNotFoundError:
+        return None
+
+
+def firma_historial(tablas=TABLAS, directorio="."):
+    """
+    Fecha de modificación y tamaño de los archivos del último mes de cada tabla.
+
+    Cambia cada vez que se guarda una corrida, así que sirve para saber si el
+    historial cambió desde la última lectura sin volver a leerlo.
+    """
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        # Las corridas nuevas se escriben primero en el archivo -wal
+        return tuple(
+            (estado.st_mtime_ns, estado.st_size) if estado else None
+            for estado in map(_estado_archivo, (ARCHIVO_SQLITE, ARCHIVO_SQLITE + "-wal"))
+        )
+    firma = []
+    for tabla in tablas:
+        meses = meses_historial(tabla, directorio)
+        if not meses:
+            firma.append(None)
+            continue
+        if BACKEND_ALMACENAMIENTO == "particionado":
+            ruta = os.path.join(raiz_particiones(directorio), tabla, f"mes={meses[-1]}")
+        else:
+            ruta = os.path.join(directorio, f"{tabla}_{meses[-1]}.csv")
+        estado = _estado_archivo(ruta)
+        firma.append((meses[-1], estado.st_mtime_ns, estado.st_size) if estado else None)
+    return tuple(firma)
+
+
+def _limites(desde, hasta):
+    """Convierte los límites de fecha a cadenas comparables con la columna Fecha."""
+    inicio = fin = None
+    if desde is not None:
+        inicio = pd.Timestamp(desde).strftime('%Y-%m-%d %H:%M')
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta)
+        if hasta == hasta.normalize():
+            # Una fecha sin hora incluye el día completo
+            hasta = hasta + pd.Timedelta(days=1) - pd.Timedelta(minutes=1)
+        fin = hasta.strftime('%Y-%m-%d %H:%M')
+    return inicio, fin
+
+
+def _filtrar(df, inicio, fin):
+    if inicio is not None:
+        df = df[df['Fecha'] >= inicio]
+    if fin is not None:
+        df = df[df['Fecha'] <= fin]
+    return df
+
+
+def _bloques_sqlite(tabla, columnas, inicio, fin, tamano_bloque, compacto=False):
+    # La base resuelve el rango completo con sus índices, sin recorrer mes por mes
+    from almacen_sqlite import leer_tabla_sqlite
+    lector = leer_tabla_sqlite(tabla, inicio, fin, columnas, tamano_bloque=tamano_bloque)
+    for bloque in lector if tamano_bloque is not None else [lector]:
+        if not bloque.empty:
+            yield compactar_tabla(tabla, bloque) if compacto else bloque
+
+
+def _bloques(tabla, meses, columnas, inicio, fin, tamano_bloque, directorio, compacto=False):
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        yield from _bloques_sqlite(tabla, columnas, inicio, fin, tamano_bloque, compacto)
+        return
+    for mes in meses:
+        if BACKEND_ALMACENAMIENTO == "particionado":
+            tipos_numericos = {c: t for c, t in tipos_columnas(tabla, columnas).items() if t != str}
+            lector = (
+                particion.astype(tipos_numericos)
+                for particion in iterar_particiones(
+                    tabla, desde=mes, hasta=mes, columnas=columnas,
+                    directorio=raiz_particiones(directorio), tamano_bloque=tamano_bloque
+                )
+            )
+        else:
+            lector = pd.read_csv(
+                os.path.join(directorio, f"{tabla}_{mes}.csv"),
+                usecols=columnas,
+                dtype=tipos_columnas(tabla, columnas),
+                chunksize=tamano_bloque
+            )
+            if tamano_bloque is None:
+                lector = [lector]
+        for bloque in lector:
+            bloque = _filtrar(bloque, inicio, fin)
+            if not bloque.empty:
+                yield compactar_tabla(tabla, bloque) if compacto else bloque
+
+
+def cargar_historial(tabla="productos", desde=None, hasta=None, columnas=None, tamano_bloque=None, directorio=".",
+                     compacto=False):
+    """
+    Carga el historial de una tabla abarcando todos los meses guardados.
+
+    Solo se abren los meses que se superponen con el rango pedido y solo se
+    leen las columnas indicadas, con tipos fijos.
+
+    Args:
+        tabla: 'resumen', 'divisiones' o 'productos'
+        desde: Fecha inicial inclusive (str o datetime), o None para no acotar
+        hasta: Fecha final inclusive (una fecha sin hora incluye todo el día), o None
+        columnas: Columnas a leer ('Fecha' se agrega siempre), o None para todas
+        tamano_bloque: Si se indica, devuelve un iterador de DataFrames de a lo sumo
+            esa cantidad de filas en lugar de un único DataFrame
+        compacto: Si es True, usa tipos compactos (ver almacen.compactar_tabla)
+
+    Returns:
+        DataFrame con las filas del rango, o un iterador de DataFrames
+    """
+    columnas = list(columnas or TABLAS[tabla])
+    if 'Fecha' not in columnas:
+        columnas.insert(0, 'Fecha')
+    inicio, fin = _limites(desde, hasta)
+
+    meses = [] if BACKEND_ALMACENAMIENTO == "sqlite" else [
+        mes for mes in meses_historial(tabla, directorio)
+        if (inicio is None or mes >= inicio[:7].replace('-', ''))
+        and (fin is None or mes <= fin[:7].replace('-', ''))
+    ]
+    if tamano_bloque is not None:
+        return _bloques(tabla, meses, columnas, inicio, fin, tamano_bloque, directorio, compacto)
+
+    partes = list(_bloques(tabla, meses, columnas, inicio, fin, tamano_bloque, directorio))
+    if not partes:
+        df = pd.DataFrame({c: pd.Series(dtype=t) for c, t in tipos_columnas(tabla, columnas).items()})
+    else:
+        df = pd.concat(partes, ignore_index=True)
+    # Se compacta una vez sobre el total para que las categorías sean las mismas en todos los meses
+    return compactar_tabla(tabla, df) if compacto else df
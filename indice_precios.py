@@ -0,0 +1,176 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from config import ARCHIVO_INDICE_PRECIOS, DIAS_RETENIDOS_INDICE
+from almacen import a_float64
+from historial import cargar_historial
+from ultima_corrida import fecha_ultima_corrida
+
+
+def _valor(valor):
+    """Convierte un valor del historial a float, o None si falta."""
+    return None if valor is None or pd.isna(valor) else float(valor)
+
+
+def _fecha_texto(fecha):
+    """Devuelve la fecha como 'YYYY-MM-DD HH:MM', el formato con el que se guardan las corridas."""
+    return fecha.strftime('%Y-%m-%d %H:%M') if isinstance(fecha, datetime) else fecha
+
+
+def _fechas_texto(fechas):
+    """Como _fecha_texto, para una columna Fecha (que puede estar cargada como datetime64)."""
+    if pd.api.types.is_datetime64_any_dtype(fechas):
+        return fechas.dt.strftime('%Y-%m-%d %H:%M')
+    return fechas
+
+
+class IndicePrecios:
+    """
+    Índice de los últimos valores guardados en el historial.
+
+    Mantiene, para consultas en O(1):
+    - la fecha de la última corrida y, por producto y por división, el último
+      valor guardado junto con su fecha;
+    - el primer precio registrado de cada producto en cada día (para comparar
+      contra el día anterior);
+    - el total de la canasta de la última corrida.
+    """
+
+    def __init__(self):
+        self.ultima_fecha = None
+        self.ultimo_total_canasta = None
+        self.ultimos_productos = {}  # producto -> [fecha, precio]
+        self.ultimas_divisiones = {}  # division -> [fecha, total]
+        self.precios_por_dia = {}  # 'YYYY-MM-DD' -> {producto: precio}
+
+    # --- Consultas ---
+
+    def precio_en_fecha(self, producto, dia):
+        """Devuelve el primer precio del producto en el día 'YYYY-MM-DD' (o None)."""
+        return self.precios_por_dia.get(dia, {}).get(producto)
+
+    def producto_en_ultima_corrida(self, producto):
+        """Indica si el producto figura en la última corrida y devuelve su precio."""
+        fecha, precio = self.ultimos_productos.get(producto, (None, None))
+        return fecha is not None and fecha == self.ultima_fecha, precio
+
+    def division_en_ultima_corrida(self, division):
+        """Indica si la división figura en la última corrida y devuelve su total."""
+        fecha, total = self.ultimas_divisiones.get(division, (None, None))
+        return fecha is not None and fecha == self.ultima_fecha, total
+
+    # --- Actualización ---
+
+    def registrar_corrida(self, fecha, df_resumen=None, df_divisiones=None, df_productos=None):
+        """Incorpora al índice las filas de una corrida (o de un historial completo, en orden)."""
+        if df_resumen is not None and not df_resumen.empty:
+            self.ultimo_total_canasta = _valor(a_float64(df_resumen["Total_Canasta"]).iloc[-1])
+
+        if df_divisiones is not None:
+            for fila_fecha, division, total in zip(_fechas_texto(df_divisiones["Fecha"]), df_divisiones["Division"], a_float64(df_divisiones["Total"])):
+                self.ultimas_divisiones[division] = [fila_fecha, _valor(total)]
+
+        if df_productos is not None:
+            for fila_fecha, producto, precio in zip(_fechas_texto(df_productos["Fecha"]), df_productos["Producto"], a_float64(df_productos["Precio"])):
+                self.ultimos_productos[producto] = [fila_fecha, _valor(precio)]
+                precios_dia = self.precios_por_dia.setdefault(str(fila_fecha)[:10], {})
+                if producto not in precios_dia and not pd.isna(precio):
+                    precios_dia[producto] = float(precio)
+
+        if fecha is not None:
+            self.ultima_fecha = _fecha_texto(fecha)
+        self._podar()
+
+    def _podar(self):
+        """Descarta los precios diarios más viejos que DIAS_RETENIDOS_INDICE antes del día más reciente del índice."""
+        if not self.precios_por_dia:
+            return
+        ultimo_dia = datetime.strptime(max(self.precios_por_dia), '%Y-%m-%d')
+        limite = (ultimo_dia - timedelta(days=DIAS_RETENIDOS_INDICE)).strftime('%Y-%m-%d')
+        for dia in [d for d in self.precios_por_dia if d < limite]:
+            del self.precios_por_dia[dia]
+
+    @classmethod
+    def desde_historial(cls, df_resumen=None, df_divisiones=None, df_productos=None):
+        """Construye el índice recorriendo una sola vez el historial dado."""
+        indice = cls()
+        fechas = [
+            df["Fecha"].max() for df in (df_resumen, df_divisiones, df_productos)
+            if df is not None and not df.empty
+        ]
+        indice.registrar_corrida(
+            max(fechas) if fechas else None,
+            df_resumen=df_resumen,
+            df_divisiones=df_divisiones,
+            df_productos=df_productos
+        )
+        return indice
+
+    # --- Persistencia ---
+
+    def guardar(self, ruta=ARCHIVO_INDICE_PRECIOS):
+        """Guarda el índice en disco de forma atómica."""
+        datos = {
+            "ultima_fecha": self.ultima_fecha,
+            "ultimo_total_canasta": self.ultimo_total_canasta,
+            "ultimos_productos": self.ultimos_productos,
+            "ultimas_divisiones": self.ultimas_divisiones,
+            "precios_por_dia": self.precios_por_dia,
+        }
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta=ARCHIVO_INDICE_PRECIOS):
+        """Carga el índice desde disco."""
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        indice = cls()
+        indice.ultima_fecha = datos.get("ultima_fecha")
+        indice.ultimo_total_canasta = datos.get("ultimo_total_canasta")
+        indice.ultimos_productos = datos.get("ultimos_productos", {})
+        indice.ultimas_divisiones = datos.get("ultimas_divisiones", {})
+        indice.precios_por_dia = datos.get("precios_por_dia", {})
+        return indice
+
+
+def reconstruir_indice_precios(ruta=ARCHIVO_INDICE_PRECIOS):
+    """Reconstruye el índice desde los últimos DIAS_RETENIDOS_INDICE días del historial y lo guarda."""
+    ultima = fecha_ultima_corrida()
+    desde = None
+    if ultima is not None:
+        desde = (datetime.strptime(ultima[:10], '%Y-%m-%d') - timedelta(days=DIAS_RETENIDOS_INDICE)).strftime('%Y-%m-%d')
+    indice = IndicePrecios.desde_historial(
+        cargar_historial("resumen", desde=desde),
+        cargar_historial("divisiones", desde=desde),
+        cargar_historial("productos", desde=desde)
+    )
+    indice.guardar(ruta)
+    return indice
+
+
+def cargar_indice_precios(ruta=ARCHIVO_INDICE_PRECIOS):
+    """
+    Carga el índice persistido, comprobando que esté al día con el historial.
+
+    Si no existe, no se puede leer o su última corrida no es la última del
+    historial (por ejemplo, tras importar datos, cambiar de backend o una
+    corrida de otro proceso que no actualizó este archivo), se reconstruye.
+    """
+    if os.path.exists(ruta):
+        try:
+            indice = IndicePrecios.cargar(ruta)
+        except (OSError, ValueError) as e:
+            print(f"Advertencia: No se pudo leer el índice de precios ({e}). Se reconstruye.")
+        else:
+            ultima_fecha = fecha_ultima_corrida()
+            if indice.ultima_fecha == ultima_fecha:
+                return indice
+            print(f"Advertencia: El índice de precios llega a {indice.ultima_fecha} y el historial a {ultima_fecha}. Se reconstruye.")
+
+    return reconstruir_indice_precios(ruta)
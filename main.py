@@ -1,32 +1,22 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-import time
+import sys
+import cProfile
 from datetime import datetime
 import os
-import json
-import csv
 import pandas as pd
-import difflib
-from statistics import mean
 
-from config import DIVISIONES_IPC
-from utils import (
-    es_primer_dia_del_mes,
-    crear_nuevo_mes_csv,
-    obtener_ultimos_csvs,
-    validar_division,
-    calcular_variacion_semanal,
-    calcular_variacion_mensual,
-    calcular_variacion_mensual_intermensual,
-    limpiar_precio
-)
-from scrapers import (
-    obtener_precio_dia,
-    obtener_precio_disco,
-    obtener_precio_coto,
-    obtener_precio_jumbo
-)
+from config import DIVISIONES_IPC, SUPERMERCADO_POR_DEFECTO, ARCHIVO_METRICAS, BACKEND_ALMACENAMIENTO, ARCHIVO_INDICE_PRECIOS
+from sesion_http import estadisticas_conexiones, estadisticas_cache, estadisticas_limitador
+from extraccion import estadisticas_extraccion
+from canasta import cargar_canasta
+from metricas import iniciar_corrida, finalizar_corrida, etapa
+from almacen import guardar_corrida
+from indice_precios import IndicePrecios, cargar_indice_precios
+from motor_indices import MotorIndices
+from historial import cargar_historial, firma_historial
+from agregados import existen_agregados, reconstruir_agregados, actualizar_agregados
+from reportes import escribir_resumen, generar_reportes
+from utils import obtener_ultimos_csvs
+from scrapers import obtener_precios_canasta
 
 # --- Headers mejorados para simular un navegador real ---
 HEADERS = {
@@ -39,41 +29,15 @@ HEADERS = {
 }
 
 def cargar_productos():
-    """Carga los productos desde el archivo mi_carrito.txt."""
-    productos = []
-    productos_ignorados = []
-    
-    if os.path.exists("mi_carrito.txt"):
-        with open("mi_carrito.txt", "r", encoding="utf-8") as f:
-            for linea in f:
-                if linea.strip():
-                    partes = linea.strip().split(';')
-                    if len(partes) >= 4:  # código, nombre, categoría, cantidad mensual
-                        codigo, nombre, division, cantidad = partes
-                        division = division.strip()
-                        try:
-                            cantidad = float(cantidad.strip())
-                        except ValueError:
-                            print(f"Advertencia: Cantidad mensual inválida para producto '{nombre.strip()}'. Se usa 1 por defecto.")
-                            cantidad = 1.0
-                        
-                        division = validar_division(division)
-                        
-                        productos.append({
-                            "codigo": codigo.strip(),
-                            "nombre": nombre.strip(),
-                            "division": division,
-                            "cantidad_mensual": cantidad
-                        })
-                    else:
-                        print(f"Advertencia: Formato incorrecto en línea: {linea}")
-                        productos_ignorados.append(linea.strip())
-    else:
+    """Carga los productos desde el archivo mi_carrito.txt (usando la canasta compilada si no cambió)."""
+    canasta = cargar_canasta("mi_carrito.txt")
+    if canasta is None:
         print("No se encontró el archivo mi_carrito.txt")
         exit(1)
+    productos, productos_ignorados = canasta
 
     if productos_ignorados:
-        print("\nProductos ignorados por formato incorrecto:")
+        print("\nProductos ignorados por formato incorrecto o supermercado no soportado:")
         for p in productos_ignorados:
             print(f"- {p}")
             
@@ -89,8 +53,12 @@ def obtener_precios(productos):
     print(f"Obteniendo precios de la canasta personalizada...\n")
     print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
 
+    # Consultar cada supermercado en paralelo (Día por lotes de códigos)
+    precios_por_codigo, codigos_faltantes = obtener_precios_canasta(productos)
+
     for producto in productos:
-        precio = obtener_precio_dia(producto["codigo"])
+        supermercado = producto.get("supermercado", SUPERMERCADO_POR_DEFECTO)
+        precio = precios_por_codigo.get((supermercado, str(producto["codigo"])))
         if precio is not None:
             precio_total = precio * producto["cantidad_mensual"]
             precios[producto["nombre"]] = precio_total
@@ -101,12 +69,44 @@ def obtener_precios(productos):
             print(f"{producto['nombre']} (x{producto['cantidad_mensual']} unidades mensuales): ${precio_total:.2f} (${precio:.2f} c/u)")
         else:
             print(f"{producto['nombre']}: No disponible")
-        time.sleep(2)  # Esperar 2 segundos entre peticiones
+
+    for supermercado, faltantes in codigos_faltantes.items():
+        print(f"\nCódigos sin precio en {supermercado} ({len(faltantes)}): {', '.join(faltantes)}")
+
+    conexiones = estadisticas_conexiones()
+    print(f"\nConexiones HTTP: {conexiones['peticiones']} peticiones, "
+          f"{conexiones['conexiones_nuevas']} conexiones nuevas, {conexiones['reutilizadas']} reutilizadas")
+    cache = estadisticas_cache()
+    if cache:
+        print(f"Caché HTTP: {cache['aciertos']} aciertos, {cache['revalidados']} revalidados, "
+              f"{cache['fallos']} fallos ({cache['entradas']} entradas, {cache['bytes'] / 1024:.0f} KB)")
+    for host, estado in estadisticas_limitador().items():
+        print(f"Limitador {host}: {estado['tasa']:.2f} req/s, {estado['peticiones']} peticiones, "
+              f"{estado['saturaciones']} saturaciones, {estado['reintentos']} reintentos")
+    for supermercado, estrategias in estadisticas_extraccion().items():
+        if estrategias:
+            detalle = ", ".join(f"{e}: {d['paginas']} ({d['proporcion']:.0%})" for e, d in estrategias.items())
+            print(f"Extracción HTML {supermercado}: {detalle}")
         
     return precios, precios_por_division, cantidades_por_division, total
 
-def generar_resumen(precios, precios_por_division, cantidades_por_division, total, df_productos, productos):
-    """Genera el resumen de precios y variaciones de la canasta básica de alimentos."""
+def _precio_unitario(precio_total, cantidad_mensual):
+    """Precio unitario a partir del precio por la cantidad mensual, o None si no se puede calcular."""
+    if precio_total is None or pd.isna(precio_total) or not cantidad_mensual:
+        return None
+    return precio_total / cantidad_mensual
+
+def generar_resumen(precios, precios_por_division, cantidades_por_division, total, df_productos, productos, indice=None):
+    """Genera el resumen de precios y variaciones de la canasta básica de alimentos.
+    
+    Los precios del día anterior se buscan en el índice de precios; si no se
+    indica uno, se construye en una sola pasada sobre df_productos (o sobre el
+    historial del mes, si tampoco se indica). Con el backend "sqlite" se
+    consultan directamente en la base."""
+    if indice is None and BACKEND_ALMACENAMIENTO != "sqlite":
+        if df_productos is None:
+            df_productos = obtener_ultimos_csvs()[2]
+        indice = IndicePrecios.desde_historial(df_productos=df_productos)
     resumen = []
     fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M')
     fecha_ayer = (datetime.now() - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
@@ -130,80 +130,74 @@ def generar_resumen(precios, precios_por_division, cantidades_por_division, tota
     ]
     
     resumen.append("\nIPC por División (variación diaria comparable):")
-    ipc_divisiones = {}
-    total_valor_actual_canasta_alimentos_comparable = 0
-    total_valor_anterior_canasta_alimentos_comparable = 0
     
-    # Filtrar los productos de la canasta que pertenecen a las divisiones de alimentos
+    # Matriz productos × (ayer, hoy) con los precios unitarios de los productos de alimentos.
+    # El historial guarda el precio por la cantidad mensual, igual que 'precios'
     productos_de_alimentos_config = [p for p in productos if p["division"] in divisiones_alimentos]
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        from almacen_sqlite import precios_en_dia
+        precios_ayer = precios_en_dia(fecha_ayer)
+    else:
+        precios_ayer = {p["nombre"]: indice.precio_en_fecha(p["nombre"], fecha_ayer) for p in productos_de_alimentos_config}
+    hoy = pd.Timestamp(fecha_actual[:10])
+    motor = MotorIndices(
+        [p["nombre"] for p in productos_de_alimentos_config],
+        [p["division"] for p in productos_de_alimentos_config],
+        [pd.Timestamp(fecha_ayer), hoy],
+        [
+            [
+                _precio_unitario(precios_ayer.get(p["nombre"]), p["cantidad_mensual"]),
+                _precio_unitario(precios.get(p["nombre"]), p["cantidad_mensual"])
+            ]
+            for p in productos_de_alimentos_config
+        ],
+        [p["cantidad_mensual"] for p in productos_de_alimentos_config]
+    )
+    comparacion = motor.comparar(fecha_ayer, hoy)
     
-    for division_cfg, peso_config_division in DIVISIONES_IPC.items():
+    ipc_divisiones = {}
+    for division_cfg in DIVISIONES_IPC:
         if division_cfg not in divisiones_alimentos:
             continue
-            
-        valor_actual_division_comparable = 0
-        valor_anterior_division_comparable = 0
-        productos_contados_en_division = 0
-        
-        for producto_canasta in productos_de_alimentos_config:
-            if producto_canasta["division"] == division_cfg:
-                nombre_producto = producto_canasta["nombre"]
-                cantidad_mensual = producto_canasta["cantidad_mensual"]
-                
-                # El precio actual ya está ponderado por cantidad_mensual en el diccionario 'precios'
-                precio_total_actual_producto = precios.get(nombre_producto)
-                
-                # Buscar precio unitario del día anterior en el histórico df_productos
-                producto_ayer_df = df_productos[
-                    (df_productos["Producto"] == nombre_producto) & 
-                    (df_productos["Fecha"].str.startswith(fecha_ayer))
-                ] if not df_productos.empty else pd.DataFrame()
-                
-                if precio_total_actual_producto is not None and not producto_ayer_df.empty:
-                    precio_unitario_ayer = producto_ayer_df.iloc[0]["Precio"]
-                    
-                    if pd.notna(precio_unitario_ayer):
-                        precio_total_anterior_producto = precio_unitario_ayer * cantidad_mensual
-                        
-                        valor_actual_division_comparable += precio_total_actual_producto
-                        valor_anterior_division_comparable += precio_total_anterior_producto
-                        productos_contados_en_division += 1
         
-        if productos_contados_en_division > 0:
-            variacion_division_comparable = valor_actual_division_comparable - valor_anterior_division_comparable
+        if division_cfg in comparacion.index and comparacion.at[division_cfg, 'Productos'] > 0:
+            valor_anterior = comparacion.at[division_cfg, 'Valor_Anterior']
+            variacion_division_comparable = comparacion.at[division_cfg, 'Valor_Actual'] - valor_anterior
+            porcentaje_division_comparable = (variacion_division_comparable / valor_anterior) * 100 if valor_anterior != 0 else 0
             
-            if valor_anterior_division_comparable != 0:
-                porcentaje_division_comparable = (variacion_division_comparable / valor_anterior_division_comparable) * 100
-            else:
-                porcentaje_division_comparable = 0
-                
-            ipc_divisiones[division_cfg] = porcentaje_division_comparable
+            ipc_divisiones[division_cfg] = float(porcentaje_division_comparable)
             signo = "+" if variacion_division_comparable >= 0 else ""
-            resumen.append(f"- {division_cfg}: {signo}{porcentaje_division_comparable:.2f}% (sobre {productos_contados_en_division} prod. comparables)")
+            resumen.append(f"- {division_cfg}: {signo}{porcentaje_division_comparable:.2f}% (sobre {comparacion.at[division_cfg, 'Productos']} prod. comparables)")
         else:
             ipc_divisiones[division_cfg] = 0.0
             resumen.append(f"- {division_cfg}: No hay datos suficientes para comparación diaria.")
-        
-        total_valor_actual_canasta_alimentos_comparable += valor_actual_division_comparable
-        total_valor_anterior_canasta_alimentos_comparable += valor_anterior_division_comparable
     
-    # Calcular IPC general basado solo en el conjunto de productos comparables
+    # IPC general: promedio de las divisiones comparables ponderado por los pesos de DIVISIONES_IPC
     ipc_general_final_a_guardar = 0.0
-    if total_valor_anterior_canasta_alimentos_comparable != 0:
-        variacion_total_directa_comparable = total_valor_actual_canasta_alimentos_comparable - total_valor_anterior_canasta_alimentos_comparable
-        ipc_general_final_a_guardar = (variacion_total_directa_comparable / total_valor_anterior_canasta_alimentos_comparable) * 100
-        resumen.append(f"\nIPC General Canasta Alimentos (Variación Diaria Directa Comparable): {ipc_general_final_a_guardar:+.2f}%")
+    total_valor_actual_canasta_alimentos_comparable = comparacion['Valor_Actual'].sum()
+    total_valor_anterior_canasta_alimentos_comparable = comparacion['Valor_Anterior'].sum()
+    indice_general = motor.indices(base=fecha_ayer).at[hoy, 'General']
+    if not pd.isna(indice_general):
+        ipc_general_final_a_guardar = float(indice_general - 100)
+        resumen.append(f"\nIPC General Canasta Alimentos (Variación Diaria Comparable, ponderada por división): {ipc_general_final_a_guardar:+.2f}%")
         resumen.append(f"  Valor Actual Canasta Comparable: ${total_valor_actual_canasta_alimentos_comparable:.2f}")
         resumen.append(f"  Valor Anterior Canasta Comparable: ${total_valor_anterior_canasta_alimentos_comparable:.2f}")
     else:
-        resumen.append("\nIPC General Canasta Alimentos (Variación Diaria Directa Comparable): No hay suficientes datos comparables para ayer.")
+        resumen.append("\nIPC General Canasta Alimentos (Variación Diaria Comparable, ponderada por división): No hay suficientes datos comparables para ayer.")
     
     return resumen, ipc_divisiones, ipc_general_final_a_guardar
 
-def guardar_datos(fecha_actual, total, ipc_general, ipc_divisiones, precios_por_division, precios, productos):
-    """Guarda los datos en los archivos CSV."""
-    # Obtener o crear los DataFrames
-    df_resumen, df_divisiones, df_productos = obtener_ultimos_csvs()
+def guardar_datos(fecha_actual, total, ipc_general, ipc_divisiones, precios_por_division, precios, productos, indice=None):
+    """
+    Guarda los datos en los archivos CSV y actualiza el índice de precios.
+    
+    Los valores anteriores se toman del índice, así que no se lee el historial
+    del mes; en disco solo se agregan las filas de la corrida.
+    
+    Returns:
+        Tupla con las filas nuevas (resumen, divisiones, productos)"""
+    if indice is None:
+        indice = cargar_indice_precios()
     
     # 1. Guardar resumen general
     nueva_fila_resumen = {
@@ -213,17 +207,17 @@ def guardar_datos(fecha_actual, total, ipc_general, ipc_divisiones, precios_por_
     }
     
     # Calcular variaciones del total
-    if not df_resumen.empty:
-        total_anterior = df_resumen.iloc[-1]["Total_Canasta"]
+    if indice.ultimo_total_canasta is not None:
+        total_anterior = indice.ultimo_total_canasta
         variacion_total = total - total_anterior
-        porcentaje_total = (variacion_total / total_anterior) * 100
+        porcentaje_total = (variacion_total / total_anterior) * 100 if total_anterior != 0 else None
         nueva_fila_resumen["Variacion_Total"] = variacion_total
         nueva_fila_resumen["Porcentaje_Total"] = porcentaje_total
     else:
         nueva_fila_resumen["Variacion_Total"] = None
         nueva_fila_resumen["Porcentaje_Total"] = None
     
-    df_resumen = pd.concat([df_resumen, pd.DataFrame([nueva_fila_resumen])], ignore_index=True)
+    df_resumen_nuevo = pd.DataFrame([nueva_fila_resumen])
     
     # 2. Guardar datos por división
     filas_divisiones = []
@@ -236,27 +230,19 @@ def guardar_datos(fecha_actual, total, ipc_general, ipc_divisiones, precios_por_
             "IPC": ipc_divisiones.get(division, 0)
         }
         
-        if not df_divisiones.empty:
-            division_anterior = df_divisiones[
-                (df_divisiones["Division"] == division) & 
-                (df_divisiones["Fecha"] == df_divisiones["Fecha"].max())
-            ]
-            if not division_anterior.empty:
-                total_anterior = division_anterior.iloc[0]["Total"]
-                variacion = total_division - total_anterior
-                porcentaje = (variacion / total_anterior) * 100
-                nueva_fila_division["Variacion"] = variacion
-                nueva_fila_division["Porcentaje"] = porcentaje
-            else:
-                nueva_fila_division["Variacion"] = None
-                nueva_fila_division["Porcentaje"] = None
+        en_ultima_corrida, total_anterior = indice.division_en_ultima_corrida(division)
+        if en_ultima_corrida and total_anterior is not None:
+            variacion = total_division - total_anterior
+            porcentaje = (variacion / total_anterior) * 100 if total_anterior != 0 else None
+            nueva_fila_division["Variacion"] = variacion
+            nueva_fila_division["Porcentaje"] = porcentaje
         else:
             nueva_fila_division["Variacion"] = None
             nueva_fila_division["Porcentaje"] = None
         
         filas_divisiones.append(nueva_fila_division)
     
-    df_divisiones = pd.concat([df_divisiones, pd.DataFrame(filas_divisiones)], ignore_index=True)
+    df_divisiones_nuevo = pd.DataFrame(filas_divisiones)
     
     # 3. Guardar datos por producto
     filas_productos = []
@@ -270,185 +256,197 @@ def guardar_datos(fecha_actual, total, ipc_general, ipc_divisiones, precios_por_
             "Precio": precio_actual
         }
         
-        if not df_productos.empty:
-            producto_anterior = df_productos[
-                (df_productos["Producto"] == nombre) & 
-                (df_productos["Fecha"] == df_productos["Fecha"].max())
-            ]
-            if not producto_anterior.empty:
-                precio_anterior = producto_anterior.iloc[0]["Precio"]
-                if precio_anterior is not None and precio_actual is not None:
-                    variacion = precio_actual - precio_anterior
-                    porcentaje = (variacion / precio_anterior) * 100
-                    nueva_fila_producto["Variacion"] = variacion
-                    nueva_fila_producto["Porcentaje"] = porcentaje
-                else:
-                    nueva_fila_producto["Variacion"] = None
-                    nueva_fila_producto["Porcentaje"] = None
-            else:
-                nueva_fila_producto["Variacion"] = None
-                nueva_fila_producto["Porcentaje"] = None
+        en_ultima_corrida, precio_anterior = indice.producto_en_ultima_corrida(nombre)
+        if en_ultima_corrida and precio_anterior is not None and precio_actual is not None:
+            variacion = precio_actual - precio_anterior
+            porcentaje = (variacion / precio_anterior) * 100 if precio_anterior != 0 else None
+            nueva_fila_producto["Variacion"] = variacion
+            nueva_fila_producto["Porcentaje"] = porcentaje
         else:
             nueva_fila_producto["Variacion"] = None
             nueva_fila_producto["Porcentaje"] = None
         
         filas_productos.append(nueva_fila_producto)
     
-    df_productos = pd.concat([df_productos, pd.DataFrame(filas_productos)], ignore_index=True)
+    df_productos_nuevo = pd.DataFrame(filas_productos)
     
-    # Guardar todos los DataFrames
-    df_resumen.to_csv(f"resumen_{datetime.now().strftime('%Y%m')}.csv", index=False)
-    df_divisiones.to_csv(f"divisiones_{datetime.now().strftime('%Y%m')}.csv", index=False)
-    df_productos.to_csv(f"productos_{datetime.now().strftime('%Y%m')}.csv", index=False)
+    # Si todavía no hay agregados semanales/mensuales, se arman una única vez
+    # desde el historial existente (antes de sumar la corrida actual). Con el
+    # backend "sqlite" los agregados se calculan en la base y no hay archivos.
+    usar_agregados = BACKEND_ALMACENAMIENTO != "sqlite"
+    if usar_agregados and not existen_agregados():
+        reconstruir_agregados(cargar_historial("productos", columnas=["Producto", "Division", "Precio"]))
     
-    return df_resumen, df_divisiones, df_productos
+    # Agregar solo las filas nuevas al historial, sin reescribir lo ya guardado
+    guardar_corrida(fecha_actual, {
+        "resumen": df_resumen_nuevo,
+        "divisiones": df_divisiones_nuevo,
+        "productos": df_productos_nuevo
+    })
+    indice.registrar_corrida(fecha_actual, df_resumen_nuevo, df_divisiones_nuevo, df_productos_nuevo)
+    indice.guardar()
+    if usar_agregados:
+        actualizar_agregados(df_productos_nuevo)
+    
+    return df_resumen_nuevo, df_divisiones_nuevo, df_productos_nuevo
+
+class EstadoResidente:
+    """
+    Estado que el modo servicio (servicio.py) conserva entre corridas.
+
+    Guarda el índice de precios en memoria junto con la firma (fecha de
+    modificación y tamaño) del historial y de indice_precios.json. Si otro
+    proceso escribe alguno de esos archivos, el índice se vuelve a leer de
+    disco; las escrituras de la propia corrida se registran con
+    registrar_guardado() para no provocar una relectura. La canasta la cachea
+    cargar_canasta en su versión compilada.
+    """
+
+    def __init__(self):
+        self.indice = None
+        self.firma = None
+
+    def _firma(self):
+        try:
+            estado = os.stat(ARCHIVO_INDICE_PRECIOS)
+            firma_indice = (estado.st_mtime_ns, estado.st_size)
+        except FileNotFoundError:
+            firma_indice = None
+        return firma_historial(), firma_indice
+
+    def cargar_indice(self):
+        """Devuelve el índice de precios, releyéndolo si el historial o el índice cambiaron en disco."""
+        if self.indice is None or self._firma() != self.firma:
+            self.indice = cargar_indice_precios()
+            # Después de cargar: si el índice se reconstruyó, ya quedó guardado
+            self.firma = self._firma()
+        return self.indice
+
+    def registrar_guardado(self):
+        """Toma como propias las escrituras de la corrida recién guardada."""
+        self.firma = self._firma()
+
+    def invalidar(self):
+        """Descarta el índice en memoria para que la próxima corrida lo vuelva a leer de disco."""
+        self.indice = None
+        self.firma = None
 
-def main():
-    """Función principal del script."""
+
+def capturar_precios(estado=None):
+    """
+    Obtiene los precios de la canasta, genera el resumen del día y guarda la corrida.
+    
+    Los valores anteriores salen del índice de precios, así que la corrida no
+    lee el historial del mes. Con un EstadoResidente, el índice se toma de
+    memoria mientras el historial no haya cambiado en disco.
+    
+    Returns:
+        Tupla (resumen, productos): líneas del resumen y canasta consultada, o
+        None en lugar del resumen si no se obtuvo ningún precio
+    """
     # Cargar productos
-    productos = cargar_productos()
+    with etapa("cargar_productos"):
+        productos = cargar_productos()
     
     # Obtener precios actuales
-    precios, precios_por_division, cantidades_por_division, total = obtener_precios(productos)
+    with etapa("obtener_precios"):
+        precios, precios_por_division, cantidades_por_division, total = obtener_precios(productos)
     
-    if precios:
-        # Verificar si es el primer día del mes
-        if es_primer_dia_del_mes():
-            print("\nEs el primer día del mes. Creando nuevos archivos CSV...")
-            df_resumen, df_divisiones, df_productos = crear_nuevo_mes_csv()
-        else:
-            # Obtener DataFrames existentes
-            df_resumen, df_divisiones, df_productos = obtener_ultimos_csvs()
-        
-        # Generar resumen
+    if not precios:
+        print("No se pudo obtener el precio de ningún producto.")
+        return None, productos
+    
+    with etapa("cargar_historial"):
+        indice = estado.cargar_indice() if estado is not None else cargar_indice_precios()
+    
+    # Generar resumen
+    with etapa("generar_resumen"):
         resumen, ipc_divisiones, ipc_general = generar_resumen(
-            precios, precios_por_division, cantidades_por_division, total, df_productos, productos
+            precios, precios_por_division, cantidades_por_division, total, None, productos, indice
         )
-        
-        # Guardar datos
-        fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M')
-        df_resumen, df_divisiones, df_productos = guardar_datos(
+    
+    # Guardar datos
+    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M')
+    with etapa("guardar_datos"):
+        _, df_divisiones_nuevo, _ = guardar_datos(
             fecha_actual, total, ipc_general, ipc_divisiones,
-            precios_por_division, precios, productos
+            precios_por_division, precios, productos, indice
         )
+    if estado is not None:
+        estado.registrar_guardado()
+    
+    # Actualizar el resumen con las variaciones por división de esta corrida
+    divisiones_corrida = df_divisiones_nuevo.set_index("Division")
+    resumen.append("\nVariaciones por división:")
+    for division in DIVISIONES_IPC.keys():
+        total_division = sum(precios_por_division.get(division, []))
+        variacion = divisiones_corrida.at[division, "Variacion"]
+        porcentaje = divisiones_corrida.at[division, "Porcentaje"]
+        ipc = divisiones_corrida.at[division, "IPC"]
         
-        # Actualizar el resumen con las variaciones por división
-        resumen.append("\nVariaciones por división:")
-        for division in DIVISIONES_IPC.keys():
-            total_division = sum(precios_por_division.get(division, []))
-            variacion = df_divisiones.iloc[-1]["Variacion"] if not df_divisiones.empty else None
-            porcentaje = df_divisiones.iloc[-1]["Porcentaje"] if not df_divisiones.empty else None
-            ipc = df_divisiones.iloc[-1]["IPC"] if not df_divisiones.empty else None
-            
-            if variacion is not None and porcentaje is not None:
-                signo = "+" if variacion > 0 else ""
-                resumen.append(f"- {division}:")
-                resumen.append(f"  Total: ${total_division:.2f}")
-                resumen.append(f"  Variación: {signo}${variacion:.2f} ({signo}{porcentaje:.1f}%)")
-                resumen.append(f"  IPC: {signo}{ipc:.1f}%")
-        
-        print("\n".join(resumen))
-        
-        # Calcular variación semanal
-        try:
-            # Calcular variación semanal
-            variaciones_semanales = calcular_variacion_semanal(df_productos)
-            
-            # Guardar variaciones semanales
-            variaciones_semanales.to_csv(f"variaciones_semanales_{datetime.now().strftime('%Y%m')}.csv", index=False)
-            
-            # Mostrar resumen de variaciones semanales
-            print("\nVariaciones semanales promedio:")
-            print("=" * 80)
-            for _, row in variaciones_semanales.iterrows():
-                print(f"\nProducto: {row['Producto']}")
-                print(f"Semana {row['Semana_Actual']} del {row['Año_Actual']}")
-                print(f"Precio promedio actual: ${row['Precio_Promedio_Actual']:.2f}")
-                print(f"Precio promedio anterior: ${row['Precio_Promedio_Anterior']:.2f}")
-                print(f"Variación: ${row['Variacion']:.2f} ({row['Porcentaje']:.2f}%)")
-                print("-" * 80)
-                
-        except Exception as e:
-            print(f"\nError al calcular variaciones semanales: {e}")
-            print("Se necesitan al menos dos semanas de datos.")
-            
-        # Calcular variación mensual
-        try:
-            # Calcular variación mensual intermensual (mes actual vs mes anterior)
-            variaciones_mensuales = calcular_variacion_mensual_intermensual(df_productos)
-            
-            # Guardar variaciones mensuales
-            variaciones_mensuales.to_csv(f"variaciones_mensuales_{datetime.now().strftime('%Y%m')}.csv", index=False)
-            
-            # Mostrar resumen de variaciones mensuales
-            print("\nVariaciones mensuales de la canasta básica de alimentos:")
-            print("=" * 80)
-            
-            if not variaciones_mensuales.empty:
-                # Para el resumen en texto, calculamos la variación ponderada por división
-                # Necesitamos las cantidades mensuales de 'productos' (cargados de mi_carrito.txt)
-                map_producto_cantidad = {p["nombre"]: p["cantidad_mensual"] for p in productos}
-
-                variaciones_mensuales['Costo_Mes_Anterior'] = variaciones_mensuales.apply(
-                    lambda row: row['Precio_Promedio_Anterior'] * map_producto_cantidad.get(row['Producto'], 0), axis=1
-                )
-                variaciones_mensuales['Costo_Mes_Actual'] = variaciones_mensuales.apply(
-                    lambda row: row['Precio_Promedio_Actual'] * map_producto_cantidad.get(row['Producto'], 0), axis=1
-                )
+        if pd.notna(variacion) and pd.notna(porcentaje):
+            signo = "+" if variacion > 0 else ""
+            resumen.append(f"- {division}:")
+            resumen.append(f"  Total: ${total_division:.2f}")
+            resumen.append(f"  Variación: {signo}${variacion:.2f} ({signo}{porcentaje:.1f}%)")
+            resumen.append(f"  IPC: {signo}{ipc:.1f}%")
+    
+    print("\n".join(resumen))
+    return resumen, productos
 
-                resumen_mensual_division_costos = variaciones_mensuales.groupby('Division').agg(
-                    Total_Costo_Mes_Anterior=('Costo_Mes_Anterior', 'sum'),
-                    Total_Costo_Mes_Actual=('Costo_Mes_Actual', 'sum')
-                ).reset_index()
 
-                resumen_mensual_division_costos['Variacion_Absoluta_Division_Mes'] = resumen_mensual_division_costos['Total_Costo_Mes_Actual'] - resumen_mensual_division_costos['Total_Costo_Mes_Anterior']
-                
-                def calcular_porcentaje_seguro(row):
-                    if row['Total_Costo_Mes_Anterior'] != 0:
-                        return (row['Variacion_Absoluta_Division_Mes'] / row['Total_Costo_Mes_Anterior']) * 100
-                    return 0.0
+def ejecutar_captura(estado=None):
+    """Solo la captura: obtiene los precios, guarda la corrida y el resumen del día, sin los reportes derivados."""
+    resumen, _ = capturar_precios(estado)
+    if resumen is not None:
+        print(f"\nResumen guardado en {escribir_resumen(resumen)}")
 
-                resumen_mensual_division_costos['Porcentaje_Ponderado_Division_Mes'] = resumen_mensual_division_costos.apply(calcular_porcentaje_seguro, axis=1)
-                
-                resumen.append("\nVariaciones Mensuales Ponderadas por División (Inter-Mes: Actual vs Anterior):")
-                for _, row_div in resumen_mensual_division_costos.iterrows():
-                    signo_porc = "+" if row_div['Porcentaje_Ponderado_Division_Mes'] >= 0 else ""
-                    signo_abs = "+" if row_div['Variacion_Absoluta_Division_Mes'] >= 0 else ""
-                    resumen.append(f"\n- División: {row_div['Division']}")
-                    resumen.append(f"  Variación ponderada: {signo_porc}{row_div['Porcentaje_Ponderado_Division_Mes']:.2f}%")
-                    resumen.append(f"  Variación absoluta (costo canasta división): {signo_abs}${row_div['Variacion_Absoluta_Division_Mes']:.2f}")
-            else:
-                resumen.append("\nNo hay suficientes datos para el resumen de variación mensual por división este mes.")
-                
-        except Exception as e:
-            print(f"\nError al calcular o resumir variaciones mensuales: {e}")
-    else:
-        print("No se pudo obtener el precio de ningún producto.")
 
-    # Guardar resultados en un archivo txt
-    nombre_archivo = f"canasta_personalizada_{datetime.now().strftime('%Y%m%d_%H%M')}.txt"
-    with open(nombre_archivo, "w", encoding="utf-8") as f:
-        for linea in resumen:
-            f.write(linea + "\n")
+def ejecutar_corrida(estado=None):
+    """
+    Obtiene los precios de la canasta, guarda la corrida y genera los resúmenes.
+    
+    Con un EstadoResidente, el índice de precios se toma de memoria mientras
+    el historial no haya cambiado en disco.
+    """
+    resumen, productos = capturar_precios(estado)
+    if resumen is None:
+        return
+    
+    # Variaciones semanales y mensuales, resumen TXT y resumen Pro, en paralelo
+    generar_reportes(productos, resumen)
 
-    print(f"\nResultados guardados en:")
-    print(f"- {nombre_archivo}")
-    print(f"- resumen_{datetime.now().strftime('%Y%m')}.csv")
-    print(f"- divisiones_{datetime.now().strftime('%Y%m')}.csv")
-    print(f"- productos_{datetime.now().strftime('%Y%m')}.csv")
-    print(f"- variaciones_semanales_{datetime.now().strftime('%Y%m')}.csv")
-    print(f"- variaciones_mensuales_{datetime.now().strftime('%Y%m')}.csv")
+def main(perfil=False, estado=None, corrida=None):
+    """
+    Función principal del script.
 
-    # Generar resumen Pro
+    Mide la corrida y agrega sus métricas a ARCHIVO_METRICAS. Con perfil=True
+    además guarda un perfil de cProfile en perfil_YYYYMMDD_HHMM.prof (se puede
+    inspeccionar con 'python -m pstats'). El estado (EstadoResidente) lo usa el
+    modo servicio para conservar el índice de precios entre corridas.
+    La corrida por defecto es ejecutar_corrida (captura y todos los reportes).
+    """
+    iniciar_corrida()
+    perfilador = cProfile.Profile() if perfil else None
+    if perfilador is not None:
+        perfilador.enable()
     try:
-        import resumen_pro_202506
-        resumen_pro_202506.generar_resumen_pro()
-        print(f"- resumen_pro_{datetime.now().strftime('%Y%m')}.txt")
-        print(f"- resumen_pro_{datetime.now().strftime('%Y%m')}.csv")
-    except Exception as e:
-        print(f"\nError al generar resumen Pro: {e}")
+        (corrida or ejecutar_corrida)(estado)
+    finally:
+        if perfilador is not None:
+            perfilador.disable()
+            nombre_perfil = f"perfil_{datetime.now().strftime('%Y%m%d_%H%M')}.prof"
+            perfilador.dump_stats(nombre_perfil)
+            print(f"- {nombre_perfil}")
+        registro = finalizar_corrida(
+            conexiones=estadisticas_conexiones(),
+            cache=estadisticas_cache(),
+            limitador=estadisticas_limitador(),
+            extraccion=estadisticas_extraccion()
+        )
+        print(f"\nCorrida completada en {registro['duracion_total_s']:.1f} s; métricas agregadas a {ARCHIVO_METRICAS}")
 
 if __name__ == "__main__":
-    main()
+    main(perfil="--perfil" in sys.argv[1:])
 
     
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from config import ARCHIVO_METRICAS, METRICAS_TRAZAR_MEMORIA
+
+# Límites superiores de los intervalos de los histogramas (el último intervalo no tiene tope)
+LIMITES_LATENCIA_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+LIMITES_TAMANO_KB = [1, 10, 50, 100, 250, 500, 1000]
+PERCENTILES = (50, 90, 99)
+
+
+def _histograma(valores, limites):
+    """Cuenta los valores de cada intervalo; las claves son '<=limite' y '>ultimo'."""
+    cuentas = [0] * (len(limites) + 1)
+    for valor in valores:
+        cuentas[bisect_left(limites, valor)] += 1
+    claves = [f"<={limite}" for limite in limites] + [f">{limites[-1]}"]
+    return dict(zip(claves, cuentas))
+
+
+def _percentiles(valores):
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+    resultado = {
+        f"p{p}": ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+        for p in PERCENTILES
+    }
+    resultado["max"] = ordenados[-1]
+    return resultado
+
+
+class MetricasCorrida:
+    """
+    Métricas de rendimiento de una corrida: duración de cada etapa, latencia,
+    tamaño y estado de cada petición HTTP por host, memoria máxima y errores
+    de las etapas que los informan sin interrumpir la corrida.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fecha = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.etapas = {}
+        self.peticiones = {}
+        self.errores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide la duración del bloque y la suma a la etapa indicada."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                self.etapas[nombre] = self.etapas.get(nombre, 0) + duracion
+
+    def registrar_peticion(self, host, estado, latencia, tamano):
+        """
+        Registra una petición HTTP que llegó a la red.
+
+        Args:
+            host: Host consultado
+            estado: Código HTTP, o None si falló la conexión
+            latencia: Segundos hasta recibir la respuesta completa
+            tamano: Bytes del cuerpo de la respuesta
+        """
+        with self._lock:
+            datos = self.peticiones.setdefault(host, {"latencias_ms": [], "tamanos_kb": [], "estados": {}})
+            datos["latencias_ms"].append(latencia * 1000)
+            datos["tamanos_kb"].append(tamano / 1024)
+            clave = str(estado) if estado is not None else "error"
+            datos["estados"][clave] = datos["estados"].get(clave, 0) + 1
+
+    def registrar_error(self, nombre, error):
+        """Registra el error de una etapa que lo atrapó y siguió con la corrida."""
+        with self._lock:
+            self.errores[nombre] = f"{type(error).__name__}: {error}"
+
+    def resumen(self):
+        """Devuelve las métricas de la corrida como un diccionario serializable a JSON."""
+        with self._lock:
+            peticiones = {
+                host: {
+                    "cantidad": len(datos["latencias_ms"]),
+                    "estados": dict(datos["estados"]),
+                    "latencia_ms": _percentiles(datos["latencias_ms"]),
+                    "histograma_latencia_ms": _histograma(datos["latencias_ms"], LIMITES_LATENCIA_MS),
+                    "kb_totales": sum(datos["tamanos_kb"]),
+                    "histograma_tamano_kb": _histograma(datos["tamanos_kb"], LIMITES_TAMANO_KB),
+                }
+                for host, datos in self.peticiones.items()
+            }
+            etapas = dict(self.etapas)
+            errores = dict(self.errores)
+
+        memoria = {}
+        if tracemalloc.is_tracing():
+            memoria["pico_python_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        if resource is not None:
+            # ru_maxrss está en KB en Linux
+            memoria["pico_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        return {
+            "fecha": self.fecha,
+            "duracion_total_s": time.perf_counter() - self.inicio,
+            "etapas_s": etapas,
+            "peticiones": peticiones,
+            "memoria": memoria,
+            "errores": errores,
+        }
+
+
+_actual = MetricasCorrida()
+
+
+def iniciar_corrida():
+    """Comienza a medir una corrida nueva y la deja como corrida actual."""
+    global _actual
+    _actual = MetricasCorrida()
+    if METRICAS_TRAZAR_MEMORIA and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return _actual
+
+
+def obtener_metricas():
+    """Devuelve las métricas de la corrida actual."""
+    return _actual
+
+
+def etapa(nombre):
+    """Mide un bloque como etapa de la corrida actual (usar con 'with')."""
+    return _actual.etapa(nombre)
+
+
+def registrar_peticion(host, estado, latencia, tamano):
+    """Registra una petición HTTP en la corrida actual."""
+    _actual.registrar_peticion(host, estado, latencia, tamano)
+
+
+def registrar_error(nombre, error):
+    """Registra el error de una etapa en la corrida actual."""
+    _actual.registrar_error(nombre, error)
+
+
+def finalizar_corrida(ruta=ARCHIVO_METRICAS, **extra):
+    """
+    Cierra la corrida actual y agrega sus métricas como una línea JSON al final de 'ruta'.
+
+    Args:
+        ruta: Archivo JSON lines de métricas, o None para no escribirlo
+        **extra: Datos adicionales a incluir en el registro (por ejemplo, estadísticas de caché)
+
+    Returns:
+        Diccionario con las métricas registradas
+    """
+    registro = _actual.resumen()
+    registro.update(extra)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    if ruta is not None:
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+    return registro
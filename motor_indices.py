@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+
+from config import DIVISIONES_IPC
+from almacen import a_float64
+
+FORMULAS = ("laspeyres", "paasche", "fisher")
+
+
+class MotorIndices:
+    """
+    Índices de precios ponderados sobre una matriz densa productos × fechas.
+
+    Cada índice de división compara el costo de la canasta de esa división
+    entre dos fechas, usando solo los productos con precio en ambas. El índice
+    general es el promedio de los índices de división ponderado por los pesos
+    de DIVISIONES_IPC, renormalizados sobre las divisiones que tienen datos.
+
+    Las cantidades pueden ser un vector (canasta fija, cantidad_mensual de cada
+    producto) o una matriz productos × fechas. Con una canasta fija, Laspeyres,
+    Paasche y Fisher coinciden.
+
+    Los índices se devuelven en base 100.
+    """
+
+    def __init__(self, productos, divisiones, fechas, precios, cantidades):
+        self.productos = list(productos)
+        self.fechas = pd.DatetimeIndex(fechas)
+        self.precios = np.asarray(precios, dtype='float64').reshape(len(self.productos), len(self.fechas))
+        cantidades = np.asarray(cantidades, dtype='float64')
+        if cantidades.ndim == 1:
+            cantidades = np.broadcast_to(cantidades[:, None], self.precios.shape)
+        self.cantidades = cantidades
+
+        # Divisiones en el orden de DIVISIONES_IPC (las que no figuran ahí no pesan en el general)
+        orden = {division: i for i, division in enumerate(DIVISIONES_IPC)}
+        self.divisiones = sorted(set(divisiones), key=lambda d: orden.get(d, len(orden)))
+        posicion = {division: i for i, division in enumerate(self.divisiones)}
+        self.pertenencia = np.zeros((len(self.divisiones), len(self.productos)))
+        self.pertenencia[[posicion[d] for d in divisiones], np.arange(len(self.productos))] = 1.0
+        self.pesos = np.array([DIVISIONES_IPC.get(d, 0.0) for d in self.divisiones])
+
+    @classmethod
+    def desde_historial(cls, df_productos, productos, frecuencia='D'):
+        """
+        Arma la matriz de precios a partir del historial de productos.
+
+        Args:
+            df_productos: Historial con las columnas Fecha, Producto y Precio
+            productos: Canasta (como la de main.cargar_productos); define las
+                divisiones y las cantidades mensuales
+            frecuencia: Período de cada columna de la matriz ('D', 'W', 'M'...);
+                se toma el último precio del período
+
+        Returns:
+            MotorIndices con una fila por producto de la canasta
+        """
+        canasta = {p["nombre"]: p for p in productos}
+        datos = pd.DataFrame({
+            'Fecha': pd.to_datetime(df_productos['Fecha']),
+            'Producto': df_productos['Producto'].astype(object),
+            'Precio': a_float64(df_productos['Precio']),
+        })
+        datos = datos[datos['Producto'].isin(canasta.keys())].dropna(subset=['Fecha', 'Precio'])
+        datos['Periodo'] = datos['Fecha'].dt.to_period(frecuencia).dt.start_time
+        datos = datos.sort_values('Fecha', kind='stable').drop_duplicates(['Producto', 'Periodo'], keep='last')
+        matriz = datos.pivot(index='Producto', columns='Periodo', values='Precio').reindex(list(canasta)).sort_index(axis=1)
+        return cls(
+            list(canasta),
+            [p["division"] for p in canasta.values()],
+            matriz.columns,
+            matriz.to_numpy(dtype='float64'),
+            [p["cantidad_mensual"] for p in canasta.values()]
+        )
+
+    # --- Selección de fechas ---
+
+    def _rango(self, desde, hasta):
+        inicio = 0 if desde is None else int(self.fechas.searchsorted(pd.Timestamp(desde), side='left'))
+        fin = len(self.fechas) if hasta is None else int(self.fechas.searchsorted(pd.Timestamp(hasta), side='right'))
+        return inicio, max(inicio, fin)
+
+    def _posicion(self, fecha):
+        posicion = self.fechas.get_indexer([pd.Timestamp(fecha)])[0]
+        if posicion < 0:
+            raise KeyError(f"No hay precios para la fecha {fecha}")
+        return posicion
+
+    # --- Cálculo ---
+
+    def _cociente(self, numerador, denominador):
+        """Suma por división productos × fechas y devuelve el cociente (NaN si la división no tiene datos)."""
+        numerador = self.pertenencia @ numerador
+        denominador = self.pertenencia @ denominador
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominador > 0, numerador / denominador, np.nan)
+
+    def _relativos(self, actual, anterior, cantidades_actual, cantidades_anterior, formula):
+        """Relativos de precio por división entre matrices de precios ya filtradas a productos comparables."""
+        if formula not in FORMULAS:
+            raise ValueError(f"Fórmula desconocida: {formula} (opciones: {', '.join(FORMULAS)})")
+        if formula != "paasche":
+            laspeyres = self._cociente(actual * cantidades_anterior, anterior * cantidades_anterior)
+            if formula == "laspeyres":
+                return laspeyres
+        paasche = self._cociente(actual * cantidades_actual, anterior * cantidades_actual)
+        if formula == "paasche":
+            return paasche
+        return np.sqrt(laspeyres * paasche)
+
+    def _general(self, indices):
+        """Promedio de los índices de división ponderado por DIVISIONES_IPC."""
+        hay_datos = np.isfinite(indices)
+        pesos = np.where(hay_datos, self.pesos[:, None], 0.0)
+        suma_pesos = pesos.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(suma_pesos > 0, (pesos * np.where(hay_datos, indices, 0.0)).sum(axis=0) / suma_pesos, np.nan)
+
+    def _tabla(self, indices, fechas):
+        tabla = pd.DataFrame(indices.T * 100, index=fechas, columns=self.divisiones)
+        tabla['General'] = self._general(indices) * 100
+        tabla.index.name = 'Fecha'
+        return tabla
+
+    def indices(self, desde=None, hasta=None, base=None, formula="laspeyres"):
+        """
+        Índices de base fija para cada fecha del rango.
+
+        Args:
+            desde, hasta: Límites del rango (inclusive), o None para no acotarlo
+            base: Fecha base (por defecto, la primera del rango)
+            formula: 'laspeyres', 'paasche' o 'fisher'
+
+        Returns:
+            DataFrame con una fila por fecha, una columna por división y 'General'
+        """
+        inicio, fin = self._rango(desde, hasta)
+        if base is None and inicio == fin:
+            return self._tabla(np.empty((len(self.divisiones), 0)), self.fechas[inicio:fin])
+        posicion_base = inicio if base is None else self._posicion(base)
+
+        actual = self.precios[:, inicio:fin]
+        anterior = self.precios[:, posicion_base:posicion_base + 1]
+        comparables = np.isfinite(actual) & np.isfinite(anterior)
+        indices = self._relativos(
+            np.where(comparables, actual, 0.0),
+            np.where(comparables, anterior, 0.0),
+            self.cantidades[:, inicio:fin],
+            self.cantidades[:, posicion_base:posicion_base + 1],
+            formula
+        )
+        return self._tabla(indices, self.fechas[inicio:fin])
+
+    def encadenados(self, desde=None, hasta=None, formula="laspeyres"):
+        """
+        Índices encadenados: producto de los relativos entre fechas consecutivas,
+        con base 100 en la primera fecha del rango.
+
+        Cada eslabón compara solo los productos con precio en las dos fechas; si
+        una división no tiene ninguno, su índice se mantiene. El general es el
+        promedio ponderado de los índices encadenados de las divisiones.
+        """
+        inicio, fin = self._rango(desde, hasta)
+        precios = self.precios[:, inicio:fin]
+        cantidades = self.cantidades[:, inicio:fin]
+        actual, anterior = precios[:, 1:], precios[:, :-1]
+        comparables = np.isfinite(actual) & np.isfinite(anterior)
+        eslabones = self._relativos(
+            np.where(comparables, actual, 0.0),
+            np.where(comparables, anterior, 0.0),
+            cantidades[:, 1:],
+            cantidades[:, :-1],
+            formula
+        )
+        hay_datos = np.isfinite(eslabones)
+        indices = np.cumprod(np.where(hay_datos, eslabones, 1.0), axis=1)
+        indices = np.hstack([np.ones((len(self.divisiones), min(1, fin - inicio))), indices])
+        # Las divisiones sin ningún eslabón comparable (o sin precios, si el rango es de una fecha) no tienen índice
+        if fin - inicio > 1:
+            con_datos = hay_datos.any(axis=1)
+        else:
+            con_datos = self.pertenencia @ np.isfinite(precios).any(axis=1) > 0
+        indices[~con_datos] = np.nan
+        return self._tabla(indices, self.fechas[inicio:fin])
+
+    def comparar(self, base, fecha):
+        """
+        Valor de la canasta comparable de cada división en dos fechas, a las
+        cantidades de la fecha base.
+
+        Returns:
+            DataFrame por división con Valor_Anterior, Valor_Actual y Productos
+            (cantidad de productos con precio en ambas fechas)
+        """
+        posicion_base, posicion = self._posicion(base), self._posicion(fecha)
+        anterior = self.precios[:, posicion_base]
+        actual = self.precios[:, posicion]
+        cantidades = self.cantidades[:, posicion_base]
+        comparables = np.isfinite(anterior) & np.isfinite(actual)
+        return pd.DataFrame({
+            'Valor_Anterior': self.pertenencia @ np.where(comparables, anterior * cantidades, 0.0),
+            'Valor_Actual': self.pertenencia @ np.where(comparables, actual * cantidades, 0.0),
+            'Productos': (self.pertenencia @ comparables).astype('int64'),
+        }, index=pd.Index(self.divisiones, name='Division'))
@@ -0,0 +1,184 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import scrapers
+from config import SUPERMERCADOS, ARCHIVO_METRICAS
+from generar_datos_sinteticos import generar_canasta_sintetica, generar_historial_sintetico, guardar_historial_sintetico
+from servidor_simulado import iniciar_servidor, precio_simulado
+
+DIRECTORIO_PROYECTO = os.path.dirname(os.path.abspath(__file__))
+PROPORCIONES_POR_DEFECTO = {"dia": 0.7, "disco": 0.1, "coto": 0.1, "jumbo": 0.1}
+
+
+def _escribir_carrito(productos, urls_base, ruta="mi_carrito.txt"):
+    """Escribe la canasta en el formato de mi_carrito.txt (URLs del servidor simulado para Disco, Coto y Jumbo)."""
+    with open(ruta, "w", encoding="utf-8") as f:
+        for producto in productos:
+            codigo = producto["codigo"]
+            if producto["supermercado"] != "dia":
+                codigo = f"{urls_base[producto['supermercado']]}/{producto['supermercado']}/p/{codigo}"
+            f.write(f"{codigo};{producto['nombre']};{producto['division']};"
+                    f"{producto['cantidad_mensual']:g};{producto['supermercado']}\n")
+
+
+def _productos_con_precio():
+    """Cantidad de productos con precio en la última corrida guardada."""
+    from utils import obtener_ultimos_csvs
+    df_productos = obtener_ultimos_csvs()[2]
+    ultima = df_productos[df_productos['Fecha'] == df_productos['Fecha'].max()]
+    return int(ultima['Precio'].notna().sum())
+
+
+def ejecutar_prueba_carga(cantidad_productos=10000, proporciones=PROPORCIONES_POR_DEFECTO, dias_historial=30,
+                          latencia=0.02, tasa_errores=0.01, tasa_429=0.01, relleno_kb=100,
+                          tasa_maxima=500.0, max_concurrencia=32, directorio=None, semilla=0):
+    """
+    Ejecuta main.main() de punta a punta contra servidores simulados locales.
+
+    Se levanta un servidor por supermercado (cada uno es un host distinto para
+    el limitador), se arma una canasta sintética con su historial y se corre
+    main.main() en un directorio de trabajo aparte, con la salida en
+    prueba_carga.log.
+
+    Args:
+        cantidad_productos: Tamaño de la canasta
+        proporciones: Proporción de la canasta en cada supermercado
+        dias_historial: Días de historial sintético previos a la corrida
+        latencia: Latencia media de los servidores, en segundos
+        tasa_errores: Proporción de respuestas 500
+        tasa_429: Proporción de respuestas 429
+        relleno_kb: Tamaño aproximado de las páginas HTML
+        tasa_maxima: Peticiones por segundo permitidas a cada servidor
+        max_concurrencia: Peticiones simultáneas por supermercado
+        directorio: Directorio de trabajo (por defecto uno temporal)
+        semilla: Semilla de la canasta y el historial
+
+    Returns:
+        Diccionario con tiempos, rendimiento, memoria y respuestas de los servidores
+
+    Raises:
+        RuntimeError: Si alguna etapa de la corrida informó un error
+    """
+    # Los módulos que main importa recién al usarlos (resumen_pro_202506) se
+    # buscan en sys.path, que deja de incluir el proyecto al cambiar de directorio
+    if DIRECTORIO_PROYECTO not in sys.path:
+        sys.path.insert(0, DIRECTORIO_PROYECTO)
+    import main
+
+    servidores = {
+        supermercado: iniciar_servidor(latencia=latencia, tasa_errores=tasa_errores,
+                                       tasa_429=tasa_429, relleno_kb=relleno_kb)
+        for supermercado in proporciones
+    }
+    limites_originales = {s: dict(limites) for s, limites in SUPERMERCADOS.items()}
+    url_base_dia = scrapers.URL_BASE_DIA
+    directorio_original = os.getcwd()
+    temporal = tempfile.TemporaryDirectory() if directorio is None else None
+    try:
+        os.makedirs(directorio or temporal.name, exist_ok=True)
+        os.chdir(directorio or temporal.name)
+
+        productos = generar_canasta_sintetica(cantidad_productos, semilla)
+        rng = np.random.default_rng(semilla)
+        supermercados = rng.choice(list(proporciones), size=len(productos), p=list(proporciones.values()))
+        for producto, supermercado in zip(productos, supermercados):
+            producto["supermercado"] = str(supermercado)
+        _escribir_carrito(productos, {s: servidor.url_base for s, servidor in servidores.items()})
+        if dias_historial:
+            ayer = pd.Timestamp.now().normalize() - pd.Timedelta(days=1)
+            # Historial que termina en los precios que devolverán los servidores simulados
+            guardar_historial_sintetico(*generar_historial_sintetico(
+                productos, dias_historial, fin=ayer, semilla=semilla,
+                precios_unitarios=[precio_simulado(p["codigo"]) for p in productos]
+            ))
+
+        scrapers.URL_BASE_DIA = servidores["dia"].url_base if "dia" in servidores else url_base_dia
+        for limites in SUPERMERCADOS.values():
+            limites.update(tasa_inicial=tasa_maxima, tasa_maxima=tasa_maxima, max_concurrencia=max_concurrencia)
+
+        inicio = time.perf_counter()
+        with open("prueba_carga.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            main.main()
+        duracion = time.perf_counter() - inicio
+
+        with open(ARCHIVO_METRICAS, encoding="utf-8") as f:
+            metricas = json.loads(f.readlines()[-1])
+        con_precio = _productos_con_precio()
+    finally:
+        os.chdir(directorio_original)
+        scrapers.URL_BASE_DIA = url_base_dia
+        for supermercado, limites in limites_originales.items():
+            SUPERMERCADOS[supermercado].clear()
+            SUPERMERCADOS[supermercado].update(limites)
+        for servidor in servidores.values():
+            servidor.shutdown()
+            servidor.server_close()
+        if temporal is not None:
+            temporal.cleanup()
+
+    if metricas.get("errores"):
+        errores = "; ".join(f"{nombre}: {error}" for nombre, error in metricas["errores"].items())
+        raise RuntimeError(f"La corrida terminó con errores en sus etapas ({errores})")
+
+    duracion_precios = metricas["etapas_s"].get("obtener_precios", 0)
+    hosts = {servidor.url_base.split("//")[1]: s for s, servidor in servidores.items()}
+    return {
+        "productos": cantidad_productos,
+        "productos_con_precio": con_precio,
+        "duracion_total_s": duracion,
+        "productos_por_segundo": cantidad_productos / duracion,
+        "peticiones_por_segundo": sum(
+            datos["cantidad"] for datos in metricas["peticiones"].values()
+        ) / duracion_precios if duracion_precios else None,
+        "etapas_s": metricas["etapas_s"],
+        "memoria": metricas["memoria"],
+        "latencia_ms": {hosts.get(h, h): datos["latencia_ms"] for h, datos in metricas["peticiones"].items()},
+        "limitador": {hosts.get(h, h): estado for h, estado in metricas["limitador"].items()},
+        "respuestas_servidor": {s: servidor.respuestas for s, servidor in servidores.items()},
+    }
+
+
+def imprimir_resultado(resultado):
+    """Muestra el resultado de una prueba de carga."""
+    print(f"Productos: {resultado['productos']} ({resultado['productos_con_precio']} con precio)")
+    print(f"Duración total: {resultado['duracion_total_s']:.1f} s "
+          f"({resultado['productos_por_segundo']:.0f} productos/s)")
+    if resultado["peticiones_por_segundo"]:
+        print(f"Peticiones HTTP durante obtener_precios: {resultado['peticiones_por_segundo']:.0f}/s")
+    print("Etapas:")
+    for nombre, segundos in resultado["etapas_s"].items():
+        print(f"- {nombre}: {segundos:.2f} s")
+    for supermercado, latencias in resultado["latencia_ms"].items():
+        estado = resultado["limitador"].get(supermercado, {})
+        print(f"{supermercado}: p50 {latencias.get('p50', 0):.0f} ms, p99 {latencias.get('p99', 0):.0f} ms, "
+              f"{estado.get('reintentos', 0)} reintentos, respuestas {resultado['respuestas_servidor'][supermercado]}")
+    for nombre, megabytes in resultado["memoria"].items():
+        print(f"Memoria {nombre}: {megabytes:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de main.py contra servidores simulados locales.")
+    parser.add_argument("--productos", type=int, default=10000)
+    parser.add_argument("--dias", type=int, default=30, help="Días de historial sintético previo")
+    parser.add_argument("--latencia", type=float, default=0.02, help="Latencia media en segundos")
+    parser.add_argument("--errores", type=float, default=0.01, help="Proporción de respuestas 500")
+    parser.add_argument("--tasa-429", type=float, default=0.01, help="Proporción de respuestas 429")
+    parser.add_argument("--relleno-kb", type=int, default=100, help="Tamaño aproximado de las páginas HTML")
+    parser.add_argument("--tasa-maxima", type=float, default=500.0, help="Peticiones por segundo por servidor")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Peticiones simultáneas por supermercado")
+    parser.add_argument("--directorio", default=None, help="Directorio de trabajo (por defecto uno temporal)")
+    args = parser.parse_args()
+
+    imprimir_resultado(ejecutar_prueba_carga(
+        args.productos, dias_historial=args.dias, latencia=args.latencia, tasa_errores=args.errores,
+        tasa_429=args.tasa_429, relleno_kb=args.relleno_kb, tasa_maxima=args.tasa_maxima,
+        max_concurrencia=args.concurrencia, directorio=args.directorio
+    ))
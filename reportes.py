@@ -0,0 +1,165 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from metricas import etapa, registrar_error
+from agregados import variacion_semanal_desde_agregados, mensual_desde_agregados
+from utils import calcular_variacion_mensual_intermensual
+
+
+def _inicio_ventana():
+    # Las variaciones se derivan de los agregados semanales y mensuales desde el
+    # inicio del mes anterior, para que las semanas y los meses que cruzan el
+    # cambio de mes tengan contra qué compararse
+    return (pd.Timestamp.now().to_period('M') - 1).to_timestamp()
+
+
+def reportar_variacion_semanal(salida=print):
+    """Calcula las variaciones semanales desde los agregados, las guarda en CSV y las muestra con 'salida'."""
+    try:
+        with etapa("variacion_semanal"):
+            # Calcular variación semanal
+            variaciones_semanales = variacion_semanal_desde_agregados(desde=_inicio_ventana())
+            
+            # Guardar variaciones semanales
+            variaciones_semanales.to_csv(f"variaciones_semanales_{datetime.now().strftime('%Y%m')}.csv", index=False)
+        
+        # Mostrar resumen de variaciones semanales
+        salida("\nVariaciones semanales promedio:")
+        salida("=" * 80)
+        for _, row in variaciones_semanales.iterrows():
+            salida(f"\nProducto: {row['Producto']}")
+            salida(f"Semana {row['Semana_Actual']} del {row['Año_Actual']}")
+            salida(f"Precio promedio actual: ${row['Precio_Promedio_Actual']:.2f}")
+            salida(f"Precio promedio anterior: ${row['Precio_Promedio_Anterior']:.2f}")
+            salida(f"Variación: ${row['Variacion']:.2f} ({row['Porcentaje']:.2f}%)")
+            salida("-" * 80)
+            
+    except Exception as e:
+        registrar_error("variacion_semanal", e)
+        salida(f"\nError al calcular variaciones semanales: {e}")
+        salida("Se necesitan al menos dos semanas de datos.")
+
+
+def reportar_variacion_mensual(productos, resumen, salida=print):
+    """
+    Calcula las variaciones mensuales desde los agregados, las guarda en CSV y
+    agrega al resumen la variación ponderada por división.
+    """
+    try:
+        with etapa("variacion_mensual"):
+            # Calcular variación mensual intermensual (mes actual vs mes anterior)
+            variaciones_mensuales = calcular_variacion_mensual_intermensual(
+                None, mensual=mensual_desde_agregados(desde=_inicio_ventana())
+            )
+            
+            # Guardar variaciones mensuales
+            variaciones_mensuales.to_csv(f"variaciones_mensuales_{datetime.now().strftime('%Y%m')}.csv", index=False)
+        
+        # Mostrar resumen de variaciones mensuales
+        salida("\nVariaciones mensuales de la canasta básica de alimentos:")
+        salida("=" * 80)
+        
+        if not variaciones_mensuales.empty:
+            # Para el resumen en texto, calculamos la variación ponderada por división
+            # Necesitamos las cantidades mensuales de 'productos' (cargados de mi_carrito.txt)
+            map_producto_cantidad = {p["nombre"]: p["cantidad_mensual"] for p in productos}
+
+            variaciones_mensuales['Costo_Mes_Anterior'] = variaciones_mensuales.apply(
+                lambda row: row['Precio_Promedio_Anterior'] * map_producto_cantidad.get(row['Producto'], 0), axis=1
+            )
+            variaciones_mensuales['Costo_Mes_Actual'] = variaciones_mensuales.apply(
+                lambda row: row['Precio_Promedio_Actual'] * map_producto_cantidad.get(row['Producto'], 0), axis=1
+            )
+
+            resumen_mensual_division_costos = variaciones_mensuales.groupby('Division').agg(
+                Total_Costo_Mes_Anterior=('Costo_Mes_Anterior', 'sum'),
+                Total_Costo_Mes_Actual=('Costo_Mes_Actual', 'sum')
+            ).reset_index()
+
+            resumen_mensual_division_costos['Variacion_Absoluta_Division_Mes'] = resumen_mensual_division_costos['Total_Costo_Mes_Actual'] - resumen_mensual_division_costos['Total_Costo_Mes_Anterior']
+            
+            def calcular_porcentaje_seguro(row):
+                if row['Total_Costo_Mes_Anterior'] != 0:
+                    return (row['Variacion_Absoluta_Division_Mes'] / row['Total_Costo_Mes_Anterior']) * 100
+                return 0.0
+
+            resumen_mensual_division_costos['Porcentaje_Ponderado_Division_Mes'] = resumen_mensual_division_costos.apply(calcular_porcentaje_seguro, axis=1)
+            
+            resumen.append("\nVariaciones Mensuales Ponderadas por División (Inter-Mes: Actual vs Anterior):")
+            for _, row_div in resumen_mensual_division_costos.iterrows():
+                signo_porc = "+" if row_div['Porcentaje_Ponderado_Division_Mes'] >= 0 else ""
+                signo_abs = "+" if row_div['Variacion_Absoluta_Division_Mes'] >= 0 else ""
+                resumen.append(f"\n- División: {row_div['Division']}")
+                resumen.append(f"  Variación ponderada: {signo_porc}{row_div['Porcentaje_Ponderado_Division_Mes']:.2f}%")
+                resumen.append(f"  Variación absoluta (costo canasta división): {signo_abs}${row_div['Variacion_Absoluta_Division_Mes']:.2f}")
+        else:
+            resumen.append("\nNo hay suficientes datos para el resumen de variación mensual por división este mes.")
+            
+    except Exception as e:
+        registrar_error("variacion_mensual", e)
+        salida(f"\nError al calcular o resumir variaciones mensuales: {e}")
+
+
+def escribir_resumen(resumen):
+    """Guarda las líneas del resumen en canasta_personalizada_YYYYMMDD_HHMM.txt y devuelve el nombre del archivo."""
+    nombre_archivo = f"canasta_personalizada_{datetime.now().strftime('%Y%m%d_%H%M')}.txt"
+    with etapa("escribir_resumen"), open(nombre_archivo, "w", encoding="utf-8") as f:
+        for linea in resumen:
+            f.write(linea + "\n")
+    return nombre_archivo
+
+
+def generar_resumen_pro(desde=None, hasta=None, salida=print):
+    """Genera el resumen Pro (texto y CSV) del mes actual o del rango indicado."""
+    try:
+        import resumen_pro_202506
+        with etapa("resumen_pro"):
+            nombre_archivo_txt, nombre_archivo_csv = resumen_pro_202506.generar_resumen_pro(desde, hasta, salida=salida)
+        salida(f"- {nombre_archivo_txt}")
+        salida(f"- {nombre_archivo_csv}")
+    except Exception as e:
+        registrar_error("resumen_pro", e)
+        salida(f"\nError al generar resumen Pro: {e}")
+
+
+def _con_salida_propia(funcion, *args):
+    """Ejecuta funcion(*args) juntando lo que muestra, para imprimirlo entero y en orden desde el hilo principal."""
+    lineas = []
+    funcion(*args, salida=lineas.append)
+    return "\n".join(lineas)
+
+
+def generar_reportes(productos, resumen):
+    """
+    Genera los reportes derivados de la corrida en paralelo, en un pool de hilos.
+
+    Las variaciones semanales, las mensuales y el resumen Pro leen cada uno sus
+    propios archivos (agregados o historial del resumen) y no modifican datos
+    compartidos, así que el tiempo total queda acotado por el más lento. Solo
+    la variación mensual agrega líneas a 'resumen', y el TXT del resumen se
+    escribe recién cuando terminó. Lo que muestra cada reporte se imprime
+    completo y en el orden de siempre.
+    """
+    with etapa("reportes"), ThreadPoolExecutor(max_workers=3) as pool:
+        semanal = pool.submit(_con_salida_propia, reportar_variacion_semanal)
+        mensual = pool.submit(_con_salida_propia, reportar_variacion_mensual, productos, resumen)
+        pro = pool.submit(_con_salida_propia, generar_resumen_pro, None, None)
+
+        print(semanal.result())
+        print(mensual.result())
+
+        # Guardar resultados en un archivo txt
+        nombre_archivo = escribir_resumen(resumen)
+
+        print(f"\nResultados guardados en:")
+        print(f"- {nombre_archivo}")
+        print(f"- resumen_{datetime.now().strftime('%Y%m')}.csv")
+        print(f"- divisiones_{datetime.now().strftime('%Y%m')}.csv")
+        print(f"- productos_{datetime.now().strftime('%Y%m')}.csv")
+        print(f"- variaciones_semanales_{datetime.now().strftime('%Y%m')}.csv")
+        print(f"- variaciones_mensuales_{datetime.now().strftime('%Y%m')}.csv")
+
+        # Resumen Pro
+        print(pro.result())
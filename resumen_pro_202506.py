@@ -1,57 +1,100 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-def generar_resumen_pro():
-    # Obtener el nombre del archivo del mes actual
-    nombre_archivo = f"resumen_{datetime.now().strftime('%Y%m')}.csv"
-    
-    # Leer el archivo CSV
-    df = pd.read_csv(nombre_archivo)
-    
-    # Convertir la columna Fecha a datetime
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-    
-    # Obtener el primer día del mes
-    primer_dia = df.iloc[0]
-    
-    # Calcular la variación porcentual desde el primer día
-    df['Variacion_Desde_Primer_Dia'] = ((df['Total_Canasta'] - primer_dia['Total_Canasta']) / primer_dia['Total_Canasta']) * 100
-    
-    # Generar el resumen Pro
-    resumen_pro = []
-    resumen_pro.append("=== RESUMEN PRO DE LA CANASTA ===")
-    resumen_pro.append(f"Fecha de generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    resumen_pro.append("\nResumen por día:")
-    
-    for _, row in df.iterrows():
-        resumen_pro.append(f"\nFecha: {row['Fecha'].strftime('%Y-%m-%d %H:%M')}")
-        resumen_pro.append(f"Total Canasta: ${row['Total_Canasta']:,.2f}")
-        
-        if pd.notna(row['Variacion_Total']):
-            signo = "+" if row['Variacion_Total'] >= 0 else ""
-            resumen_pro.append(f"Variación diaria: {signo}${row['Variacion_Total']:,.2f} ({signo}{row['Porcentaje_Total']:.2f}%)")
-        
-        signo_pro = "+" if row['Variacion_Desde_Primer_Dia'] >= 0 else ""
-        resumen_pro.append(f"Variación desde primer día: {signo_pro}{row['Variacion_Desde_Primer_Dia']:.2f}%")
-        
-        if pd.notna(row['IPC_General']):
-            signo_ipc = "+" if row['IPC_General'] >= 0 else ""
-            resumen_pro.append(f"IPC General: {signo_ipc}{row['IPC_General']:.2f}%")
-    
-    # Guardar el resumen en un archivo
-    nombre_archivo_txt = f"resumen_pro_{datetime.now().strftime('%Y%m')}.txt"
-    nombre_archivo_csv = f"resumen_pro_{datetime.now().strftime('%Y%m')}.csv"
-    
-    with open(nombre_archivo_txt, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(resumen_pro))
-    
-    # Guardar también en CSV
-    df.to_csv(nombre_archivo_csv, index=False)
-    
-    print("Resumen Pro generado exitosamente!")
-    print("Archivos creados:")
-    print(f"- {nombre_archivo_txt}")
-    print(f"- {nombre_archivo_csv}")
+from historial import cargar_historial
+
+TAMANO_BLOQUE = 50_000  # Corridas del resumen que se leen, formatean y escriben por vez
+
+
+def _texto(valores, formato):
+    return valores.map(formato.format)
+
+
+def _signo(valores):
+    return pd.Series(np.where(valores >= 0, "+", ""), index=valores.index)
+
+
+def _formatear_bloque(df):
+    """Arma el texto de un bloque de corridas, sin recorrerlas fila por fila."""
+    vacio = pd.Series("", index=df.index)
+    signo = _signo(df['Variacion_Total'])
+    variacion = ("\nVariación diaria: " + signo + "$" + _texto(df['Variacion_Total'], "{:,.2f}")
+                 + " (" + signo + _texto(df['Porcentaje_Total'], "{:.2f}") + "%)")
+    ipc = "\nIPC General: " + _signo(df['IPC_General']) + _texto(df['IPC_General'], "{:.2f}") + "%"
+    lineas = (
+        "\n\nFecha: " + df['Fecha'].dt.strftime('%Y-%m-%d %H:%M')
+        + "\nTotal Canasta: $" + _texto(df['Total_Canasta'], "{:,.2f}")
+        + variacion.where(df['Variacion_Total'].notna(), vacio)
+        + "\nVariación desde primer día: " + _signo(df['Variacion_Desde_Primer_Dia'])
+        + _texto(df['Variacion_Desde_Primer_Dia'], "{:.2f}") + "%"
+        + ipc.where(df['IPC_General'].notna(), vacio)
+    )
+    return "".join(lineas.tolist())
+
+
+def _sufijo(desde, hasta):
+    """Identifica un rango en los nombres de archivo: 'YYYYMMDD_YYYYMMDD' ('inicio' si no tiene comienzo)."""
+    inicio = pd.Timestamp(desde).strftime('%Y%m%d') if desde is not None else "inicio"
+    return f"{inicio}_{pd.Timestamp(hasta or datetime.now()).strftime('%Y%m%d')}"
+
+
+def generar_resumen_pro(desde=None, hasta=None, tamano_bloque=TAMANO_BLOQUE, salida=print):
+    """
+    Genera el resumen Pro (TXT y CSV) de las corridas de un rango de fechas.
+
+    El historial se recorre en bloques de a lo sumo tamano_bloque corridas, que
+    se formatean y se agregan a los dos archivos a medida que se leen, así que
+    la memoria no depende de la longitud del rango.
+
+    Args:
+        desde, hasta: Límites del rango (fechas o 'YYYY-MM-DD'); sin ninguno de
+            los dos se usa el mes actual
+        tamano_bloque: Corridas por bloque
+        salida: Función con la que se muestran los mensajes
+
+    Returns:
+        Tupla con los nombres de los archivos TXT y CSV
+    """
+    if desde is None and hasta is None:
+        desde = datetime.now().strftime('%Y-%m-01')
+        sufijo = datetime.now().strftime('%Y%m')
+    else:
+        sufijo = _sufijo(desde, hasta)
+    nombre_archivo_txt = f"resumen_pro_{sufijo}.txt"
+    nombre_archivo_csv = f"resumen_pro_{sufijo}.csv"
+
+    total_inicial = None
+    with open(nombre_archivo_txt, 'w', encoding='utf-8') as txt, open(nombre_archivo_csv, 'w', encoding='utf-8', newline='') as csv:
+        txt.write("=== RESUMEN PRO DE LA CANASTA ===\n")
+        txt.write(f"Fecha de generación: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+        txt.write("\nResumen por día:")
+
+        for bloque in cargar_historial("resumen", desde=desde, hasta=hasta, tamano_bloque=tamano_bloque):
+            bloque['Fecha'] = pd.to_datetime(bloque['Fecha'])
+
+            # La variación se mide contra el total de la primera corrida del rango
+            if total_inicial is None:
+                total_inicial = bloque['Total_Canasta'].iloc[0]
+            bloque['Variacion_Desde_Primer_Dia'] = ((bloque['Total_Canasta'] - total_inicial) / total_inicial) * 100
+
+            txt.write(_formatear_bloque(bloque))
+            bloque.to_csv(csv, index=False, header=csv.tell() == 0)
+
+        if csv.tell() == 0:
+            csv.write("Fecha,Total_Canasta,Variacion_Total,Porcentaje_Total,IPC_General,Variacion_Desde_Primer_Dia\n")
+
+    salida("Resumen Pro generado exitosamente!")
+    salida("Archivos creados:")
+    salida(f"- {nombre_archivo_txt}")
+    salida(f"- {nombre_archivo_csv}")
+    return nombre_archivo_txt, nombre_archivo_csv
 
 if __name__ == "__main__":
-    generar_resumen_pro() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Genera el resumen Pro de la canasta para un rango de fechas.")
+    parser.add_argument("--desde", default=None, help="Primer día (YYYY-MM-DD); sin rango se usa el mes actual")
+    parser.add_argument("--hasta", default=None, help="Último día (YYYY-MM-DD)")
+    args = parser.parse_args()
+    generar_resumen_pro(args.desde, args.hasta)
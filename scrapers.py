@@ -1,24 +1,72 @@
-import requests
-from bs4 import BeautifulSoup
 import re
-from utils import limpiar_precio
-from config import HEADERS
+from concurrent.futures import ThreadPoolExecutor
+from extraccion import ExtractorPrecios
+from concurrencia import ejecutar_en_paralelo, obtener_host, obtener_limitador
+import sesion_http
+from config import URL_BASE_DIA, TAMANO_LOTE_DIA, SUPERMERCADOS, SUPERMERCADO_POR_DEFECTO
+
+def extraer_precio_vtex(producto):
+    """Extrae el precio de un producto devuelto por la API de catálogo de VTEX."""
+    price = producto.get('items', [{}])[0].get('sellers', [{}])[0].get('commertialOffer', {}).get('Price')
+    return float(price) if price is not None else None
+
+def dividir_en_lotes(elementos, tamano_lote=TAMANO_LOTE_DIA):
+    """Divide una lista en lotes consecutivos de como máximo tamano_lote elementos."""
+    return [elementos[i:i + tamano_lote] for i in range(0, len(elementos), tamano_lote)]
+
+def obtener_precios_dia_lote(codigos):
+    """
+    Obtiene los precios de varios productos de Día con una sola consulta a la API.
+    
+    Args:
+        codigos: Lista de códigos de producto (como máximo TAMANO_LOTE_DIA)
+        
+    Returns:
+        Tupla (precios, faltantes): diccionario código -> precio y lista de
+        códigos para los que la API no devolvió precio
+    """
+    codigos = [str(codigo) for codigo in codigos]
+    precios = {}
+    try:
+        filtros = "&".join(f"fq=productId:{codigo}" for codigo in codigos)
+        api_url = f"{URL_BASE_DIA}/api/catalog_system/pub/products/search?{filtros}&_from=0&_to={len(codigos) - 1}"
+        
+        print(f"Consultando API para {len(codigos)} productos ({codigos[0]} ... {codigos[-1]})")
+        response = sesion_http.get(api_url, timeout=10)
+        response.raise_for_status()
+        
+        for producto in response.json() or []:
+            codigo = str(producto.get('productId'))
+            if codigo in codigos:
+                try:
+                    price = extraer_precio_vtex(producto)
+                except (IndexError, AttributeError, TypeError, ValueError):
+                    price = None
+                if price is not None:
+                    precios[codigo] = price
+    except Exception as e:
+        print(f"Error al obtener los precios del lote: {e}")
+    
+    faltantes = [codigo for codigo in codigos if codigo not in precios]
+    if faltantes:
+        print(f"No se encontró el precio para los códigos: {', '.join(faltantes)}")
+    return precios, faltantes
 
 def obtener_precio_dia(codigo):
     """Obtiene el precio de un producto de Día usando su código."""
     try:
-        api_url = f"https://diaonline.supermercadosdia.com.ar/api/catalog_system/pub/products/search?fq=productId:{codigo}"
+        api_url = f"{URL_BASE_DIA}/api/catalog_system/pub/products/search?fq=productId:{codigo}"
         
         print(f"Consultando API para producto ID: {codigo}")
-        response = requests.get(api_url, headers=HEADERS, timeout=10)
+        response = sesion_http.get(api_url, timeout=10)
         response.raise_for_status()
         
         data = response.json()
         
         if data and len(data) > 0:
-            price = data[0].get('items', [{}])[0].get('sellers', [{}])[0].get('commertialOffer', {}).get('Price')
+            price = extraer_precio_vtex(data[0])
             if price is not None:
-                return float(price)
+                return price
         
         print(f"No se encontró el precio para el código: {codigo}")
         return None
@@ -26,24 +74,37 @@ def obtener_precio_dia(codigo):
         print(f"Error al obtener el precio: {e}")
         return None
 
+# Selectores del precio en cada supermercado, en orden de preferencia
+SELECTORES_DISCO = [
+    'div#priceContainer',
+    'div.discoargentina-store-theme-1dCOMij_MzTzZOCohX1K7w',
+    'span.vtex-store-components-3-x-sellingPriceValue'
+]
+SELECTORES_COTO = [
+    'var.price.h3.ng-star-inserted',
+    'span.atg_store_productPrice',
+    'span.textPrecio'
+]
+SELECTORES_JUMBO = [
+    'div.jumboargentinaio-store-theme-1dCOMij_MzTzZOCohX1K7w',
+    'span.vtex-store-components-3-x-sellingPriceValue',
+    'div.product-price'
+]
+
+# Extractores compilados una sola vez por supermercado
+EXTRACTOR_DISCO = ExtractorPrecios("disco", SELECTORES_DISCO)
+EXTRACTOR_COTO = ExtractorPrecios("coto", SELECTORES_COTO)
+EXTRACTOR_JUMBO = ExtractorPrecios("jumbo", SELECTORES_JUMBO)
+
 def obtener_precio_disco(url):
     """Obtiene el precio de un producto de Disco."""
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = sesion_http.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Intentar diferentes selectores para Disco
-        selectores = [
-            'div#priceContainer',
-            'div.discoargentina-store-theme-1dCOMij_MzTzZOCohX1K7w',
-            'span.vtex-store-components-3-x-sellingPriceValue'
-        ]
         
-        for selector in selectores:
-            elemento_precio = soup.select_one(selector)
-            if elemento_precio:
-                return limpiar_precio(elemento_precio.text)
+        precio = EXTRACTOR_DISCO.extraer(response.content)
+        if precio is not None:
+            return precio
         
         print(f"No se encontró el elemento del precio en Disco para la URL: {url}")
         return None
@@ -54,21 +115,12 @@ def obtener_precio_disco(url):
 def obtener_precio_coto(url):
     """Obtiene el precio de un producto de Coto."""
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = sesion_http.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Intentar diferentes selectores para Coto
-        selectores = [
-            'var.price.h3.ng-star-inserted',
-            'span.atg_store_productPrice',
-            'span.textPrecio'
-        ]
         
-        for selector in selectores:
-            elemento_precio = soup.select_one(selector)
-            if elemento_precio:
-                return limpiar_precio(elemento_precio.text)
+        precio = EXTRACTOR_COTO.extraer(response.content)
+        if precio is not None:
+            return precio
         
         print(f"No se encontró el elemento del precio en Coto para la URL: {url}")
         return None
@@ -79,24 +131,85 @@ def obtener_precio_coto(url):
 def obtener_precio_jumbo(url):
     """Obtiene el precio de un producto de Jumbo."""
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = sesion_http.get(url, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
         
-        # Intentar diferentes selectores para Jumbo
-        selectores = [
-            'div.jumboargentinaio-store-theme-1dCOMij_MzTzZOCohX1K7w',
-            'span.vtex-store-components-3-x-sellingPriceValue',
-            'div.product-price'
-        ]
-        
-        for selector in selectores:
-            elemento_precio = soup.select_one(selector)
-            if elemento_precio:
-                return limpiar_precio(elemento_precio.text)
+        precio = EXTRACTOR_JUMBO.extraer(response.content)
+        if precio is not None:
+            return precio
         
         print(f"No se encontró el elemento del precio en Jumbo para la URL: {url}")
         return None
     except Exception as e:
         print(f"Error al obtener la página de Jumbo: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+# Función de consulta de precio por supermercado (Día se consulta por lotes)
+SCRAPERS = {
+    "disco": obtener_precio_disco,
+    "coto": obtener_precio_coto,
+    "jumbo": obtener_precio_jumbo,
+}
+
+def _obtener_precios_supermercado(supermercado, codigos):
+    """Consulta los precios de un supermercado con sus propios límites de concurrencia y tasa."""
+    limites = SUPERMERCADOS[supermercado]
+    hosts = {obtener_host(URL_BASE_DIA)} if supermercado == "dia" else {obtener_host(codigo) for codigo in codigos}
+    for host in hosts:
+        obtener_limitador().configurar(host, limites["tasa_inicial"], limites["tasa_maxima"])
+    
+    if supermercado == "dia":
+        resultados_lotes = ejecutar_en_paralelo(
+            obtener_precios_dia_lote,
+            dividir_en_lotes(codigos),
+            max_concurrencia=limites["max_concurrencia"]
+        )
+        precios = {}
+        for precios_lote, _ in resultados_lotes:
+            precios.update(precios_lote)
+    else:
+        resultados = ejecutar_en_paralelo(
+            SCRAPERS[supermercado],
+            codigos,
+            max_concurrencia=limites["max_concurrencia"]
+        )
+        precios = {codigo: precio for codigo, precio in zip(codigos, resultados) if precio is not None}
+    
+    faltantes = [codigo for codigo in codigos if codigo not in precios]
+    return precios, faltantes
+
+def obtener_precios_canasta(productos):
+    """
+    Obtiene los precios de toda la canasta agrupando los productos por supermercado.
+    
+    Cada supermercado se consulta en su propio hilo, con su concurrencia y
+    tasa de peticiones, de modo que uno lento no frena a los demás.
+    
+    Args:
+        productos: Lista de productos con claves 'codigo' y 'supermercado'
+        
+    Returns:
+        Tupla (precios, faltantes): diccionario (supermercado, código) -> precio
+        unitario y diccionario supermercado -> lista de códigos sin precio
+    """
+    # Códigos sin repetir de cada supermercado, en orden de aparición (un dict como conjunto ordenado)
+    codigos_unicos = {}
+    for producto in productos:
+        supermercado = producto.get("supermercado", SUPERMERCADO_POR_DEFECTO)
+        codigos_unicos.setdefault(supermercado, {})[str(producto["codigo"])] = None
+    codigos_por_supermercado = {supermercado: list(codigos) for supermercado, codigos in codigos_unicos.items()}
+    
+    precios = {}
+    faltantes = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(codigos_por_supermercado))) as pool:
+        futuros = {
+            supermercado: pool.submit(_obtener_precios_supermercado, supermercado, codigos)
+            for supermercado, codigos in codigos_por_supermercado.items()
+        }
+        for supermercado, futuro in futuros.items():
+            precios_supermercado, faltantes_supermercado = futuro.result()
+            precios.update({(supermercado, codigo): precio for codigo, precio in precios_supermercado.items()})
+            if faltantes_supermercado:
+                faltantes[supermercado] = faltantes_supermercado
+    
+    return precios, faltantes
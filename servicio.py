@@ -0,0 +1,81 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from config import HORARIOS_SERVICIO
+from main import main, EstadoResidente
+
+
+def proxima_ejecucion(horarios, ahora=None):
+    """
+    Devuelve el próximo momento de la lista de horarios diarios.
+
+    Args:
+        horarios: Horarios 'HH:MM'
+        ahora: Momento de referencia (por defecto, el actual)
+
+    Returns:
+        datetime del primer horario posterior a 'ahora' (hoy o mañana)
+    """
+    ahora = ahora or datetime.now()
+    candidatos = []
+    for horario in horarios:
+        hora, minuto = (int(parte) for parte in horario.split(":"))
+        momento = ahora.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+        candidatos.append(momento if momento > ahora else momento + timedelta(days=1))
+    return min(candidatos)
+
+
+def ejecutar_servicio(horarios=HORARIOS_SERVICIO, intervalo=None, inmediata=False, corridas=None):
+    """
+    Corre capturas de precios en un único proceso que queda residente.
+
+    Entre corridas se conservan la sesión HTTP con sus conexiones abiertas, el
+    limitador por host y el índice de precios (ver EstadoResidente; la canasta
+    sale de su versión compilada mientras mi_carrito.txt no cambie), así que
+    cada captura solo paga las consultas a los supermercados y la escritura de
+    las filas nuevas. Los contadores de
+    conexiones, caché y limitador de cada corrida son los acumulados desde que
+    arrancó el servicio.
+
+    Args:
+        horarios: Horarios diarios 'HH:MM' de las capturas
+        intervalo: Minutos entre capturas; si se indica, reemplaza a los horarios
+        inmediata: Hacer la primera captura al arrancar, sin esperar al primer horario
+        corridas: Cantidad de capturas a realizar, o None para no terminar
+    """
+    estado = EstadoResidente()
+    realizadas = 0
+    proxima = datetime.now() if inmediata or intervalo else proxima_ejecucion(horarios)
+    while corridas is None or realizadas < corridas:
+        espera = (proxima - datetime.now()).total_seconds()
+        if espera > 0:
+            print(f"\nPróxima captura: {proxima.strftime('%Y-%m-%d %H:%M')}")
+            time.sleep(espera)
+
+        try:
+            main(estado=estado)
+        except Exception as e:
+            # El índice en memoria puede haber quedado a medio actualizar: se relee en la próxima
+            print(f"\nError en la captura: {e}")
+            estado.invalidar()
+        realizadas += 1
+
+        if intervalo:
+            proxima = max(proxima + timedelta(minutes=intervalo), datetime.now())
+        else:
+            proxima = proxima_ejecucion(horarios)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corre las capturas de precios en un proceso residente.")
+    parser.add_argument("--horarios", nargs="+", default=HORARIOS_SERVICIO, help="Horarios diarios HH:MM")
+    parser.add_argument("--intervalo", type=float, default=None, help="Minutos entre capturas (reemplaza a los horarios)")
+    parser.add_argument("--ahora", action="store_true", help="Hacer la primera captura al arrancar")
+    parser.add_argument("--corridas", type=int, default=None, help="Cantidad de capturas antes de terminar")
+    args = parser.parse_args()
+
+    try:
+        ejecutar_servicio(args.horarios, args.intervalo, args.ahora, args.corridas)
+    except KeyboardInterrupt:
+        print("\nServicio detenido.")
@@ -0,0 +1,175 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from scrapers import SELECTORES_DISCO, SELECTORES_COTO, SELECTORES_JUMBO
+
+RUTA_API_DIA = "/api/catalog_system/pub/products/search"
+PATRON_PAGINA = re.compile(r"^/(disco|coto|jumbo)/p/([\w-]+)$")
+SELECTORES = {
+    "disco": SELECTORES_DISCO,
+    "coto": SELECTORES_COTO,
+    "jumbo": SELECTORES_JUMBO,
+}
+RETRY_AFTER = 1  # Segundos informados en las respuestas 429
+
+
+def precio_simulado(codigo):
+    """Precio determinístico de un código (entre $300 y $8.000)."""
+    return round(300 + zlib.crc32(str(codigo).encode()) % 770000 / 100, 2)
+
+
+def formatear_precio(precio):
+    """Formatea un precio como en las góndolas web ('$ 1.234,56')."""
+    return "$ " + f"{precio:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def producto_vtex(codigo):
+    """Producto con la forma que devuelve la API de catálogo de VTEX."""
+    return {
+        "productId": str(codigo),
+        "productName": f"Producto {codigo}",
+        "items": [{"sellers": [{"commertialOffer": {"Price": precio_simulado(codigo)}}]}],
+    }
+
+
+def _elemento(selector, contenido):
+    """Arma el elemento HTML que corresponde a un selector simple ('tag#id' o 'tag.clase.clase')."""
+    if "#" in selector:
+        etiqueta, _, id_elemento = selector.partition("#")
+        atributos = f'id="{id_elemento}"'
+    else:
+        etiqueta, _, clases = selector.partition(".")
+        atributos = f'class="{clases.replace(".", " ")}"'
+    return f"<{etiqueta} {atributos}><span>{contenido}</span></{etiqueta}>"
+
+
+def pagina_producto(supermercado, codigo, relleno_kb=100):
+    """
+    Página de producto de Disco, Coto o Jumbo con el precio en uno de los selectores que espera su scraper.
+
+    El selector se elige según el código, de modo que se ejercitan todos.
+    """
+    selectores = SELECTORES[supermercado]
+    selector = selectores[zlib.crc32(str(codigo).encode()) % len(selectores)]
+    bloque = '<div class="vtex-flex-layout"><span class="texto">Descripción del producto &amp; más</span></div>\n'
+    relleno = bloque * (relleno_kb * 1024 // 2 // len(bloque))
+    return (
+        f"<html><head><title>{supermercado} {codigo}</title></head><body>{relleno}"
+        f"{_elemento(selector, formatear_precio(precio_simulado(codigo)))}"
+        f"{relleno}</body></html>"
+    ).encode("utf-8")
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Conexiones keep-alive, como los servidores reales
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, estado, cuerpo, tipo, encabezados=None):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (encabezados or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        servidor = self.server
+        if servidor.latencia > 0:
+            # Latencia exponencial: la mayoría rápidas, con una cola de respuestas lentas
+            time.sleep(random.expovariate(1 / servidor.latencia))
+
+        sorteo = random.random()
+        if sorteo < servidor.tasa_429:
+            servidor.contar("429")
+            self._responder(429, b"Too Many Requests", "text/plain", {"Retry-After": str(RETRY_AFTER)})
+            return
+        if sorteo < servidor.tasa_429 + servidor.tasa_errores:
+            servidor.contar("500")
+            self._responder(500, b"Internal Server Error", "text/plain")
+            return
+
+        url = urlparse(self.path)
+        if url.path == RUTA_API_DIA:
+            codigos = [
+                filtro.split(":", 1)[1]
+                for filtro in parse_qs(url.query).get("fq", [])
+                if filtro.startswith("productId:")
+            ]
+            cuerpo = json.dumps([producto_vtex(codigo) for codigo in codigos]).encode("utf-8")
+            servidor.contar("200")
+            self._responder(200, cuerpo, "application/json")
+            return
+
+        pagina = PATRON_PAGINA.match(url.path)
+        if pagina:
+            servidor.contar("200")
+            self._responder(200, pagina_producto(*pagina.groups(), servidor.relleno_kb), "text/html; charset=utf-8")
+            return
+
+        servidor.contar("404")
+        self._responder(404, b"Not Found", "text/plain")
+
+
+class ServidorSimulado(ThreadingHTTPServer):
+    """
+    Servidor local que imita la API de catálogo de Día y las páginas de producto
+    de Disco, Coto y Jumbo, con latencia, errores 500 y respuestas 429 configurables.
+
+    Rutas:
+        /api/catalog_system/pub/products/search?fq=productId:X&...  (JSON de VTEX)
+        /disco/p/<codigo>, /coto/p/<codigo>, /jumbo/p/<codigo>     (HTML)
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, puerto=0, latencia=0.0, tasa_errores=0.0, tasa_429=0.0, relleno_kb=100):
+        super().__init__(("127.0.0.1", puerto), _Manejador)
+        self.latencia = latencia
+        self.tasa_errores = tasa_errores
+        self.tasa_429 = tasa_429
+        self.relleno_kb = relleno_kb
+        self.respuestas = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def contar(self, estado):
+        with self._lock:
+            self.respuestas[estado] = self.respuestas.get(estado, 0) + 1
+
+
+def iniciar_servidor(**opciones):
+    """Inicia un ServidorSimulado en un hilo de fondo y lo devuelve (detenerlo con shutdown())."""
+    servidor = ServidorSimulado(**opciones)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que simula las APIs y páginas de los supermercados.")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia media en segundos")
+    parser.add_argument("--errores", type=float, default=0.0, help="Proporción de respuestas 500")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429")
+    parser.add_argument("--relleno-kb", type=int, default=100, help="Tamaño aproximado de las páginas HTML")
+    args = parser.parse_args()
+
+    servidor = ServidorSimulado(args.puerto, args.latencia, args.errores, args.tasa_429, args.relleno_kb)
+    print(f"Servidor simulado escuchando en {servidor.url_base}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,178 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metricas
+from cache_http import CacheHTTP, construir_respuesta
+from concurrencia import obtener_limitador, obtener_host, espera_backoff
+from config import (
+    HEADERS,
+    POOL_HOSTS,
+    POOL_CONEXIONES_POR_HOST,
+    CACHE_HTTP_HABILITADA,
+    REINTENTOS_MAXIMOS,
+    ESTADOS_REINTENTABLES,
+    BACKOFF_MAXIMO
+)
+
+_sesion = None
+_cache = None
+_lock = threading.Lock()
+
+
+def crear_sesion(pool_hosts=POOL_HOSTS, pool_conexiones_por_host=POOL_CONEXIONES_POR_HOST):
+    """Crea una sesión HTTP con pools de conexiones keep-alive por host."""
+    sesion = requests.Session()
+    sesion.headers.update(HEADERS)
+    adaptador = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_conexiones_por_host)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+def obtener_sesion():
+    """Devuelve la sesión HTTP compartida por todos los scrapers, creándola si hace falta."""
+    global _sesion
+    if _sesion is None:
+        with _lock:
+            if _sesion is None:
+                _sesion = crear_sesion()
+    return _sesion
+
+
+def obtener_cache():
+    """Devuelve la caché en disco compartida, o None si está deshabilitada."""
+    global _cache
+    if not CACHE_HTTP_HABILITADA:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = CacheHTTP()
+    return _cache
+
+
+def _segundos_retry_after(response):
+    """Devuelve los segundos pedidos en el encabezado Retry-After (con tope), o 0."""
+    valor = response.headers.get("Retry-After")
+    if not valor:
+        return 0
+    try:
+        segundos = float(valor)
+    except ValueError:
+        try:
+            segundos = parsedate_to_datetime(valor).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return 0
+    return min(max(segundos, 0), BACKOFF_MAXIMO)
+
+
+def _get_con_reintentos(url, headers, timeout):
+    """
+    Realiza el GET respetando el limitador adaptativo del host y reintentando
+    errores transitorios (conexión, timeout, 429 y 5xx) con backoff exponencial
+    y jitter. Cada intento consume un token del host.
+    """
+    limitador = obtener_limitador()
+    host = obtener_host(url)
+    for intento in range(REINTENTOS_MAXIMOS + 1):
+        limitador.esperar(host)
+        inicio = time.monotonic()
+        try:
+            response = obtener_sesion().get(url, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            latencia = time.monotonic() - inicio
+            limitador.registrar(host, None, latencia)
+            metricas.registrar_peticion(host, None, latencia, 0)
+            if intento == REINTENTOS_MAXIMOS:
+                raise
+            limitador.registrar_reintento(host)
+            time.sleep(espera_backoff(intento))
+            continue
+
+        latencia = time.monotonic() - inicio
+        limitador.registrar(host, response.status_code, latencia)
+        metricas.registrar_peticion(host, response.status_code, latencia, len(response.content))
+        if response.status_code not in ESTADOS_REINTENTABLES or intento == REINTENTOS_MAXIMOS:
+            return response
+        limitador.registrar_reintento(host)
+        time.sleep(espera_backoff(intento, minimo=_segundos_retry_after(response)))
+
+
+def get(url, timeout=10):
+    """
+    Realiza un GET reutilizando las conexiones de la sesión compartida.
+
+    Si la URL está en la caché y sigue vigente, se responde sin consultar al
+    servidor; si venció, se revalida con ETag / Last-Modified cuando el
+    servidor los informó. Las peticiones que llegan al servidor pasan por el
+    limitador adaptativo del host y se reintentan ante errores transitorios.
+    """
+    cache = obtener_cache()
+    if cache is None:
+        return _get_con_reintentos(url, {}, timeout)
+
+    entrada = cache.leer(url)
+    if entrada is not None and cache.vigente(entrada):
+        cache.marcar_uso(url)
+        cache.registrar("acierto")
+        return construir_respuesta(url, entrada)
+
+    encabezados = cache.encabezados_revalidacion(entrada) if entrada is not None else {}
+    response = _get_con_reintentos(url, encabezados, timeout)
+
+    if response.status_code == 304 and entrada is not None:
+        cache.renovar(url, entrada)
+        cache.registrar("revalidado")
+        return construir_respuesta(url, entrada)
+
+    cache.registrar("fallo")
+    if response.status_code == 200:
+        cache.guardar(url, response)
+    return response
+
+
+def estadisticas_cache():
+    """Devuelve los contadores de la caché en disco (vacíos si está deshabilitada)."""
+    cache = obtener_cache()
+    return cache.estadisticas() if cache is not None else {}
+
+
+def estadisticas_conexiones():
+    """
+    Devuelve los contadores de conexiones de la sesión compartida.
+
+    Returns:
+        Diccionario con las peticiones realizadas, las conexiones nuevas
+        (cada una con su handshake TCP+TLS) y las peticiones que reutilizaron
+        una conexión abierta, en total y por host
+    """
+    por_host = {}
+    if _sesion is not None:
+        adaptadores = {id(a): a for a in _sesion.adapters.values()}.values()
+        for adaptador in adaptadores:
+            pools = adaptador.poolmanager.pools
+            for clave in pools.keys():
+                pool = pools[clave]
+                host = pool.host
+                datos = por_host.setdefault(host, {"peticiones": 0, "conexiones_nuevas": 0})
+                datos["peticiones"] += pool.num_requests
+                datos["conexiones_nuevas"] += pool.num_connections
+
+    for datos in por_host.values():
+        datos["reutilizadas"] = max(datos["peticiones"] - datos["conexiones_nuevas"], 0)
+
+    return {
+        "peticiones": sum(d["peticiones"] for d in por_host.values()),
+        "conexiones_nuevas": sum(d["conexiones_nuevas"] for d in por_host.values()),
+        "reutilizadas": sum(d["reutilizadas"] for d in por_host.values()),
+        "por_host": por_host,
+    }
+
+
+def estadisticas_limitador():
+    """Devuelve, por host, la tasa alcanzada por el limitador y sus contadores de saturaciones y reintentos."""
+    return obtener_limitador().estado()
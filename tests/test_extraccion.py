@@ -0,0 +1,40 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from extraccion import ExtractorPrecios
+from scrapers import SELECTORES_DISCO
+from utils import limpiar_precio
+
+CLASE_DISCO = "discoargentina-store-theme-1dCOMij_MzTzZOCohX1K7w"
+CLASE_VTEX = "vtex-store-components-3-x-sellingPriceValue"
+
+PAGINAS = [
+    # 'data-class' no es 'class'
+    f'<div data-class="foo" class="{CLASE_DISCO}">$ 10,00</div><span class="{CLASE_VTEX}">$ 99,00</span>',
+    f'<div data-class="{CLASE_DISCO}" class="otra">$ 10,00</div><span class="{CLASE_VTEX}">$ 99,00</span>',
+    f'<div data-id="priceContainer">$ 10,00</div><span class="{CLASE_VTEX}">$ 99,00</span>',
+    # 'class=' dentro del valor de otro atributo
+    f'<div title="x class={CLASE_DISCO}" class=z>$ 10,00</div><span class="{CLASE_VTEX}">$ 99,00</span>',
+    # Atributo repetido: gana el último
+    f'<div class="otra" class="{CLASE_DISCO}">$ 10,00</div><span class="{CLASE_VTEX}">$ 99,00</span>',
+    f'<DIV CLASS={CLASE_DISCO}>$ 5,00</DIV>',
+    f'<script>var t = \'<div id="priceContainer">$ 1,00</div>\';</script><div id="priceContainer">$ 7,50</div>',
+    f'<!-- <div id="priceContainer">$ 1,00</div> --><span class="{CLASE_VTEX}">$ 8,25</span>',
+    f'<div-foo id="priceContainer">$ 1,00</div-foo><span class="a {CLASE_VTEX}">$ 3,00</span>',
+]
+
+
+def _con_bs4(pagina, selectores):
+    soup = BeautifulSoup(pagina, 'html.parser')
+    for selector in selectores:
+        elemento = soup.select_one(selector)
+        if elemento:
+            return limpiar_precio(elemento.text)
+    return None
+
+
+@pytest.mark.parametrize("pagina", PAGINAS)
+def test_extraccion_rapida_coincide_con_bs4(pagina):
+    extractor = ExtractorPrecios("prueba", SELECTORES_DISCO)
+    assert extractor.extraer(pagina) == _con_bs4(pagina, SELECTORES_DISCO)
+    assert any(estrategia.startswith("rapida:") for estrategia in extractor.aciertos)
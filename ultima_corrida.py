@@ -0,0 +1,136 @@
+import csv
+import glob
+import re
+import sqlite3
+from pathlib import Path
+
+from config import BACKEND_ALMACENAMIENTO, ARCHIVO_SQLITE
+
+# Solo usa la biblioteca estándar (salvo con el backend particionado), para que
+# consultar la última corrida no pague la importación de pandas
+
+PATRON_RESUMEN = re.compile(r"^resumen_(\d{6})\.csv$")
+
+
+def _ultimo_mes_csv():
+    meses = sorted(
+        coincidencia.group(1)
+        for coincidencia in (PATRON_RESUMEN.match(ruta) for ruta in glob.glob("resumen_*.csv"))
+        if coincidencia
+    )
+    return meses[-1] if meses else None
+
+
+def _filas_csv(ruta):
+    try:
+        with open(ruta, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    except FileNotFoundError:
+        return []
+
+
+def _texto(valor):
+    return "" if valor is None else str(valor)
+
+
+def _ultima_corrida_sqlite():
+    # Solo lectura: si la base no existe no se crea
+    try:
+        conexion = sqlite3.connect(Path(ARCHIVO_SQLITE).resolve().as_uri() + "?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        return None, []
+    try:
+        ultima = conexion.execute(
+            "SELECT id, fecha, total_canasta, variacion_total, porcentaje_total, ipc_general "
+            "FROM corridas ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if ultima is None:
+            return None, []
+        divisiones = conexion.execute(
+            "SELECT t.fecha, d.nombre, t.total, t.variacion, t.porcentaje, t.ipc "
+            "FROM totales_division t JOIN divisiones d ON d.id = t.division_id WHERE t.corrida_id = ? ORDER BY t.id",
+            (ultima[0],)
+        ).fetchall()
+    except sqlite3.DatabaseError:
+        # Base sin el esquema (todavía sin corridas guardadas)
+        return None, []
+    finally:
+        conexion.close()
+    resumen = dict(zip(["Fecha", "Total_Canasta", "Variacion_Total", "Porcentaje_Total", "IPC_General"], map(_texto, ultima[1:])))
+    columnas = ["Fecha", "Division", "Total", "Variacion", "Porcentaje", "IPC"]
+    return resumen, [dict(zip(columnas, map(_texto, fila))) for fila in divisiones]
+
+
+def leer_ultima_corrida():
+    """
+    Lee la última corrida guardada en el historial.
+
+    Returns:
+        Tupla (resumen, divisiones): la fila del resumen general y las filas de
+        divisiones de esa corrida, como diccionarios de texto; (None, []) si no
+        hay corridas
+    """
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        return _ultima_corrida_sqlite()
+    if BACKEND_ALMACENAMIENTO == "particionado":
+        from almacen import meses_disponibles, leer_tabla
+        meses = meses_disponibles("resumen")
+        if not meses:
+            return None, []
+        resumen = leer_tabla("resumen", desde=meses[-1], hasta=meses[-1]).astype(str).to_dict("records")
+        divisiones = leer_tabla("divisiones", desde=meses[-1], hasta=meses[-1]).astype(str).to_dict("records")
+    else:
+        mes = _ultimo_mes_csv()
+        if mes is None:
+            return None, []
+        resumen = _filas_csv(f"resumen_{mes}.csv")
+        divisiones = _filas_csv(f"divisiones_{mes}.csv")
+
+    if not resumen:
+        return None, []
+    ultima = resumen[-1]
+    return ultima, [fila for fila in divisiones if fila["Fecha"] == ultima["Fecha"]]
+
+
+def fecha_ultima_corrida():
+    """Devuelve la fecha ('%Y-%m-%d %H:%M') de la última corrida guardada, o None si no hay corridas."""
+    resumen, _ = leer_ultima_corrida()
+    return resumen["Fecha"] if resumen is not None else None
+
+
+def _numero(texto):
+    try:
+        valor = float(texto)
+    except (TypeError, ValueError):
+        return None
+    return valor if valor == valor else None  # NaN (celda vacía) cuenta como sin valor
+
+
+def imprimir_ultima_corrida():
+    """Muestra el total de la canasta y el IPC general y por división de la última corrida."""
+    resumen, divisiones = leer_ultima_corrida()
+    if resumen is None:
+        print("No hay corridas guardadas.")
+        return
+
+    print(f"Última corrida: {resumen['Fecha']}")
+    total = _numero(resumen.get("Total_Canasta"))
+    if total is not None:
+        print(f"Valor total de la canasta: ${total:.2f}")
+    variacion = _numero(resumen.get("Variacion_Total"))
+    porcentaje = _numero(resumen.get("Porcentaje_Total"))
+    if variacion is not None and porcentaje is not None:
+        signo = "+" if variacion >= 0 else ""
+        print(f"Variación contra la corrida anterior: {signo}${variacion:.2f} ({signo}{porcentaje:.2f}%)")
+    ipc_general = _numero(resumen.get("IPC_General"))
+    if ipc_general is not None:
+        print(f"IPC General Canasta Alimentos: {ipc_general:+.2f}%")
+
+    print("\nDivisiones:")
+    for fila in divisiones:
+        total_division = _numero(fila.get("Total")) or 0.0
+        if total_division == 0:
+            continue
+        ipc = _numero(fila.get("IPC"))
+        detalle = f" (IPC {ipc:+.2f}%)" if ipc is not None else ""
+        print(f"- {fila['Division']}: ${total_division:.2f}{detalle}")
@@ -1,9 +1,12 @@
 import re
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import os
 import difflib
-from config import DIVISIONES_IPC
+from functools import lru_cache
+from config import DIVISIONES_IPC, BACKEND_ALMACENAMIENTO, HISTORIAL_COMPACTO
+from almacen import leer_tabla, compactar_tabla, a_float64, COLUMNAS_CATEGORICAS
 
 def limpiar_precio(texto_precio):
     """Limpia y convierte un texto de precio a número."""
@@ -19,53 +22,37 @@ def limpiar_precio(texto_precio):
         print(f"Advertencia: No se pudo convertir a número: '{texto_precio}' -> '{limpio}'")
         return None
 
-def es_primer_dia_del_mes():
-    """Verifica si es el primer día del mes."""
-    return datetime.now().day == 1
-
-def crear_nuevo_mes_csv():
-    """Crea los archivos CSV para un nuevo mes."""
-    fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M')
-    
-    # 1. Resumen general
-    df_resumen = pd.DataFrame(columns=[
-        'Fecha',
-        'Total_Canasta',
-        'Variacion_Total',
-        'Porcentaje_Total',
-        'IPC_General'
-    ])
+def obtener_ultimos_csvs(compacto=HISTORIAL_COMPACTO):
+    """
+    Obtiene los últimos archivos CSV del mes actual o crea nuevos si no existen.
     
-    # 2. Divisiones
-    df_divisiones = pd.DataFrame(columns=[
-        'Fecha',
-        'Division',
-        'Total',
-        'Variacion',
-        'Porcentaje',
-        'IPC'
-    ])
+    Con compacto=True las tablas se cargan con tipos compactos (ver
+    almacen.compactar_tabla): fechas datetime64, productos y divisiones como
+    categorías y precios en float32 cuando es seguro.
+    """
+    mes_actual = datetime.now().strftime('%Y%m')
     
-    # 3. Productos
-    df_productos = pd.DataFrame(columns=[
-        'Fecha',
-        'Producto',
-        'Division',
-        'Precio',
-        'Variacion',
-        'Porcentaje'
-    ])
+    if BACKEND_ALMACENAMIENTO == "particionado":
+        tablas = (
+            leer_tabla("resumen", desde=mes_actual, hasta=mes_actual),
+            leer_tabla("divisiones", desde=mes_actual, hasta=mes_actual),
+            leer_tabla("productos", desde=mes_actual, hasta=mes_actual)
+        )
+        if compacto:
+            tablas = tuple(compactar_tabla(t, df) for t, df in zip(("resumen", "divisiones", "productos"), tablas))
+        return tablas
     
-    # Guardar los DataFrames en archivos separados
-    df_resumen.to_csv(f"resumen_{datetime.now().strftime('%Y%m')}.csv", index=False)
-    df_divisiones.to_csv(f"divisiones_{datetime.now().strftime('%Y%m')}.csv", index=False)
-    df_productos.to_csv(f"productos_{datetime.now().strftime('%Y%m')}.csv", index=False)
+    if BACKEND_ALMACENAMIENTO == "sqlite":
+        from almacen_sqlite import leer_tabla_sqlite
+        periodo = pd.Period(mes_actual, freq='M')
+        inicio, fin = periodo.start_time.strftime('%Y-%m-%d %H:%M'), periodo.end_time.strftime('%Y-%m-%d %H:%M')
+        tablas = tuple(leer_tabla_sqlite(t, inicio, fin) for t in ("resumen", "divisiones", "productos"))
+        if compacto:
+            tablas = tuple(compactar_tabla(t, df) for t, df in zip(("resumen", "divisiones", "productos"), tablas))
+        return tablas
     
-    return df_resumen, df_divisiones, df_productos
-
-def obtener_ultimos_csvs():
-    """Obtiene los últimos archivos CSV del mes actual o crea nuevos si no existen."""
-    mes_actual = datetime.now().strftime('%Y%m')
+    # Al cargar compacto, los textos repetidos se leen directamente como categorías
+    tipos = {c: 'category' for c in COLUMNAS_CATEGORICAS} if compacto else None
     
     # Cargar o crear los archivos
     if os.path.exists(f"resumen_{mes_actual}.csv"):
@@ -74,19 +61,30 @@ def obtener_ultimos_csvs():
         df_resumen = pd.DataFrame(columns=['Fecha', 'Total_Canasta', 'Variacion_Total', 'Porcentaje_Total', 'IPC_General'])
     
     if os.path.exists(f"divisiones_{mes_actual}.csv"):
-        df_divisiones = pd.read_csv(f"divisiones_{mes_actual}.csv")
+        df_divisiones = pd.read_csv(f"divisiones_{mes_actual}.csv", dtype=tipos)
     else:
         df_divisiones = pd.DataFrame(columns=['Fecha', 'Division', 'Total', 'Variacion', 'Porcentaje', 'IPC'])
     
     if os.path.exists(f"productos_{mes_actual}.csv"):
-        df_productos = pd.read_csv(f"productos_{mes_actual}.csv")
+        df_productos = pd.read_csv(f"productos_{mes_actual}.csv", dtype=tipos)
     else:
         df_productos = pd.DataFrame(columns=['Fecha', 'Producto', 'Division', 'Precio', 'Variacion', 'Porcentaje'])
     
+    if compacto:
+        df_resumen = compactar_tabla("resumen", df_resumen)
+        df_divisiones = compactar_tabla("divisiones", df_divisiones)
+        df_productos = compactar_tabla("productos", df_productos)
+    
     return df_resumen, df_divisiones, df_productos
 
+@lru_cache(maxsize=None)
 def validar_division(division):
-    """Valida si una división existe en las divisiones del IPC y sugiere la más cercana si no existe."""
+    """
+    Valida si una división existe en las divisiones del IPC y sugiere la más cercana si no existe.
+
+    El resultado se memoriza por texto de entrada, así que la búsqueda aproximada
+    y las advertencias ocurren una sola vez por cada división distinta.
+    """
     if division not in DIVISIONES_IPC:
         # Buscar la división más cercana
         sugerida = difflib.get_close_matches(division, DIVISIONES_IPC.keys(), n=1)
@@ -118,182 +116,208 @@ def calcular_variacion_semanal(df_productos):
     Returns:
         DataFrame con la variación semanal promedio por producto
     """
-    # Convertir la columna Fecha a datetime
-    df_productos['Fecha'] = pd.to_datetime(df_productos['Fecha'])
-    
-    # Agregar columnas de año y semana
-    df_productos['Año'] = df_productos['Fecha'].dt.isocalendar().year
-    df_productos['Semana'] = df_productos['Fecha'].dt.isocalendar().week
+    # Semana ISO de cada fila, sin modificar el DataFrame recibido
+    fechas = pd.to_datetime(df_productos['Fecha'])
+    calendario = fechas.dt.isocalendar()
+    datos = pd.DataFrame({
+        'Producto': df_productos['Producto'],
+        'Año': calendario.year,
+        'Semana': calendario.week,
+        'Precio': a_float64(df_productos['Precio'])
+    })
     
     # Calcular el promedio semanal por producto
-    promedios_semanales = df_productos.groupby(['Producto', 'Año', 'Semana'])['Precio'].mean().reset_index()
+    promedios_semanales = datos.groupby(['Producto', 'Año', 'Semana'], observed=True)['Precio'].mean().reset_index()
     
-    # Ordenar por producto y semana
-    promedios_semanales = promedios_semanales.sort_values(['Producto', 'Año', 'Semana'])
+    return variaciones_entre_semanas(promedios_semanales)
+
+def variaciones_entre_semanas(promedios_semanales):
+    """
+    Calcula la variación entre semanas consecutivas registradas de cada producto.
     
-    # Calcular la variación semanal
-    variaciones = []
-    for producto in promedios_semanales['Producto'].unique():
-        df_producto = promedios_semanales[promedios_semanales['Producto'] == producto]
+    Args:
+        promedios_semanales: DataFrame con columnas Producto, Año, Semana y Precio (promedio semanal)
         
-        for i in range(1, len(df_producto)):
-            precio_actual = df_producto.iloc[i]['Precio']
-            precio_anterior = df_producto.iloc[i-1]['Precio']
-            variacion = precio_actual - precio_anterior
-            
-            if precio_anterior != 0:
-                porcentaje = (variacion / precio_anterior) * 100
-            else:
-                porcentaje = 0
-            
-            variaciones.append({
-                'Producto': producto,
-                'Semana_Actual': df_producto.iloc[i]['Semana'],
-                'Año_Actual': df_producto.iloc[i]['Año'],
-                'Precio_Promedio_Actual': precio_actual,
-                'Precio_Promedio_Anterior': precio_anterior,
-                'Variacion': variacion,
-                'Porcentaje': porcentaje
-            })
+    Returns:
+        DataFrame con la variación semanal promedio por producto
+    """
+    promedios_semanales = promedios_semanales.sort_values(['Producto', 'Año', 'Semana'], ignore_index=True)
+    
+    # Cada semana se compara con la semana anterior registrada del mismo producto
+    precio_anterior = promedios_semanales['Precio'].shift(1)
+    es_primera_semana = promedios_semanales['Producto'].ne(promedios_semanales['Producto'].shift(1))
+    
+    variaciones = pd.DataFrame({
+        'Producto': promedios_semanales['Producto'],
+        'Semana_Actual': promedios_semanales['Semana'].astype('int64'),
+        'Año_Actual': promedios_semanales['Año'].astype('int64'),
+        'Precio_Promedio_Actual': promedios_semanales['Precio'],
+        'Precio_Promedio_Anterior': precio_anterior
+    })[~es_primera_semana].reset_index(drop=True)
+    
+    variaciones['Variacion'] = variaciones['Precio_Promedio_Actual'] - variaciones['Precio_Promedio_Anterior']
+    variaciones['Porcentaje'] = (
+        variaciones['Variacion'] / variaciones['Precio_Promedio_Anterior'] * 100
+    ).where(variaciones['Precio_Promedio_Anterior'] != 0, 0.0)
     
-    return pd.DataFrame(variaciones)
+    return variaciones
 
-def calcular_variacion_mensual(df_productos):
+# Divisiones que componen la canasta básica de alimentos
+DIVISIONES_ALIMENTOS = [
+    "Alimentos y bebidas no alcohólicas",
+    "Pan y cereales",
+    "Panificados",
+    "Almacén",
+    "Frescos",
+    "Bebidas",
+]
+
+def normalizar_periodo(periodo=None):
     """
-    Calcula la variación mensual de precios para la canasta básica de alimentos.
-    Compara el primer dato del mes con el último obtenido.
+    Convierte un período mensual a pd.Period.
+    
+    Acepta None (mes actual), 'YYYY-MM', 'YYYYMM', datetime/Timestamp o pd.Period.
+    """
+    if periodo is None:
+        periodo = datetime.now()
+    if isinstance(periodo, str) and len(periodo) == 6 and periodo.isdigit():
+        periodo = f"{periodo[:4]}-{periodo[4:]}"
+    return pd.Period(periodo, freq='M')
+
+def calcular_variaciones_mensuales(df_productos, solo_alimentos=True):
+    """
+    Calcula en una sola pasada las estadísticas mensuales de todos los productos
+    y de todos los meses presentes en el historial.
     
     Args:
         df_productos: DataFrame con los precios históricos
+        solo_alimentos: Si es True, considera solo las divisiones de alimentos básicos
         
     Returns:
-        DataFrame con la variación mensual por producto y división
+        DataFrame con una fila por producto y mes: primer y último precio del mes,
+        cantidad de registros, precio promedio, registros y promedio del mes
+        calendario anterior y división (del primer y del último registro del mes)
     """
-    # Convertir la columna Fecha a datetime
-    df_productos['Fecha'] = pd.to_datetime(df_productos['Fecha'])
-    
-    # Agregar columnas de año y mes
-    df_productos['Año'] = df_productos['Fecha'].dt.year
-    df_productos['Mes'] = df_productos['Fecha'].dt.month
-    
-    # Filtrar solo las divisiones de alimentos básicos
-    divisiones_alimentos = [
-        "Alimentos y bebidas no alcohólicas",
-        "Pan y cereales",
-        "Panificados",
-        "Almacén",
-        "Frescos",
-        "Bebidas"
+    columnas = [
+        'Producto', 'Año', 'Mes', 'Division_Primera', 'Division_Ultima', 'Filas',
+        'Precio_Primer_Dia', 'Precio_Ultimo_Dia', 'Precio_Promedio', 'Filas_Anterior',
+        'Precio_Promedio_Anterior', 'Orden'
     ]
+    datos = pd.DataFrame({
+        'Fecha': pd.to_datetime(df_productos['Fecha']),
+        'Producto': df_productos['Producto'],
+        'Division': df_productos['Division'],
+        'Precio': a_float64(df_productos['Precio']),
+    })
+    if solo_alimentos:
+        datos = datos[datos['Division'].isin(DIVISIONES_ALIMENTOS)]
+    datos = datos.dropna(subset=['Producto', 'Fecha'])
+    if datos.empty:
+        return pd.DataFrame(columns=columnas)
     
-    # Filtrar solo productos de alimentos básicos
-    df_alimentos = df_productos[df_productos['Division'].isin(divisiones_alimentos)]
+    datos['Orden'] = np.arange(len(datos))
+    datos['Periodo'] = datos['Fecha'].dt.year * 12 + datos['Fecha'].dt.month - 1
+    datos = datos.sort_values(['Producto', 'Periodo', 'Fecha'], kind='stable', ignore_index=True)
     
-    # Obtener el primer y último dato del mes actual
-    mes_actual = datetime.now().month
-    año_actual = datetime.now().year
+    # Primer y último registro de cada (producto, mes) según la posición en el orden
+    claves = datos[['Producto', 'Periodo']]
+    cambia_antes = claves.ne(claves.shift(1)).any(axis=1)
+    cambia_despues = claves.ne(claves.shift(-1)).any(axis=1)
+    primeros = datos[cambia_antes].reset_index(drop=True)
+    ultimos = datos[cambia_despues].reset_index(drop=True)
     
-    # Filtrar datos del mes actual
-    df_mes_actual = df_alimentos[
-        (df_alimentos['Mes'] == mes_actual) & 
-        (df_alimentos['Año'] == año_actual)
-    ]
+    grupos = datos.groupby(['Producto', 'Periodo'], sort=True, observed=True)
+    mensual = pd.DataFrame({
+        'Producto': primeros['Producto'],
+        'Periodo': primeros['Periodo'],
+        'Division_Primera': primeros['Division'],
+        'Division_Ultima': ultimos['Division'],
+        'Filas': grupos.size().to_numpy(),
+        'Precio_Primer_Dia': primeros['Precio'],
+        'Precio_Ultimo_Dia': ultimos['Precio'],
+        'Precio_Promedio': grupos['Precio'].mean().to_numpy(),
+        'Orden': grupos['Orden'].min().to_numpy(),
+    })
     
-    if df_mes_actual.empty:
-        return pd.DataFrame()  # Retornar DataFrame vacío si no hay datos del mes actual
+    # Promedio del mes calendario anterior del mismo producto
+    anterior = mensual[['Producto', 'Periodo', 'Filas', 'Precio_Promedio']].rename(
+        columns={'Filas': 'Filas_Anterior', 'Precio_Promedio': 'Precio_Promedio_Anterior'}
+    )
+    anterior['Periodo'] = anterior['Periodo'] + 1
+    mensual = mensual.merge(anterior, on=['Producto', 'Periodo'], how='left')
     
-    # Obtener el primer y último dato por producto
-    variaciones = []
-    for producto in df_mes_actual['Producto'].unique():
-        df_producto = df_mes_actual[df_mes_actual['Producto'] == producto]
-        
-        # Ordenar por fecha
-        df_producto = df_producto.sort_values('Fecha')
+    mensual['Año'] = mensual['Periodo'] // 12
+    mensual['Mes'] = mensual['Periodo'] % 12 + 1
+    return mensual[columnas]
+
+def _porcentaje(variacion, precio_anterior):
+    """Variación porcentual, con 0 cuando el precio anterior es 0 (como en el cálculo original)."""
+    return (variacion / precio_anterior * 100).where(precio_anterior != 0, 0.0)
+
+def calcular_variacion_mensual(df_productos, periodo=None, mensual=None):
+    """
+    Calcula la variación mensual de precios para la canasta básica de alimentos.
+    Compara el primer dato del mes con el último obtenido.
+    
+    Args:
+        df_productos: DataFrame con los precios históricos
+        periodo: Mes a calcular (ver normalizar_periodo); por defecto el mes actual
+        mensual: Resultado previo de calcular_variaciones_mensuales, para no recalcularlo
         
-        if len(df_producto) >= 2:  # Necesitamos al menos dos datos
-            primer_dato = df_producto.iloc[0]
-            ultimo_dato = df_producto.iloc[-1]
-            
-            precio_actual = ultimo_dato['Precio']
-            precio_anterior = primer_dato['Precio']
-            variacion = precio_actual - precio_anterior
-            
-            if precio_anterior != 0:
-                porcentaje = (variacion / precio_anterior) * 100
-            else:
-                porcentaje = 0
-            
-            variaciones.append({
-                'Producto': producto,
-                'Division': ultimo_dato['Division'],
-                'Mes_Actual': mes_actual,
-                'Año_Actual': año_actual,
-                'Precio_Primer_Dia': precio_anterior,
-                'Precio_Ultimo_Dia': precio_actual,
-                'Variacion': variacion,
-                'Porcentaje': porcentaje
-            })
+    Returns:
+        DataFrame con la variación mensual por producto y división
+    """
+    periodo = normalizar_periodo(periodo)
+    if mensual is None:
+        mensual = calcular_variaciones_mensuales(df_productos)
+    
+    # Productos del mes con al menos dos datos, en orden de aparición
+    df_mes = mensual[
+        (mensual['Año'] == periodo.year) & (mensual['Mes'] == periodo.month) & (mensual['Filas'] >= 2)
+    ].sort_values('Orden')
+    
+    if df_mes.empty:
+        return pd.DataFrame()  # Retornar DataFrame vacío si no hay datos del mes
     
-    return pd.DataFrame(variaciones)
+    variacion = df_mes['Precio_Ultimo_Dia'] - df_mes['Precio_Primer_Dia']
+    return pd.DataFrame({
+        'Producto': df_mes['Producto'],
+        'Division': df_mes['Division_Ultima'],
+        'Mes_Actual': periodo.month,
+        'Año_Actual': periodo.year,
+        'Precio_Primer_Dia': df_mes['Precio_Primer_Dia'],
+        'Precio_Ultimo_Dia': df_mes['Precio_Ultimo_Dia'],
+        'Variacion': variacion,
+        'Porcentaje': _porcentaje(variacion, df_mes['Precio_Primer_Dia'])
+    }).reset_index(drop=True)
 
 
-def calcular_variacion_mensual_intermensual(df_productos):
+def calcular_variacion_mensual_intermensual(df_productos, periodo=None, mensual=None):
     """Calcula la variación mensual comparando el promedio de precios del mes
-    actual con el promedio del mes anterior para la canasta básica
-    alimentaria."""
-
-    df_productos['Fecha'] = pd.to_datetime(df_productos['Fecha'])
-
-    df_productos['Año'] = df_productos['Fecha'].dt.year
-    df_productos['Mes'] = df_productos['Fecha'].dt.month
-
-    divisiones_alimentos = [
-        "Alimentos y bebidas no alcohólicas",
-        "Pan y cereales",
-        "Panificados",
-        "Almacén",
-        "Frescos",
-        "Bebidas",
-    ]
-
-    df_alimentos = df_productos[df_productos['Division'].isin(divisiones_alimentos)]
+    indicado (por defecto el actual) con el promedio del mes anterior para la
+    canasta básica alimentaria. Puede recibir el resultado previo de
+    calcular_variaciones_mensuales para no recalcularlo."""
 
-    fecha_actual = datetime.now()
-    mes_actual = fecha_actual.month
-    año_actual = fecha_actual.year
+    periodo = normalizar_periodo(periodo)
+    if mensual is None:
+        mensual = calcular_variaciones_mensuales(df_productos)
 
-    fecha_mes_anterior = fecha_actual - pd.DateOffset(months=1)
-    mes_anterior = fecha_mes_anterior.month
-    año_anterior = fecha_mes_anterior.year
+    df_mes = mensual[
+        (mensual['Año'] == periodo.year) & (mensual['Mes'] == periodo.month)
+        & mensual['Filas_Anterior'].notna()
+    ].sort_values('Producto')
 
-    df_mes_actual = df_alimentos[(df_alimentos['Mes'] == mes_actual) & (df_alimentos['Año'] == año_actual)]
-    df_mes_anterior = df_alimentos[(df_alimentos['Mes'] == mes_anterior) & (df_alimentos['Año'] == año_anterior)]
-
-    if df_mes_actual.empty or df_mes_anterior.empty:
+    if df_mes.empty:
         return pd.DataFrame()
 
-    promedio_actual = df_mes_actual.groupby('Producto')['Precio'].mean()
-    promedio_anterior = df_mes_anterior.groupby('Producto')['Precio'].mean()
-
-    productos_comunes = promedio_actual.index.intersection(promedio_anterior.index)
-
-    variaciones = []
-    for producto in productos_comunes:
-        precio_actual = promedio_actual[producto]
-        precio_anterior = promedio_anterior[producto]
-        variacion = precio_actual - precio_anterior
-        porcentaje = (variacion / precio_anterior) * 100 if precio_anterior != 0 else 0
-        division = df_mes_actual[df_mes_actual['Producto'] == producto].iloc[0]['Division']
-
-        variaciones.append({
-            'Producto': producto,
-            'Division': division,
-            'Mes_Actual': mes_actual,
-            'Año_Actual': año_actual,
-            'Precio_Promedio_Anterior': precio_anterior,
-            'Precio_Promedio_Actual': precio_actual,
-            'Variacion': variacion,
-            'Porcentaje': porcentaje,
-        })
-
-    return pd.DataFrame(variaciones)
+    variacion = df_mes['Precio_Promedio'] - df_mes['Precio_Promedio_Anterior']
+    return pd.DataFrame({
+        'Producto': df_mes['Producto'],
+        'Division': df_mes['Division_Primera'],
+        'Mes_Actual': periodo.month,
+        'Año_Actual': periodo.year,
+        'Precio_Promedio_Anterior': df_mes['Precio_Promedio_Anterior'],
+        'Precio_Promedio_Actual': df_mes['Precio_Promedio'],
+        'Variacion': variacion,
+        'Porcentaje': _porcentaje(variacion, df_mes['Precio_Promedio_Anterior']),
+    }).reset_index(drop=True)